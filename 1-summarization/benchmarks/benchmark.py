@@ -0,0 +1,242 @@
+"""Benchmark the overhead of the summarizer apart from LLM latency, using synthetic source trees and a fake LLM.
+
+Run from the 1-summarization folder, for example:
+
+    python -m benchmarks.benchmark --width 4 --depth 3 --files 5 --file-size 2000 --latency 0.01
+
+The tree is summarized twice, each time in a fresh process: first with an empty cache (cold) and then with the cache
+of the first run (warm). With --similarity, nearly the same files reuse summaries, as with SIMILARITY_THRESHOLD in the
+configuration, and the time spent computing MinHash signatures is measured. The results are appended to
+benchmarks/results.jsonl together with the commit, and compared with the previous results of the same scenario, so
+regressions show up between commits.
+
+Filesystem calls are the calls of os.scandir, os.stat, and open; stat calls on directory entries are not counted.
+"""
+
+from __future__ import annotations
+
+import argparse
+import functools
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+from collections.abc import Callable
+from datetime import datetime
+from hashlib import md5
+from pathlib import Path
+from typing import Any
+from unittest.mock import patch
+
+from benchmarks.synthetic_tree import generate_tree
+
+RESULTS_FILE_NAME = Path("benchmarks/results.jsonl")
+METRICS = (
+    "wall_time", "filesystem_calls", "hash_time", "token_counting_time", "similarity_time", "peak_rss_mb", "llm_calls_per_node"
+)
+
+
+class Meter:
+    """Count the calls of, and the time spent in, measured functions."""
+
+    def __init__(self) -> None:
+        self.calls: Counter[str] = Counter()
+        self.seconds: defaultdict[str, float] = defaultdict(float)
+        self.lock = threading.Lock()
+
+    def wrap(self, name: str, function: Callable[..., Any]) -> Callable[..., Any]:
+        """Return the function, measured under the name."""
+
+        @functools.wraps(function)
+        def measured(*args: Any, **kwargs: Any) -> Any:
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                with self.lock:
+                    self.calls[name] += 1
+                    self.seconds[name] += time.perf_counter() - start
+
+        return measured
+
+
+def fake_llm(latency: float) -> tuple[Callable[..., str], Callable[..., list[str]]]:
+    """Return deterministic fake LLM functions that summarize one input, and a batch of files, after a delay."""
+
+    def summarize(path: Path, text: Any, *args: Any, **kwargs: Any) -> str:
+        time.sleep(latency)
+        return f"Summary of {path.name}: {md5(repr(text).encode('utf-8')).hexdigest()}"
+
+    def summarize_files(files: list[tuple[Path, str]], *args: Any, **kwargs: Any) -> list[str]:
+        time.sleep(latency)
+        return [f"Summary of {path.name}: {md5(code.encode('utf-8')).hexdigest()}" for path, code in files]
+
+    return summarize, summarize_files
+
+
+def measure(
+    tree: Path, cache_file_name: Path, latency: float, max_workers: int, similarity: float | None = None
+) -> dict[str, float | None]:
+    """Summarize the tree with a fake LLM and return the measurements."""
+    import summarize_code
+    from src import chunker, llm, token_counter
+    from src.hash_register import HashRegister, open_hashes_database
+    from src.similarity import MinHasher
+    from src.tree_index import build_index
+
+    index = build_index(tree)
+    number_of_nodes = len(index.file_info) + len(index.dirs)
+    meter = Meter()
+    summarize, summarize_files = fake_llm(latency)
+    count_tokens_batch = meter.wrap("tokens", token_counter.count_tokens_batch)
+    patches = [
+        patch.object(summarize_code, "llm_generate_summary", meter.wrap("llm", summarize)),
+        patch.object(summarize_code, "llm_summarize_summary", meter.wrap("llm", summarize)),
+        patch.object(summarize_code, "llm_generate_summaries", meter.wrap("llm", summarize_files)),
+        patch.object(os, "scandir", meter.wrap("filesystem", os.scandir)),
+        patch.object(os, "stat", meter.wrap("filesystem", os.stat)),
+        patch.object(io, "open", meter.wrap("filesystem", io.open)),
+        patch("builtins.open", meter.wrap("filesystem", open)),
+        patch.object(HashRegister, "_hash", staticmethod(meter.wrap("hash", HashRegister._hash))),
+        patch.object(token_counter, "count_tokens_batch", count_tokens_batch),
+        patch.object(llm, "count_tokens_batch", count_tokens_batch),
+        patch.object(chunker, "count_tokens_batch", count_tokens_batch),
+        patch.object(MinHasher, "signature", meter.wrap("similarity", MinHasher.signature)),
+    ]
+    for measured_function in patches:
+        measured_function.start()
+    hash_register = open_hashes_database(cache_file_name, similarity_threshold=similarity)  # After patching MinHasher
+    try:
+        start = time.perf_counter()
+        if max_workers:
+            summarize_code.summarize_path_concurrently(tree, hash_register, max_workers)
+        else:
+            summarize_code.summarize_path(tree, hash_register)
+        wall_time = time.perf_counter() - start
+    finally:
+        patch.stopall()
+        hash_register.hashes.close()
+    return dict(
+        wall_time=wall_time,
+        filesystem_calls=meter.calls["filesystem"],
+        hash_time=meter.seconds["hash"],
+        token_counting_time=meter.seconds["tokens"],
+        similarity_time=meter.seconds["similarity"],
+        peak_rss_mb=peak_rss_mb(),
+        llm_calls_per_node=meter.calls["llm"] / number_of_nodes,
+    )
+
+
+def peak_rss_mb() -> float | None:
+    """Return the peak resident set size of the process in megabytes, if the platform can tell."""
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak_rss / 1024 / 1024 if sys.platform == "darwin" else peak_rss / 1024  # Bytes on macOS, else kilobytes
+
+
+def measure_in_new_process(
+    tree: Path, cache_file_name: Path, latency: float, max_workers: int, similarity: float | None = None
+) -> dict[str, float | None]:
+    """Measure in a fresh process, so imports, caches, and peak memory use of earlier runs don't count."""
+    command = [
+        sys.executable, "-m", "benchmarks.benchmark", "--measure", str(tree), "--cache", str(cache_file_name),
+        "--latency", str(latency), "--workers", str(max_workers),
+    ]
+    if similarity is not None:
+        command.extend(["--similarity", str(similarity)])
+    output = subprocess.run(command, capture_output=True, text=True, check=True)
+    return json.loads(output.stdout.splitlines()[-1])
+
+
+def run_benchmark(args: argparse.Namespace) -> dict[str, Any]:
+    """Generate the tree and measure a cold and a warm run."""
+    with tempfile.TemporaryDirectory() as directory:
+        tree = Path(directory) / "tree"
+        number_of_files = generate_tree(tree, args.width, args.depth, args.files, args.file_size, args.seed)
+        cache_file_name = Path(directory) / "summary_cache.db"
+        cold = measure_in_new_process(tree, cache_file_name, args.latency, args.workers, args.similarity)
+        warm = measure_in_new_process(tree, cache_file_name, args.latency, args.workers, args.similarity)
+    return dict(commit=current_commit(), date=datetime.now().isoformat(timespec="seconds"), files=number_of_files, cold=cold, warm=warm)
+
+
+def current_commit() -> str:
+    """Return the current commit, marked dirty if tracked files have uncommitted changes."""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "diff", "--quiet", "HEAD"], check=False).returncode != 0
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+    return f"{commit}-dirty" if dirty else commit
+
+
+def scenario_name(args: argparse.Namespace) -> str:
+    """Return the name of the scenario, so results are only compared with results of the same scenario."""
+    scenario = (
+        f"width={args.width} depth={args.depth} files={args.files} file_size={args.file_size} seed={args.seed} "
+        f"latency={args.latency} workers={args.workers}"
+    )
+    return scenario if args.similarity is None else f"{scenario} similarity={args.similarity}"
+
+
+def report(result: dict[str, Any], previous: dict[str, Any] | None) -> str:
+    """Return a table with the measurements, compared with the previous measurements if any."""
+    lines = [f"{'':22}{'cold':>12}{'warm':>12}" + (f"   change since {previous['commit']}" if previous else "")]
+    for metric in METRICS:
+        line = f"{metric:22}" + "".join(format_value(result[run][metric]) for run in ("cold", "warm"))
+        if previous:
+            line += "   " + " ".join(format_change(result[run][metric], previous[run].get(metric)) for run in ("cold", "warm"))
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def format_value(value: float | None) -> str:
+    """Format a measurement."""
+    return f"{'n/a':>12}" if value is None else f"{value:12.4g}"
+
+
+def format_change(value: float | None, previous_value: float | None) -> str:
+    """Format the relative change of a measurement."""
+    if value is None or not previous_value:
+        return f"{'n/a':>8}"
+    return f"{(value - previous_value) / previous_value:+8.1%}"
+
+
+def main() -> None:
+    """Run the benchmark, or a single measurement if called with --measure."""
+    parser = argparse.ArgumentParser(description="Benchmark the summarizer on a synthetic source tree with a fake LLM.")
+    parser.add_argument("--width", type=int, default=3, help="number of subfolders per folder")
+    parser.add_argument("--depth", type=int, default=3, help="number of folder levels below the root")
+    parser.add_argument("--files", type=int, default=5, help="number of files per folder")
+    parser.add_argument("--file-size", type=int, default=2000, help="size of each file in bytes")
+    parser.add_argument("--seed", type=int, default=0, help="seed for generating the file contents")
+    parser.add_argument("--latency", type=float, default=0.0, help="latency of the fake LLM in seconds")
+    parser.add_argument("--workers", type=int, default=0, help="number of concurrent LLM calls; 0 runs sequentially")
+    parser.add_argument(
+        "--similarity", type=float, help="similarity threshold for reusing the summaries of nearly the same files; off if not given"
+    )
+    parser.add_argument("--measure", type=Path, help=argparse.SUPPRESS)
+    parser.add_argument("--cache", type=Path, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.measure:
+        print(json.dumps(measure(args.measure, args.cache, args.latency, args.workers, args.similarity)))
+        return
+    from src.add_to_JSON import append_record, read_experiment
+
+    scenario = scenario_name(args)
+    previous = read_experiment(scenario, RESULTS_FILE_NAME) if RESULTS_FILE_NAME.exists() else []
+    result = run_benchmark(args)
+    append_record(RESULTS_FILE_NAME, scenario, result)
+    print(f"{scenario}: {result['files']} files, commit {result['commit']}")
+    print(report(result, previous[-1] if previous else None))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Benchmark walking a source tree with the compiled ignore matcher against walking it with Path.match patterns.
+
+Run from the 1-summarization folder, for example:
+
+    python -m benchmarks.ignore_benchmark --width 10 --depth 3 --files 90
+
+The synthetic tree gets a node_modules folder in each top-level package, excluded by a .gitignore at the root. The
+Path.match walk is how the tree was walked before the ignore matcher: os.walk with every skip pattern matched against
+every path part, which doesn't read ignore files and so descends into node_modules.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import tempfile
+import time
+from collections.abc import Callable
+from pathlib import Path
+
+from benchmarks.synthetic_tree import generate_tree
+from src.skip_dir import dirs_to_skip, filenames_to_skip, ignore_matcher
+
+
+def path_match_skip_dir(path: Path) -> bool:
+    """Return whether to skip the directory, matching each pattern against each path part."""
+    return any(Path(part).match(pattern) for pattern in dirs_to_skip for part in path.parts if part not in (".", ".."))
+
+
+def path_match_skip_file(filename: Path) -> bool:
+    """Return whether to skip the file, matching each pattern against the path."""
+    return any(filename.match(pattern) for pattern in filenames_to_skip)
+
+
+def path_match_walk(root: Path) -> list[Path]:
+    """Return the files to summarize, walking the tree with os.walk and the Path.match patterns."""
+    file_paths = []
+    for directory, dirs, files in os.walk(root):
+        dirs[:] = [name for name in dirs if not path_match_skip_dir(Path(directory) / name)]
+        file_paths.extend(Path(directory) / name for name in files if not path_match_skip_file(Path(directory) / name))
+    return file_paths
+
+
+def matcher_walk(root: Path) -> list[Path]:
+    """Return the files to summarize, walking the tree with the compiled ignore matcher."""
+    return [path for _, _, files in ignore_matcher(root).walk() for path in files]
+
+
+def add_ignored_folders(root: Path, files_per_folder: int) -> None:
+    """Add a node_modules folder to each top-level package, and a .gitignore that excludes them."""
+    for package in sorted(root.glob("package_*")):
+        (package / "node_modules").mkdir()
+        for index in range(files_per_folder):
+            (package / "node_modules" / f"module_{index}.js").write_text("module.exports = {};\n", encoding="utf-8")
+    (root / ".gitignore").write_text("node_modules/\n", encoding="utf-8")
+
+
+def time_walk(walk: Callable[[Path], list[Path]], root: Path, repeat: int) -> tuple[float, int]:
+    """Return the best wall time of the walks and the number of files found."""
+    best, files = float("inf"), []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        files = walk(root)
+        best = min(best, time.perf_counter() - start)
+    return best, len(files)
+
+
+def main() -> None:
+    """Generate the tree, walk it both ways, and report the timings."""
+    parser = argparse.ArgumentParser(description="Benchmark the compiled ignore matcher against Path.match patterns.")
+    parser.add_argument("--width", type=int, default=10, help="number of subfolders per folder")
+    parser.add_argument("--depth", type=int, default=3, help="number of folder levels below the root")
+    parser.add_argument("--files", type=int, default=90, help="number of files per folder")
+    parser.add_argument("--repeat", type=int, default=3, help="number of walks per method; the best time counts")
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as directory:
+        root = Path(directory) / "tree"
+        number_of_files = generate_tree(root, args.width, args.depth, args.files, file_size=1)
+        add_ignored_folders(root, args.files)
+        print(f"{number_of_files} files, plus {args.width * args.files} files in ignored folders")
+        path_match_time, path_match_files = time_walk(path_match_walk, root, args.repeat)
+        matcher_time, matcher_files = time_walk(matcher_walk, root, args.repeat)
+    print(f"{'':12}{'seconds':>10}{'files':>10}")
+    print(f"{'Path.match':12}{path_match_time:10.3f}{path_match_files:10}")
+    print(f"{'matcher':12}{matcher_time:10.3f}{matcher_files:10}")
+    print(f"speedup {path_match_time / matcher_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
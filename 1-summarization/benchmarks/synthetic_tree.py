@@ -0,0 +1,42 @@
+"""Generate synthetic source trees to benchmark the summarizer on."""
+
+from __future__ import annotations
+
+import random
+from pathlib import Path
+
+WORDS = ["summary", "value", "index", "report", "metric", "source", "token", "record", "folder", "result"]
+
+
+def generate_tree(root: Path, width: int, depth: int, files_per_folder: int, file_size: int, seed: int = 0) -> int:
+    """Create a tree of folders with width subfolders per folder, depth levels deep, and return the number of files.
+
+    Each folder contains files_per_folder Python files of about file_size bytes. The same parameters and seed give
+    the same tree.
+    """
+    rng = random.Random(seed)
+    number_of_files = 0
+    folders = [root]
+    for level in range(depth + 1):
+        next_folders = []
+        for folder in folders:
+            folder.mkdir(parents=True, exist_ok=True)
+            for index in range(files_per_folder):
+                (folder / f"module_{index}.py").write_text(python_source(rng, file_size), encoding="utf-8")
+                number_of_files += 1
+            if level < depth:
+                next_folders.extend(folder / f"package_{index}" for index in range(width))
+        folders = next_folders
+    return number_of_files
+
+
+def python_source(rng: random.Random, size: int) -> str:
+    """Return Python code of about size bytes."""
+    lines = []
+    length = 0
+    while length < size:
+        name = "_".join(rng.choices(WORDS, k=2))
+        function = f"def {name}_{rng.randrange(10_000)}({rng.choice(WORDS)}):\n    return {rng.choice(WORDS)} * {rng.randrange(100)}\n\n"
+        lines.append(function)
+        length += len(function)
+    return "".join(lines)
@@ -8,6 +8,8 @@ from langchain_openai import ChatOpenAI
 from langchain_community.document_loaders import Docx2txtLoader
 from langchain.prompts import ChatPromptTemplate
 
+from src.token_counter import count_message_tokens
+
 
 #load API key from env
 load_dotenv()
@@ -73,8 +75,7 @@ def complete_doc_prompt(doc_path, json_path):
 
 def get_tokens_from_messages(chat_prompt):
     """Calculates number of tokens in the messages list"""
-    llm = create_llm()
-    return llm.get_num_tokens_from_messages(chat_prompt)
+    return count_message_tokens(chat_prompt, "gpt-4-0125-preview")
 
 def llm_arch_call(doc_path, json_path):
     """Calls llm to generate architecture documentation"""
@@ -30,7 +30,7 @@ class TestOutputPresentation(unittest.TestCase):
 
     def test_generate_prompts_html(self):
         prompts = {"prompt1": "Test prompt 1", "prompt2": "Test prompt 2"}
-        expected_html = '''    <details class="prompts-details" style="margin-left: 40px;">
+        expected_html = '''    <details class="prompts-details depth-2">
       <summary class="summary-title">Prompts Details</summary>
       <ul>
         <li><b>prompt1:</b> Test prompt 1</li>
@@ -41,10 +41,10 @@ class TestOutputPresentation(unittest.TestCase):
 
     def test_generate_html_from_summary_top_level(self):
         html = generate_html_from_summary(self.summary)
-        self.assertIn('<h2 style="margin-left: 0px; color: #333366;">Summary of test/path</h2>', html)
-        self.assertIn('<div class="configuration" style="margin-left: 0px; background-color: #f3f3f3; padding: 10px; border-radius: 8px; margin: 10px 0;">', html)
-        self.assertIn('<p style="margin-left: 0px;"><b>path:</b> test/path</p>', html)
-        self.assertIn('<p style="margin-left: 0px;"><b>summary:</b> This is a <b>test</b> summary.</p>', html)
+        self.assertIn('<h2 class="summary-header depth-0">Summary of test/path</h2>', html)
+        self.assertIn('<div class="configuration">', html)
+        self.assertIn('<p class="depth-0"><b>path:</b> test/path</p>', html)
+        self.assertIn('<p class="depth-0"><b>summary:</b> This is a <b>test</b> summary.</p>', html)
 
     def test_generate_html_from_summary_nested(self):
         nested_summary = Summary(
@@ -63,10 +63,10 @@ class TestOutputPresentation(unittest.TestCase):
         self.summary["summaries"].append(nested_summary)
 
         html = generate_html_from_summary(self.summary)
-        self.assertIn('<details class="summary-detail" style="margin-left: 0px;">', html)
-        self.assertIn('<h2 style="margin-left: 20px; color: #333366;">Summary of path</h2>', html)
-        self.assertIn('<p style="margin-left: 20px;"><b>path:</b> nested/path</p>', html)
-        self.assertIn('<p style="margin-left: 20px;"><b>summary:</b> This is a nested summary.</p>', html)
+        self.assertIn('<details class="summary-detail depth-0">', html)
+        self.assertIn('<h2 class="summary-header depth-1">Summary of path</h2>', html)
+        self.assertIn('<p class="depth-1"><b>path:</b> nested/path</p>', html)
+        self.assertIn('<p class="depth-1"><b>summary:</b> This is a nested summary.</p>', html)
 
     def test_summary_to_html_enhanced(self):
         html = summary_to_html_enhanced(self.summary)
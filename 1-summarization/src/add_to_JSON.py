@@ -1,26 +1,107 @@
-"""Write the summaries to the results file in the metrics folder."""
+"""Write the summaries to the results file in the metrics folder.
+
+The results file is a JSON Lines file with one record per experiment run. Records are appended, never rewritten, so
+the cost of writing doesn't grow with the number of runs and a crash can at most lose the record being written. An
+index file maps experiment names to the byte offsets of their records, so reading one experiment doesn't require
+parsing the others.
+"""
+
+from __future__ import annotations
 
 import json
+import os
+import sys
+import tempfile
 from pathlib import Path
 
-import box
-import yaml
+from src.config import cfg
+
+
+def write_json(new_data, filename=None, experiment=None) -> None:
+    """Append the summaries to the results file."""
+    append_record(Path(filename or cfg.JSON_FILE_NAME), experiment or cfg.JSON_EXPERIMENT_NAME, new_data)
+
+
+def append_record(filename: Path, experiment: str, data) -> None:
+    """Append the record with one write call, after removing a partial record left by a crash, and update the index."""
+    line = (json.dumps({"experiment": experiment, "data": data}) + "\n").encode("utf-8")
+    filename.parent.mkdir(parents=True, exist_ok=True)
+    index = read_index(filename)
+    file_descriptor = os.open(filename, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        if (offset := os.fstat(file_descriptor).st_size) > index["size"]:  # A crash left a partial record
+            os.truncate(file_descriptor, offset := index["size"])
+        os.write(file_descriptor, line)
+        os.fsync(file_descriptor)
+    finally:
+        os.close(file_descriptor)
+    index["experiments"].setdefault(experiment, []).append(offset)
+    index["size"] = offset + len(line)
+    write_index(filename, index)
+
+
+def read_experiment(experiment: str, filename=None) -> list:
+    """Return the records of the experiment, reading only their lines."""
+    filename = Path(filename or cfg.JSON_FILE_NAME)
+    offsets = read_index(filename)["experiments"].get(experiment, [])
+    records = []
+    with filename.open("rb") as file:
+        for offset in offsets:
+            file.seek(offset)
+            records.append(json.loads(file.readline())["data"])
+    return records
+
+
+def read_experiments(filename=None) -> dict[str, list]:
+    """Return the records of all experiments, in the format of the JSON results files."""
+    filename = Path(filename or cfg.JSON_FILE_NAME)
+    return {experiment: read_experiment(experiment, filename) for experiment in read_index(filename)["experiments"]}
+
+
+def index_filename(filename: Path) -> Path:
+    """Return the name of the index file of the results file."""
+    return filename.with_name(f"{filename.name}.index")
+
+
+def read_index(filename: Path) -> dict:
+    """Return the index of the results file, indexing records appended after the index was last written."""
+    try:
+        index = json.loads(index_filename(filename).read_text(encoding="utf-8"))
+    except (FileNotFoundError, json.JSONDecodeError):
+        index = {"size": 0, "experiments": {}}
+    if not filename.exists() or filename.stat().st_size < index["size"]:  # The results file was replaced
+        index = {"size": 0, "experiments": {}}
+    if filename.exists():
+        with filename.open("rb") as file:
+            file.seek(offset := index["size"])
+            for line in file:
+                if not line.endswith(b"\n"):  # Partial record left by a crash
+                    break
+                index["experiments"].setdefault(json.loads(line)["experiment"], []).append(offset)
+                offset += len(line)
+        index["size"] = offset
+    return index
+
 
-# Import config vars
-with open('config/config.yml', 'r', encoding='utf8') as ymlfile:
-    cfg = box.Box(yaml.safe_load(ymlfile))
+def write_index(filename: Path, index: dict) -> None:
+    """Replace the index file atomically, so readers never see a partial index."""
+    with tempfile.NamedTemporaryFile("w", dir=filename.parent, delete=False, encoding="utf-8") as file:
+        json.dump(index, file)
+    os.replace(file.name, index_filename(filename))
 
 
-def write_json(new_data, filename=cfg.JSON_FILE_NAME) -> None:
-    """Write the summaries to the results file."""
-    if Path(filename).exists():
-        with open(filename) as file:
-            file_data = json.load(file)
-    else:
-        file_data = {}
+def convert_json(json_filename: Path, jsonl_filename: Path | None = None) -> Path:
+    """Convert a JSON results file, with a list of records per experiment, to a JSON Lines results file."""
+    jsonl_filename = jsonl_filename or json_filename.with_suffix(".jsonl")
+    with json_filename.open(encoding="utf-8") as file:
+        file_data = json.load(file)
+    for experiment, records in file_data.items():
+        for record in records:
+            append_record(jsonl_filename, experiment, record)
+    return jsonl_filename
 
-    # Join new_data with file_data inside chosen experiment
-    file_data.setdefault(cfg.JSON_EXPERIMENT_NAME, []).append(new_data)
 
-    with open(filename, "w") as file:
-        json.dump(file_data, file, indent = 4)
+if __name__ == "__main__":
+    # Convert the JSON results files given as arguments, for example: python -m src.add_to_JSON metrics/*.json
+    for json_filename in sys.argv[1:]:
+        print(f"Converted {json_filename} to {convert_json(Path(json_filename))}")
@@ -0,0 +1,145 @@
+"""Run LLM requests as offline batch jobs, trading latency for throughput and lower cost.
+
+Requests are written to a JSONL batch file in the OpenAI batch format, submitted through a batch backend, and the
+answers are read from the JSONL results file the backend produces.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import shutil
+import time
+import uuid
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any, Protocol
+
+from src.token_counter import ROLES
+
+FINAL_STATUSES = ("completed", "failed", "expired", "cancelled")
+
+
+class BatchBackend(Protocol):
+    """Service that runs batch files."""
+
+    def submit(self, requests_file: Path) -> str:
+        """Submit the batch file and return the id of the batch job."""
+
+    def collect(self, batch_id: str, results_file: Path) -> None:
+        """Wait for the batch job to finish and write its results to the results file."""
+
+
+class OpenAIBatchBackend:
+    """Run batch files with the OpenAI batch API."""
+
+    def __init__(self, poll_interval: float = 60.0, completion_window: str = "24h") -> None:
+        from openai import OpenAI
+
+        self.client = OpenAI()
+        self.poll_interval = poll_interval
+        self.completion_window = completion_window
+
+    def submit(self, requests_file: Path) -> str:
+        """Upload the batch file and create the batch job."""
+        with requests_file.open("rb") as batch_file:
+            uploaded_file = self.client.files.create(file=batch_file, purpose="batch")
+        with requests_file.open(encoding="utf-8") as batch_file:
+            endpoint = json.loads(batch_file.readline())["url"]
+        batch = self.client.batches.create(
+            input_file_id=uploaded_file.id, endpoint=endpoint, completion_window=self.completion_window
+        )
+        return batch.id
+
+    def collect(self, batch_id: str, results_file: Path) -> None:
+        """Poll the batch job until it is finished and download the results and errors."""
+        while (batch := self.client.batches.retrieve(batch_id)).status not in FINAL_STATUSES:
+            logging.info("Batch %s is %s", batch_id, batch.status)
+            time.sleep(self.poll_interval)
+        logging.info("Batch %s is %s", batch_id, batch.status)
+        contents = [self.client.files.content(file_id).text for file_id in (batch.output_file_id, batch.error_file_id) if file_id]
+        results_file.write_text("".join(contents), encoding="utf-8")
+
+
+class LocalFileBackend:
+    """Run batch files locally by answering each request with a function. Stand-in for a batch service in tests."""
+
+    def __init__(self, directory: Path, answer: Callable[[dict[str, Any]], str]) -> None:
+        self.directory = directory
+        self.answer = answer
+
+    def submit(self, requests_file: Path) -> str:
+        """Copy the batch file to the directory, as if uploading it."""
+        batch_id = f"batch_{uuid.uuid4().hex}"
+        self.directory.mkdir(parents=True, exist_ok=True)
+        shutil.copy(requests_file, self.directory / f"{batch_id}.jsonl")
+        return batch_id
+
+    def collect(self, batch_id: str, results_file: Path) -> None:
+        """Answer the requests in the copied batch file."""
+        with (self.directory / f"{batch_id}.jsonl").open(encoding="utf-8") as requests:
+            results = [self.result(json.loads(line)) for line in requests]
+        results_file.write_text("".join(json.dumps(result) + "\n" for result in results), encoding="utf-8")
+
+    def result(self, request: dict[str, Any]) -> dict[str, Any]:
+        """Return the result of one request, in the format of the OpenAI batch API."""
+        answer = self.answer(request["body"])
+        choice = {"text": answer} if request["url"] == "/v1/completions" else {"message": {"role": "assistant", "content": answer}}
+        response = {"status_code": 200, "body": {"choices": [choice]}}
+        return {"id": f"result_{uuid.uuid4().hex}", "custom_id": request["custom_id"], "response": response, "error": None}
+
+
+def run_batch(requests: dict[str, tuple[Any, Any]], backend: BatchBackend, requests_file: Path) -> dict[str, str]:
+    """Run the requests, given as custom id to LLM client and prompt, as one batch job. Return the answers by custom id.
+
+    Requests that failed have no answer.
+    """
+    if not requests:
+        return {}
+    write_requests(requests, requests_file)
+    results_file = requests_file.with_name(f"{requests_file.stem}.results.jsonl")
+    batch_id = backend.submit(requests_file)
+    logging.info("Submitted %d requests as batch %s", len(requests), batch_id)
+    backend.collect(batch_id, results_file)
+    answers = read_answers(results_file)
+    if failed := len(requests) - len(answers):
+        logging.warning("Batch %s: %d of %d requests failed", batch_id, failed, len(requests))
+    return answers
+
+
+def write_requests(requests: dict[str, tuple[Any, Any]], requests_file: Path) -> None:
+    """Write the requests to the batch file."""
+    requests_file.parent.mkdir(parents=True, exist_ok=True)
+    with requests_file.open("w", encoding="utf-8") as batch_file:
+        for custom_id, (llm, prompt) in requests.items():
+            batch_file.write(json.dumps(batch_request(custom_id, llm, prompt)) + "\n")
+
+
+def batch_request(custom_id: str, llm, prompt) -> dict[str, Any]:
+    """Return the batch request for the prompt, using the model settings of the LLM client."""
+    body: dict[str, Any] = {"model": llm.model_name, "temperature": llm.temperature, "max_tokens": llm.max_tokens}
+    if isinstance(prompt, str):
+        url = "/v1/completions"
+        body["prompt"] = prompt
+    else:
+        url = "/v1/chat/completions"
+        body["messages"] = [{"role": ROLES.get(message.type, message.type), "content": message.content} for message in prompt]
+    return {"custom_id": custom_id, "method": "POST", "url": url, "body": body}
+
+
+def read_answers(results_file: Path) -> dict[str, str]:
+    """Read the answers from the results file, skipping failed requests."""
+    answers = {}
+    with results_file.open(encoding="utf-8") as results:
+        for line in results:
+            if not line.strip():
+                continue
+            result = json.loads(line)
+            response = result.get("response") or {}
+            if result.get("error") or response.get("status_code") != 200:
+                logging.warning("Request %s failed: %s", result.get("custom_id"), result.get("error") or response)
+                continue
+            choice = response["body"]["choices"][0]
+            # Completions start with whitespace and chat messages may end with it; strip both, so the endpoints agree
+            answers[result["custom_id"]] = (choice["message"]["content"] if "message" in choice else choice["text"]).strip()
+    return answers
@@ -1,14 +1,14 @@
-from langchain_core.prompts import ChatPromptTemplate
+from src.lazy_templates import LazyChatPromptTemplate
 
 #regular chat prompt templates
-chat_code_summary_template = ChatPromptTemplate.from_messages(
+chat_code_summary_template = LazyChatPromptTemplate(
     [
         ("system", "You are a helpful code expert. Your task is analyzing, and concisely summarizing code files."),
         ("user", "Provide a summary for the following code file, don't include generalities, focus on specifics, file name: {file_name}, code: {code}"),
     ]
 )
 
-chat_sum_summary_template = ChatPromptTemplate.from_messages(
+chat_sum_summary_template = LazyChatPromptTemplate(
     [
         ("system", "You are a helpful code expert. Your task is analyzing, and concisely summarizing codebases."),
         ("""The following is a list of summaries describing part of a codebase. 
@@ -23,7 +23,7 @@ chat_sum_summary_template = ChatPromptTemplate.from_messages(
 
 
 #one-shot templates include a single example for the model to follow
-one_shot_code_summary_template = ChatPromptTemplate.from_messages(
+one_shot_code_summary_template = LazyChatPromptTemplate(
     [
         ("system", "You are a helpful code expert. Your task is analyzing, and concisely summarizing code files."),
         ( "user", """Provide a summary for the following code file, don't include generalities, focus on specifics. Keep your answer short and concise (max 100 words).
@@ -37,7 +37,7 @@ one_shot_code_summary_template = ChatPromptTemplate.from_messages(
     ]
 )
 
-one_shot_sum_summary_template = ChatPromptTemplate.from_messages(
+one_shot_sum_summary_template = LazyChatPromptTemplate(
     [
         ("system", "You are a helpful code expert. Your task is analyzing, and concisely summarizing codebases."),
         ("user", """The following is a list of summaries describing part of a codebase. 
@@ -59,6 +59,18 @@ one_shot_sum_summary_template = ChatPromptTemplate.from_messages(
 )
 
 
+one_shot_batch_code_summary_template = LazyChatPromptTemplate(
+    [
+        ("system", "You are a helpful code expert. Your task is analyzing, and concisely summarizing code files."),
+        ( "user", """Provide a summary for each of the following code files, don't include generalities, focus on specifics. Keep each answer short and concise (max 100 words). Start the summary of each file with a line containing only ### File followed by the number of the file.
+        {example_files}"""),
+        ("ai", """{example_answer}"""),
+        ( "user", """Provide a summary for each of the following code files, don't include generalities, focus on specifics. Keep each answer short and concise (max 100 words) and follow the the same structure as your previous answer. Start the summary of each file with a line containing only ### File followed by the number of the file.
+        {files}"""),
+    ]
+)
+
+
 #dictionaries containing examples for one shot prompt
 one_shot_code_example = {
     'answer': """
@@ -132,4 +144,16 @@ def one_shot_sum_summary_prompt(component, summaries):
                                             summaries=summaries,
                                             example_component=example_component,
                                             example_summaries=example_summaries,
-                                            example_answer=example_answer)
\ No newline at end of file
+                                            example_answer=example_answer)
+
+def one_shot_batch_code_summary_prompt(files):
+    example_files = batch_files_text([(one_shot_code_example["file_name"], one_shot_code_example["code"])])
+    example_answer = f"### File 1\n{one_shot_code_example['answer']}"
+    return one_shot_batch_code_summary_template.format_messages(
+                                            files=batch_files_text(files),
+                                            example_files=example_files,
+                                            example_answer=example_answer)
+
+def batch_files_text(files):
+    """Number the files and delimit their code, so the summaries in the answer can be matched with the files"""
+    return "\n".join(f"File {index}: {file_name}\n```{code}```" for index, (file_name, code) in enumerate(files, start=1))
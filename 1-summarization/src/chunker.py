@@ -0,0 +1,105 @@
+"""Split text that is too big for one prompt into chunks that fit a token budget.
+
+Python code is split at class and function boundaries, other text at line boundaries. Chunks are balanced, so the
+map step of a map-reduce chain gets chunks of similar size instead of several full chunks and one small remainder.
+"""
+
+from __future__ import annotations
+
+import ast
+import math
+from collections.abc import Sequence
+
+from src.token_counter import count_tokens_batch
+
+CHUNK_SIZE_STEPS = 16
+
+
+def chunk_text(text: str, max_tokens: int, model: str, file_name: str = "") -> list[str]:
+    """Split the text into chunks of at most max_tokens tokens."""
+    lines = text.splitlines(keepends=True)
+    segments = python_segments(text, lines, max_tokens, model) if file_name.endswith(".py") else lines
+    return pack_segments(segments, max_tokens, model)
+
+
+def pack_segments(segments: Sequence[str], max_tokens: int, model: str) -> list[str]:
+    """Pack consecutive segments into as few balanced chunks of at most max_tokens tokens as possible."""
+    segments, counts = _fit_segments(segments, max_tokens, model)
+    number_of_chunks = len(_pack(segments, counts, max_tokens))
+    # Find the smallest chunk size that still needs no more chunks than packing the chunks as full as possible
+    low, high = max([math.ceil(sum(counts) / max(number_of_chunks, 1))] + counts), max_tokens
+    while low < high:
+        middle = (low + high) // 2
+        if len(_pack(segments, counts, middle)) <= number_of_chunks:
+            high = middle
+        else:
+            low = middle + 1
+    # Round the chunk size up so that a small edit usually doesn't move the chunk boundaries, and cached map outputs
+    # of the other chunks stay valid
+    step = max(1, max_tokens // CHUNK_SIZE_STEPS)
+    return _pack(segments, counts, min(max_tokens, math.ceil(high / step) * step))
+
+
+def python_segments(text: str, lines: list[str], max_tokens: int, model: str) -> list[str]:
+    """Split Python code at the start of top-level statements; split classes that are too big at their methods."""
+    try:
+        tree = ast.parse(text)
+    except (SyntaxError, ValueError):
+        return lines
+    return _node_segments(lines, tree.body, 0, len(lines), max_tokens, model)
+
+
+def _node_segments(
+    lines: list[str], nodes: list[ast.stmt], start: int, end: int, max_tokens: int, model: str
+) -> list[str]:
+    """Split lines[start:end] at the start of the nodes. Comments and decorators stay with the node they precede."""
+    starts = [start] + [_first_line(node) for node in nodes if _first_line(node) > start] + [end]
+    segments = []
+    for segment_start, segment_end in zip(starts, starts[1:]):
+        segment = "".join(lines[segment_start:segment_end])
+        node = next((node for node in nodes if segment_start <= _first_line(node) < segment_end), None)
+        if isinstance(node, ast.ClassDef) and count_tokens_batch([segment], model)[0] > max_tokens:
+            segments.extend(_node_segments(lines, node.body, segment_start, segment_end, max_tokens, model))
+        elif segment:
+            segments.append(segment)
+    return segments
+
+
+def _first_line(node: ast.stmt) -> int:
+    """Return the zero-based index of the first line of the node, including its decorators."""
+    decorators = getattr(node, "decorator_list", [])
+    return min([node.lineno] + [decorator.lineno for decorator in decorators]) - 1
+
+
+def _fit_segments(segments: Sequence[str], max_tokens: int, model: str) -> tuple[list[str], list[int]]:
+    """Split segments that are bigger than max_tokens into lines, and lines that are too big into pieces."""
+    fitting, fitting_counts = [], []
+    for segment, count in zip(segments, count_tokens_batch(segments, model)):
+        if count <= max_tokens:
+            fitting.append(segment)
+            fitting_counts.append(count)
+        elif "\n" in segment.rstrip("\n"):
+            sub_segments, sub_counts = _fit_segments(segment.splitlines(keepends=True), max_tokens, model)
+            fitting.extend(sub_segments)
+            fitting_counts.extend(sub_counts)
+        else:
+            pieces = math.ceil(count / max_tokens) + 1  # Characters per token vary, so leave some room
+            size = math.ceil(len(segment) / pieces)
+            sub_segments = [segment[index:index + size] for index in range(0, len(segment), size)]
+            fitting.extend(sub_segments)
+            fitting_counts.extend(count_tokens_batch(sub_segments, model))
+    return fitting, fitting_counts
+
+
+def _pack(segments: list[str], counts: list[int], max_tokens: int) -> list[str]:
+    """Pack consecutive segments greedily into chunks of at most max_tokens tokens."""
+    chunks, chunk, chunk_tokens = [], [], 0
+    for segment, count in zip(segments, counts):
+        if chunk and chunk_tokens + count > max_tokens:
+            chunks.append("".join(chunk))
+            chunk, chunk_tokens = [], 0
+        chunk.append(segment)
+        chunk_tokens += count
+    if chunk:
+        chunks.append("".join(chunk))
+    return chunks
@@ -1,6 +1,9 @@
 from __future__ import annotations
 from typing import TypedDict
 
+from src.governor import ThrottleMetrics
+from src.similarity import SimilarityMetrics
+
 
 class Summary(TypedDict):
     """A summary of a code file, component, application, or complete system."""
@@ -9,6 +12,7 @@ class Summary(TypedDict):
     summary: str
     summaries: list[Summary]
     details: Configurations
+    metrics: NodeMetrics
     
 
 class Configurations(TypedDict):
@@ -19,4 +23,27 @@ class Configurations(TypedDict):
     max_base_tokens_summaries: int
     model_type: str
     model_name: str
-    prompts: dict
\ No newline at end of file
+    prompts: dict
+    llm_metrics: RunMetrics
+    llm_throttling: ThrottleMetrics
+    similar_reuse: SimilarityMetrics
+
+
+class NodeMetrics(TypedDict):
+    """Metrics of the LLM calls for one summary"""
+
+    calls: int
+    cache_hits: int
+    latency: float  # Seconds
+    prompt_tokens: int
+    completion_tokens: int
+    cost: float  # Dollars
+    retries: int
+
+
+class RunMetrics(NodeMetrics):
+    """Metrics of the LLM calls of a run, with latency percentiles"""
+
+    latency_p50: float
+    latency_p95: float
+    latency_p99: float
\ No newline at end of file
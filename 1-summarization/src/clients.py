@@ -0,0 +1,52 @@
+"""Registry of LLM clients, so each client and its HTTP connection pool is created once per process."""
+
+from __future__ import annotations
+
+import threading
+from collections.abc import Callable
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    import httpx
+
+_clients: dict[tuple, Any] = {}
+_http_client: httpx.Client | None = None
+_lock = threading.Lock()
+
+
+def get_client(client_class: Callable[..., Any], **params: Any) -> Any:
+    """Return the client of the given class for the parameters, creating it on first use.
+
+    All clients share one synchronous HTTP client so connections, and their TLS sessions, are reused across models
+    and parameters. Async clients are created per LLM client because async connections belong to an event loop.
+    Clients don't retry failed requests themselves; the governor retries them, see src/metrics.py.
+    """
+    key = (client_class, tuple(sorted(params.items())))
+    with _lock:
+        if key not in _clients:
+            _clients[key] = client_class(http_client=_get_http_client(), max_retries=0, **params)
+        return _clients[key]
+
+
+def clear_clients() -> None:
+    """Close the shared HTTP client and forget the clients."""
+    global _http_client
+    with _lock:
+        if _http_client is not None:
+            _http_client.close()
+        _http_client = None
+        _clients.clear()
+
+
+def _get_http_client() -> httpx.Client:
+    """Return the shared HTTP client. Must be called with the lock held."""
+    global _http_client
+    if _http_client is None:
+        import httpx
+
+        _http_client = httpx.Client(
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+            timeout=httpx.Timeout(600.0, connect=5.0),  # The defaults of the OpenAI client
+            follow_redirects=True,
+        )
+    return _http_client
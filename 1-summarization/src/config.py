@@ -0,0 +1,28 @@
+"""Read the configuration from config/config.yml once, when a setting is first used."""
+
+from __future__ import annotations
+
+from functools import cache
+from typing import Any
+
+CONFIG_FILE_NAME = "config/config.yml"
+
+
+class Config:
+    """Proxy for the configuration that reads the configuration file when a setting is first used."""
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(load_config(), name)
+
+
+@cache
+def load_config():
+    """Read the configuration file."""
+    import box
+    import yaml
+
+    with open(CONFIG_FILE_NAME, "r", encoding="utf8") as ymlfile:
+        return box.Box(yaml.safe_load(ymlfile))
+
+
+cfg = Config()
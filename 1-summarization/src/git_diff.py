@@ -0,0 +1,60 @@
+"""Find the files that changed since a revision, using git instead of walking and hashing the tree."""
+
+from __future__ import annotations
+
+import subprocess
+from pathlib import Path
+from typing import NamedTuple
+
+from src.tree_index import FileInfo
+
+
+class GitChanges(NamedTuple):
+    """The changes in the working tree since a revision, with the files of the working tree according to git."""
+
+    changed: set[Path]  # Added, modified, and deleted files, and renamed files whose contents changed
+    renames: dict[Path, Path]  # Old path to new path of renamed files
+    files: dict[Path, FileInfo]
+
+
+def git(root: Path, *args: str) -> list[str]:
+    """Run the git command in the root and return the NUL-separated fields of its output."""
+    output = subprocess.run(["git", "-C", str(root), *args], capture_output=True, check=True).stdout
+    return [field for field in output.decode("utf-8", errors="surrogateescape").split("\0") if field]
+
+
+def git_changes(root: Path, revision: str) -> GitChanges:
+    """Return the changes of the files below the root since the revision, including uncommitted and untracked files.
+
+    Files are listed from the git objects, so their sizes are those of the committed versions. Files that are not
+    changed are not accessed: their modification time and inode are unknown, and zero.
+    """
+    changed: set[Path] = set()
+    renames: dict[Path, Path] = {}
+    fields = iter(git(root, "diff", "--name-status", "-z", "-M", "--relative", revision))
+    for status in fields:
+        if status[0] in "RC":  # Renamed or copied, with a similarity percentage, old path, and new path
+            old_path, new_path = root / next(fields), root / next(fields)
+            if status[0] == "R":
+                renames[old_path] = new_path
+            if status[0] == "C" or status != "R100":
+                changed.add(new_path)
+        else:
+            changed.add(root / next(fields))
+    files = {}
+    fields = iter(git(root, "ls-tree", "-r", "-l", "-z", "HEAD"))
+    for entry in fields:
+        mode_type_object_size, path = entry.split("\t", 1)
+        _, object_type, _, size = mode_type_object_size.split()
+        if object_type == "blob" and size != "-":
+            files[root / path] = FileInfo(int(size), 0, 0)
+    changed.update(root / path for path in git(root, "ls-files", "-z", "--others", "--exclude-standard"))
+    for path in changed | set(renames.values()):
+        if path.is_file():
+            stat = path.stat()
+            files[path] = FileInfo(stat.st_size, stat.st_mtime_ns, stat.st_ino)
+        else:  # Deleted
+            files.pop(path, None)
+    for old_path in renames:
+        files.pop(old_path, None)
+    return GitChanges(changed, renames, files)
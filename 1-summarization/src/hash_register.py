@@ -1,19 +1,58 @@
 """Keep track of the hash of files and summaries to prevent needless updates."""
 
+from __future__ import annotations
+
+import sqlite3
+import threading
+from collections import OrderedDict
+from collections.abc import Iterator, MutableMapping, Sequence
 from hashlib import md5
-from json import dump, load
+from json import dump, dumps, load, loads
 from pathlib import Path
 
+from src.similarity import MinHasher, SimilarityIndex, SimilarityMetrics
+
+MAX_CACHED_ENTRIES = 10_000  # Entries of the SQLite hashes kept in memory, least recently used first out
+
 
 class HashRegister:
-    """Keep track of changes to input-output pairs."""
+    """Keep track of changes to input-output pairs.
+
+    For files, the register can also keep the size, modification time, and inode of the file. Unless the register is
+    paranoid, a file whose stat data did not change is considered unchanged without reading and hashing it.
+
+    Outputs can also be registered by the hash of their input, so identical inputs at different keys share an output.
+    With a similarity index, the outputs of nearly the same inputs can be found too.
+    """
 
-    def __init__(self, hashes: dict[str, tuple[str, str]]) -> None:
+    def __init__(self, hashes: MutableMapping[str, tuple], paranoid: bool = False, similar: SimilarityIndex | None = None) -> None:
         self.hashes = hashes
+        self.paranoid = paranoid
+        self.similar = similar
+        self.content_lookups = 0
+        self.content_hits = 0
+        self.similar_lookups = 0
+        self.similar_hits = 0
+        self.similarity_sum = 0.0
+        self.lock = threading.Lock()
 
-    def set(self, key: str, input: str, output: str) -> None:
-        """Register the pair."""
-        self.hashes[key] = (self._hash(input), output)
+    def set(self, key: str, input: str, output: str, stat: Sequence[int] | None = None) -> None:
+        """Register the pair, and the stat data of the input file if given."""
+        self.hashes[key] = (self._hash(input), output) if stat is None else (self._hash(input), output, list(stat))
+
+    def set_stat(self, key: str, stat: Sequence[int]) -> None:
+        """Register new stat data for a file whose contents did not change."""
+        self.hashes[key] = (*self.hashes[key][:2], list(stat))
+
+    def rename(self, old_key: str, new_key: str) -> bool:
+        """Move the pair at the old key to the new key, without the stat data. Return whether the old key was registered."""
+        if old_key not in self.hashes:
+            return False
+        self.hashes[new_key] = tuple(self.hashes[old_key][:2])
+        del self.hashes[old_key]
+        if self.similar is not None:
+            self.similar.rename(old_key, new_key)
+        return True
 
     def get(self, key) -> str:
         """Return the output for the key."""
@@ -25,6 +64,70 @@ class HashRegister:
             return True
         return self._hash(input) != self.hashes[key][0]
 
+    def is_stat_unchanged(self, key: str, stat: Sequence[int]) -> bool:
+        """Return whether the stat data of the file is the same as registered, meaning the file need not be read."""
+        if self.paranoid or key not in self.hashes:
+            return False
+        entry = self.hashes[key]
+        return len(entry) > 2 and entry[2] is not None and list(entry[2]) == list(stat)
+
+    def find_by_content(self, namespace: str, input: str) -> str | None:
+        """Return the output registered for the same input in the namespace, if any."""
+        key = self._content_key(namespace, input)
+        found = key in self.hashes
+        with self.lock:
+            self.content_lookups += 1
+            self.content_hits += found
+        return self.hashes[key][1] if found else None
+
+    def set_content(self, namespace: str, input: str, output: str) -> None:
+        """Register the output for the input in the namespace, independent of the key of the input."""
+        self.set(self._content_key(namespace, input), input, output)
+
+    def content_hit_rate(self) -> float:
+        """Return the fraction of content lookups that found an output."""
+        return self.content_hits / self.content_lookups if self.content_lookups else 0.0
+
+    def find_similar(self, namespace: str, key: str, input: str) -> tuple[str, str] | None:
+        """Return the key and output of a registered input at another key in the namespace that is nearly the same as
+        the input, if any.
+
+        The input at the key itself is not a candidate, so an edited input is never considered nearly the same as its
+        previous version. Only inputs that are still registered with the same hash at their key are candidates.
+        """
+        if self.similar is None:
+            return None
+        found = None
+        for other_key, similarity, hash in self.similar.find(namespace, input):
+            if other_key != key and other_key in self.hashes and self.hashes[other_key][0] == hash:
+                found = other_key, similarity
+                break
+        with self.lock:
+            self.similar_lookups += 1
+            self.similar_hits += found is not None
+            self.similarity_sum += found[1] if found else 0.0
+        return None if found is None else (found[0], self.get(found[0]))
+
+    def set_similar(self, namespace: str, key: str, input: str) -> None:
+        """Register the input at the key in the similarity index, if any, so nearly the same inputs can find its output."""
+        if self.similar is not None:
+            self.similar.add(key, namespace, input, self._hash(input))
+
+    def similarity_metrics(self) -> SimilarityMetrics:
+        """Return the threshold and the hit rate of the lookups of nearly the same inputs."""
+        with self.lock:
+            return SimilarityMetrics(
+                threshold=self.similar.threshold if self.similar is not None else 0.0,
+                lookups=self.similar_lookups,
+                hits=self.similar_hits,
+                hit_rate=self.similar_hits / self.similar_lookups if self.similar_lookups else 0.0,
+                mean_similarity=self.similarity_sum / self.similar_hits if self.similar_hits else 0.0,
+            )
+
+    def _content_key(self, namespace: str, input: str) -> str:
+        """Return the key for the input in the namespace."""
+        return f"content@{namespace}@{self._hash(input)}"
+
     @staticmethod
     def _hash(input: str) -> str:
         """Create a hash for the input value."""
@@ -44,4 +147,115 @@ def load_hashes(file_path: Path) -> HashRegister:
 def save_hashes(file_path: Path, hash_register: HashRegister) -> None:
     """Save the hashes."""
     with file_path.open("w") as fd:
-        dump(hash_register.hashes, fd)
+        dump(dict(hash_register.hashes), fd)
+
+
+class SQLiteHashes(MutableMapping):
+    """Hashes stored in a SQLite database. Entries are loaded when first needed and committed when set.
+
+    The most recently used entries are cached in memory, so the memory use doesn't grow with the size of the tree.
+    """
+
+    def __init__(self, file_path: Path) -> None:
+        self.connection = sqlite3.connect(file_path, check_same_thread=False, isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS hashes (key TEXT PRIMARY KEY, hash TEXT NOT NULL, output TEXT NOT NULL, stat TEXT)"
+        )
+        columns = [row[1] for row in self.connection.execute("PRAGMA table_info(hashes)")]
+        if "stat" not in columns:  # Database created before the stat data was registered
+            self.connection.execute("ALTER TABLE hashes ADD COLUMN stat TEXT")
+        self.lock = threading.Lock()  # The connection is shared by the threads that summarize files
+        self.cache: OrderedDict[str, tuple] = OrderedDict()
+
+    def __getitem__(self, key: str) -> tuple:
+        """Return the hash, output, and stat data for the key, loading them from the database if needed."""
+        with self.lock:
+            if key in self.cache:
+                self.cache.move_to_end(key)
+                return self.cache[key]
+            row = self.connection.execute("SELECT hash, output, stat FROM hashes WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                raise KeyError(key)
+            hash, output, stat = row
+            return self._cache(key, (hash, output) if stat is None else (hash, output, loads(stat)))
+
+    def __setitem__(self, key: str, value: tuple) -> None:
+        """Store the hash, output, and stat data, if any, for the key and commit them."""
+        stat = dumps(value[2]) if len(value) > 2 else None
+        with self.lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO hashes (key, hash, output, stat) VALUES (?, ?, ?, ?)", (key, value[0], value[1], stat)
+            )
+            self._cache(key, tuple(value))
+
+    def _cache(self, key: str, value: tuple) -> tuple:
+        """Cache the value as the most recently used entry, removing the least recently used entries if needed."""
+        self.cache[key] = value
+        self.cache.move_to_end(key)
+        while len(self.cache) > MAX_CACHED_ENTRIES:
+            self.cache.popitem(last=False)
+        return value
+
+    def __delitem__(self, key: str) -> None:
+        """Remove the key."""
+        with self.lock:
+            if self.connection.execute("DELETE FROM hashes WHERE key = ?", (key,)).rowcount == 0:
+                raise KeyError(key)
+            self.cache.pop(key, None)
+
+    def __contains__(self, key: object) -> bool:
+        """Return whether the key is stored."""
+        try:
+            self[key]
+        except KeyError:
+            return False
+        return True
+
+    def __iter__(self) -> Iterator[str]:
+        """Return an iterator over the keys."""
+        with self.lock:
+            keys = [row[0] for row in self.connection.execute("SELECT key FROM hashes")]
+        return iter(keys)
+
+    def __len__(self) -> int:
+        """Return the number of keys."""
+        with self.lock:
+            return self.connection.execute("SELECT COUNT(*) FROM hashes").fetchone()[0]
+
+    def import_json(self, file_path: Path) -> None:
+        """Import the hashes from a JSON hashes file, in one transaction."""
+        with file_path.open() as fd:
+            hashes = load(fd)
+        with self.lock, self.connection:  # The connection rolls back the transaction if the import fails
+            self.connection.execute("BEGIN")
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO hashes (key, hash, output) VALUES (?, ?, ?)",
+                [(key, value[0], value[1]) for key, value in hashes.items()],
+            )
+
+    def close(self) -> None:
+        """Close the database."""
+        with self.lock:
+            self.connection.close()
+
+
+def open_hashes_database(
+    file_path: Path, json_file_path: Path | None = None, paranoid: bool = False, similarity_threshold: float | None = None,
+    shingle_words: int = 5, similarity_max_characters: int = 1048576,
+) -> HashRegister:
+    """Open the hashes database. Import the JSON hashes file, if any, when the database is new.
+
+    With a similarity threshold, the database also keeps a similarity index, to find the outputs of nearly the same inputs.
+    """
+    hashes = SQLiteHashes(file_path)
+    if json_file_path and json_file_path.exists() and len(hashes) == 0:
+        hashes.import_json(json_file_path)
+    similar = None
+    if similarity_threshold is not None:
+        similar = SimilarityIndex(
+            hashes.connection, hashes.lock, similarity_threshold, MinHasher(shingle_words=shingle_words),
+            max_characters=similarity_max_characters,
+        )
+    return HashRegister(hashes, paranoid, similar)
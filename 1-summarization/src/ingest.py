@@ -0,0 +1,70 @@
+"""Read source files to summarize, skipping binary and minified files and capping the amount of text read."""
+
+from __future__ import annotations
+
+import codecs
+import logging
+from pathlib import Path
+
+SNIFF_BYTES = 8192  # Number of bytes at the start of a file used to recognize binary and minified files
+READ_CHUNK_BYTES = 65536
+MAX_CONTROL_CHARACTER_RATIO = 0.1  # Text files have (almost) no control characters other than whitespace
+MIN_MINIFIED_LINE_LENGTH = 500  # Average line length from which a file is considered minified
+TEXT_CONTROL_CHARACTERS = b"\t\n\r\f\b"
+TRUNCATION_MARKER = "\n... (truncated)"
+
+
+def read_source(path: Path, max_bytes: int) -> str | None:
+    """Return the text of the file, or None if the file is binary or minified.
+
+    At most max_bytes bytes are read, in chunks. Text that is not valid UTF-8 is decoded with replacement characters.
+    """
+    with path.open("rb") as source_file:
+        head = source_file.read(min(SNIFF_BYTES, max_bytes))
+        if reason := sniff(head):
+            logging.info("Skipping %s: %s", path, reason)
+            return None
+        errors = "strict" if is_utf8(head) else "replace"
+        if errors == "replace":
+            logging.info("Decoding %s with replacement characters: not valid UTF-8", path)
+        decoder = codecs.getincrementaldecoder("utf-8")(errors=errors)
+        parts = [decoder.decode(head)]
+        remaining = max_bytes - len(head)
+        while remaining > 0 and (chunk := source_file.read(min(READ_CHUNK_BYTES, remaining))):
+            try:
+                parts.append(decoder.decode(chunk))
+            except UnicodeDecodeError:  # Invalid UTF-8 after the start of the file
+                buffered, _ = decoder.getstate()  # The start of a character split over the previous and this chunk
+                decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+                parts.append(decoder.decode(buffered + chunk))
+            remaining -= len(chunk)
+        truncated = remaining <= 0 and source_file.read(1) != b""
+    try:
+        parts.append(decoder.decode(b"", final=not truncated))
+    except UnicodeDecodeError:  # The file ends in the middle of a character
+        parts.append("\ufffd")
+    if truncated:
+        logging.warning("Truncating %s to %d bytes", path, max_bytes)
+        parts.append(TRUNCATION_MARKER)
+    return "".join(parts)
+
+
+def sniff(head: bytes) -> str:
+    """Return the reason to skip the file that starts with head, or an empty string if the file can be summarized."""
+    if b"\0" in head:
+        return "binary"
+    control_characters = sum(1 for byte in head if (byte < 32 and byte not in TEXT_CONTROL_CHARACTERS) or byte == 127)
+    if head and control_characters / len(head) > MAX_CONTROL_CHARACTER_RATIO:
+        return "binary"
+    if len(head) == SNIFF_BYTES and len(head) / (head.count(b"\n") + 1) >= MIN_MINIFIED_LINE_LENGTH:
+        return "minified"
+    return ""
+
+
+def is_utf8(head: bytes) -> bool:
+    """Return whether the start of the file is valid UTF-8. The head may end in the middle of a character."""
+    try:
+        codecs.getincrementaldecoder("utf-8")().decode(head, final=False)
+    except UnicodeDecodeError:
+        return False
+    return True
@@ -0,0 +1,44 @@
+"""Prompt templates that import LangChain and build the template when it is first used.
+
+Importing LangChain takes most of the startup time of the command line interface, so the prompt template modules
+don't import it until a prompt is actually formatted.
+"""
+
+from __future__ import annotations
+
+from functools import cached_property
+from typing import Any
+
+
+class LazyPromptTemplate:
+    """Prompt template, built when first used."""
+
+    def __init__(self, **kwargs: Any) -> None:
+        self.kwargs = kwargs
+
+    @cached_property
+    def template(self):
+        """Return the LangChain prompt template."""
+        from langchain.prompts import PromptTemplate
+
+        return PromptTemplate(**self.kwargs)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.template, name)
+
+    def __str__(self) -> str:
+        return str(self.template)
+
+
+class LazyChatPromptTemplate(LazyPromptTemplate):
+    """Chat prompt template, built from messages when first used."""
+
+    def __init__(self, messages: list) -> None:
+        super().__init__(messages=messages)
+
+    @cached_property
+    def template(self):
+        """Return the LangChain chat prompt template."""
+        from langchain_core.prompts import ChatPromptTemplate
+
+        return ChatPromptTemplate.from_messages(self.kwargs["messages"])
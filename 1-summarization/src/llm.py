@@ -1,70 +1,185 @@
-import yaml
-import box
+from __future__ import annotations
 from dotenv import load_dotenv
-from langchain_openai import OpenAI, ChatOpenAI
+import re
+from hashlib import md5
 from pathlib import Path
 
-from src.llm_chains import chain_summarize_summaries
-from src.prompt_templates import code_summary_prompt, summaries_summary_prompt
+from src.clients import get_client
+from src.config import cfg
+from src.hash_register import HashRegister
+from src.metrics import acall_llm, call_llm
+from src.llm_chains import chain_summarize_summaries, achain_summarize_summaries
+from src.prompt_templates import batch_code_summary_prompt, code_summary_prompt, code_template, summaries_summary_prompt
 from src.chat_prompt_templates import chat_code_summary_prompt, chat_sum_summary_prompt, one_shot_code_summary_prompt, one_shot_sum_summary_prompt
+from src.chat_prompt_templates import one_shot_batch_code_summary_prompt, one_shot_code_example, one_shot_code_summary_template
+from src.token_counter import count_message_tokens, count_tokens, count_tokens_batch
 from src.tokens_weighting import max_num_tokens
+from src.tree_index import TreeIndex
 
 #load API key from .env
 load_dotenv()
 
-# Import config vars
-with open('config/config.yml', 'r', encoding='utf8') as ymlfile:
-    cfg = box.Box(yaml.safe_load(ymlfile))
+BATCH_MARKER = re.compile(r"^\W*File (\d+)\W*$", re.MULTILINE)  # The line that starts each summary in a batch answer
+BATCH_MARKER_TOKENS = 5
 
 
-def llm_generate_summary(file_path: Path, code: str) -> str:
+def llm_generate_summary(file_path: Path, code: str, tree_index: TreeIndex | None = None, hash_register: HashRegister | None = None) -> str:
     """Generate a summary of the code, using an LLM."""
-    max_tokens = max_num_tokens(file_path, cfg.BASE_MAX_TOKENS_CODE)
-    if cfg.MODEL_TYPE == "completion":
-        llm = create_llm(max_tokens=max_tokens)
-        prompt = code_summary_prompt(file_path.name, code)
-    else:
-        llm = create_chat_llm(max_tokens=max_tokens)
-        prompt = one_shot_code_summary_prompt(file_path.name, code)
+    llm, prompt = code_summary_request(file_path, code, tree_index)
     if is_prompt_too_big(llm, prompt):
-        output = chain_summarize_summaries(code)
+        output = chain_summarize_summaries(code, file_path.name, hash_register, node=str(file_path))
         return output
-    else:
-        output = llm.invoke(prompt)
-    return output.content #use if llm is not chat: .strip()
+    return call_llm(llm, prompt, str(file_path), "code")
 
 
-def llm_summarize_summary(component_path: Path, summaries: list[str]) -> str:
-    """Generate a summary of summaries, using an LLM."""
-    max_tokens = max_num_tokens(component_path, cfg.BASE_MAX_TOKENS_SUM)
-    if cfg.MODEL_TYPE == "completion":
-        llm = create_llm(max_tokens=max_tokens)
-        prompt = summaries_summary_prompt(component_path.name, summaries)
-    else:
-        llm = create_chat_llm(max_tokens=max_tokens)
-        prompt = one_shot_sum_summary_prompt(component_path.name, summaries)
+async def allm_generate_summary(file_path: Path, code: str, tree_index: TreeIndex | None = None, hash_register: HashRegister | None = None) -> str:
+    """Generate a summary of the code, using an LLM, without blocking the event loop."""
+    llm, prompt = code_summary_request(file_path, code, tree_index)
+    if is_prompt_too_big(llm, prompt):
+        output = await achain_summarize_summaries(code, file_path.name, hash_register, node=str(file_path))
+        return output
+    return await acall_llm(llm, prompt, str(file_path), "code")
+
+
+def llm_generate_summaries(files: list[tuple[Path, str]], tree_index: TreeIndex | None = None) -> list[str | None]:
+    """Generate summaries of several code files with one LLM request.
+
+    Return None for files whose summary could not be found in the answer of the LLM. The call is recorded for the
+    files of the folder of the first file.
+    """
+    max_tokens = sum(max_num_tokens(file_path, cfg.BASE_MAX_TOKENS_CODE, tree_index) for file_path, _ in files)
+    max_tokens += BATCH_MARKER_TOKENS * len(files)
+    llm = create_llm(max_tokens=max_tokens) if cfg.MODEL_TYPE == "completion" else create_chat_llm(max_tokens=max_tokens)
+    prompt = batch_code_prompt([(file_path.name, code) for file_path, code in files])
+    output = call_llm(llm, prompt, f"files@{files[0][0].parent}", "batch")
+    return split_batch_summaries(output, len(files))
+
+
+def batch_files(files: list[tuple]) -> list[list[tuple]]:
+    """Group small files, given as tuples of path, code, and possibly more, into batches that fit the batch token budget.
+
+    Other files get a batch of their own.
+    """
+    batches, batch, batch_tokens = [], [], 0
+    for file, tokens in zip(files, count_tokens_batch([file[1] for file in files], cfg.MODEL_CHAT_NAME)):
+        if tokens > cfg.BATCH_FILE_TOKENS:
+            batches.append([file])
+            continue
+        if batch and batch_tokens + tokens > cfg.BATCH_TOKENS:
+            batches.append(batch)
+            batch, batch_tokens = [], 0
+        batch.append(file)
+        batch_tokens += tokens
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def split_batch_summaries(text: str, number_of_files: int) -> list[str | None]:
+    """Split the answer to a batch code summary prompt into the summaries of the files."""
+    summaries: list[str | None] = [None] * number_of_files
+    parts = BATCH_MARKER.split(text)  # Text before the first marker, then alternating file numbers and summaries
+    for number, summary in zip(parts[1::2], parts[2::2]):
+        if 1 <= int(number) <= number_of_files and summary.strip():
+            summaries[int(number) - 1] = summary.strip()
+    return summaries
+
+
+def llm_summarize_summary(component_path: Path, summaries: list[str], tree_index: TreeIndex | None = None, hash_register: HashRegister | None = None, node: str = "") -> str:
+    """Generate a summary of summaries, using an LLM. The calls are recorded for the node, by default the component."""
+    node = node or str(component_path)
+    llm, prompt = summaries_summary_request(component_path, summaries, tree_index)
     if is_prompt_too_big(llm, prompt):
-        output = chain_summarize_summaries(summaries)
+        output = chain_summarize_summaries(summaries, hash_register=hash_register, node=node)
         return output
+    return call_llm(llm, prompt, node, "summaries")
+
+
+async def allm_summarize_summary(component_path: Path, summaries: list[str], tree_index: TreeIndex | None = None, hash_register: HashRegister | None = None, node: str = "") -> str:
+    """Generate a summary of summaries, using an LLM, without blocking the event loop."""
+    node = node or str(component_path)
+    llm, prompt = summaries_summary_request(component_path, summaries, tree_index)
+    if is_prompt_too_big(llm, prompt):
+        output = await achain_summarize_summaries(summaries, hash_register=hash_register, node=node)
+        return output
+    return await acall_llm(llm, prompt, node, "summaries")
+
+
+def code_summary_namespace() -> str:
+    """Return the model and prompt used to summarize code, so identical code can reuse a summary made the same way."""
+    if cfg.MODEL_TYPE == "completion":
+        model, prompt = cfg.MODEL_NAME, code_template
     else:
-        output = llm.invoke(prompt)
-    return output.content  #use if llm is not chat: .strip()
+        model, prompt = cfg.MODEL_CHAT_NAME, f"{one_shot_code_summary_template}{one_shot_code_example}"
+    return f"{model}@{md5(prompt.encode('utf-8'), usedforsecurity=False).hexdigest()}"
+
+
+def file_content_namespace(namespace: str, file_path: Path) -> str:
+    """Return the namespace to reuse summaries of identical code in: summaries name the file, so per file name."""
+    return f"{namespace}@{file_path.name}"
+
+
+def code_summary_request(file_path: Path, code: str, tree_index: TreeIndex | None = None):
+    """Return the LLM client and the prompt to summarize the code."""
+    max_tokens = max_num_tokens(file_path, cfg.BASE_MAX_TOKENS_CODE, tree_index)
+    llm = create_llm(max_tokens=max_tokens) if cfg.MODEL_TYPE == "completion" else create_chat_llm(max_tokens=max_tokens)
+    return llm, code_prompt(file_path, code)
+
+
+def summaries_summary_request(component_path: Path, summaries: list[str], tree_index: TreeIndex | None = None):
+    """Return the LLM client and the prompt to summarize the summaries."""
+    max_tokens = max_num_tokens(component_path, cfg.BASE_MAX_TOKENS_SUM, tree_index)
+    llm = create_llm(max_tokens=max_tokens) if cfg.MODEL_TYPE == "completion" else create_chat_llm(max_tokens=max_tokens)
+    return llm, summaries_prompt(component_path, summaries)
+
+
+def code_prompt(file_path: Path, code: str):
+    """Return the prompt to summarize the code."""
+    if cfg.MODEL_TYPE == "completion":
+        return code_summary_prompt(file_path.name, code)
+    return one_shot_code_summary_prompt(file_path.name, code)
+
+
+def batch_code_prompt(named_files: list[tuple[str, str]]):
+    """Return the prompt to summarize several code files, given as file name and code, with one request."""
+    if cfg.MODEL_TYPE == "completion":
+        return batch_code_summary_prompt(named_files)
+    return one_shot_batch_code_summary_prompt(named_files)
+
+
+def summaries_prompt(component_path: Path, summaries: list[str]):
+    """Return the prompt to summarize the summaries."""
+    if cfg.MODEL_TYPE == "completion":
+        return summaries_summary_prompt(component_path.name, summaries)
+    return one_shot_sum_summary_prompt(component_path.name, summaries)
+
+
+def model_name() -> str:
+    """Return the name of the model used to summarize."""
+    return cfg.MODEL_NAME if cfg.MODEL_TYPE == "completion" else cfg.MODEL_CHAT_NAME
 
 
 def create_llm(max_tokens):
-    """Create an completions LLM client."""
-    return OpenAI(model=cfg.MODEL_NAME, temperature=cfg.TEMPERATURE, max_tokens=max_tokens)
+    """Return a completions LLM client, reusing the client if one with the same settings exists."""
+    from langchain_openai import OpenAI
+
+    return get_client(OpenAI, model=cfg.MODEL_NAME, temperature=cfg.TEMPERATURE, max_tokens=max_tokens)
 
 def create_chat_llm(max_tokens):
-    """Create a chat LLM client."""
-    return ChatOpenAI(model=cfg.MODEL_CHAT_NAME, temperature=cfg.TEMPERATURE, max_tokens=max_tokens)
+    """Return a chat LLM client, reusing the client if one with the same settings exists."""
+    from langchain_openai import ChatOpenAI
+
+    return get_client(ChatOpenAI, model=cfg.MODEL_CHAT_NAME, temperature=cfg.TEMPERATURE, max_tokens=max_tokens)
 
 def is_prompt_too_big(llm, prompt: str) -> bool:
     """Return whether the prompt has more tokens than fit into the context."""
     return get_num_tokens(prompt) > cfg.CONTEXT_WINDOW
 
 
-def get_num_tokens(input: str) -> int:
-    """Return the number of tokens in prompt or output."""
-    llm = OpenAI(model=cfg.MODEL_NAME)  # FIXME: Add comment explaining why we always use OpenAI to count tokens
-    return llm.get_num_tokens(text=str(input))
+def get_num_tokens(input) -> int:
+    """Return the number of tokens in prompt or output. Chat prompts are counted as messages."""
+    from langchain_core.messages import BaseMessage
+
+    if isinstance(input, list) and all(isinstance(message, BaseMessage) for message in input):
+        return count_message_tokens(input, cfg.MODEL_CHAT_NAME)
+    return count_tokens(str(input), cfg.MODEL_NAME)
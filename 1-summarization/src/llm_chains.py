@@ -1,30 +1,125 @@
-import yaml
-import box
+from hashlib import md5
+from json import dumps, loads
+
 from dotenv import load_dotenv
-from langchain_openai import ChatOpenAI
-from langchain.chains.summarize import load_summarize_chain
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from src.prompt_templates import map_prompt, reduce_prompt
+from src.chunker import chunk_text, pack_segments
+from src.clients import get_client
+from src.config import cfg
+from src.metrics import acall_llm, acall_llm_batch, call_llm, call_llm_batch, recorder
+from src.prompt_templates import map_prompt, map_template, reduce_prompt
+from src.token_counter import count_tokens
 
 #load API key from .env
 load_dotenv()
 
-# Import config vars
-with open('config/config.yml', 'r', encoding='utf8') as ymlfile:
-    cfg = box.Box(yaml.safe_load(ymlfile))
+def create_chain_llm():
+    """Return the chat LLM client of the chain, creating it on first use."""
+    from langchain_openai import ChatOpenAI
 
-llm = ChatOpenAI(model=cfg.MODEL_CHAT_NAME, temperature=cfg.TEMPERATURE, max_tokens=cfg.MAX_TOKENS_CHAIN)
+    return get_client(ChatOpenAI, model=cfg.MODEL_CHAT_NAME, temperature=cfg.TEMPERATURE, max_tokens=cfg.MAX_TOKENS_CHAIN)
 
 #chain function
-def chain_summarize_summaries(text):
-    """Chain that creates chunks out of input and feeds it iteratively to an LLM"""
-    text_splitter = RecursiveCharacterTextSplitter(chunk_size=cfg.CHUNK_SIZE, chunk_overlap=0)
-    chunks = text_splitter.create_documents([text])
-    map_reduce_chain = load_summarize_chain(
-        llm=llm,
-        chain_type="map_reduce",
-        map_prompt= map_prompt,
-        combine_prompt= reduce_prompt,
-        verbose=False)
-    summary = map_reduce_chain.invoke(chunks)
-    return summary["output_text"]
+def chain_summarize_summaries(text, file_name="", hash_register=None, node="", pass_number=0):
+    """Chain that creates chunks out of input, summarizes the chunks concurrently, and then combines the summaries
+
+    If a hash register is given, the summaries of the chunks are cached per node and pass, so only changed chunks are
+    summarized again and the summaries of chunks that are gone are dropped. The LLM calls and cache hits are recorded
+    for the node.
+    """
+    llm = create_chain_llm()
+    chunks = split_into_chunks(text, file_name)
+    outputs = cached_map_outputs(chunks, hash_register, node, pass_number)
+    missing = [chunk for chunk, output in zip(chunks, outputs) if output is None]
+    if missing:
+        prompts = [map_prompt.format(text=chunk) for chunk in missing]
+        responses = call_llm_batch(llm, prompts, node, "map", cfg.MAX_WORKERS)
+        outputs = merge_map_outputs(outputs, missing, responses)
+    cache_map_outputs(chunks, outputs, hash_register, node, pass_number)
+    if needs_another_pass(outputs):
+        return chain_summarize_summaries(outputs, hash_register=hash_register, node=node, pass_number=pass_number + 1)
+    return call_llm(llm, reduce_prompt.format(text=join_map_outputs(outputs)), node, "reduce")
+
+
+async def achain_summarize_summaries(text, file_name="", hash_register=None, node="", pass_number=0):
+    """Chain that creates chunks out of input and summarizes them, without blocking the event loop"""
+    llm = create_chain_llm()
+    chunks = split_into_chunks(text, file_name)
+    outputs = cached_map_outputs(chunks, hash_register, node, pass_number)
+    missing = [chunk for chunk, output in zip(chunks, outputs) if output is None]
+    if missing:
+        prompts = [map_prompt.format(text=chunk) for chunk in missing]
+        responses = await acall_llm_batch(llm, prompts, node, "map", cfg.MAX_WORKERS)
+        outputs = merge_map_outputs(outputs, missing, responses)
+    cache_map_outputs(chunks, outputs, hash_register, node, pass_number)
+    if needs_another_pass(outputs):
+        return await achain_summarize_summaries(
+            outputs, hash_register=hash_register, node=node, pass_number=pass_number + 1
+        )
+    return await acall_llm(llm, reduce_prompt.format(text=join_map_outputs(outputs)), node, "reduce")
+
+
+def cached_map_outputs(chunks, hash_register=None, node="", pass_number=0):
+    """Return the cached map output for each chunk, or None if the chunk has not been summarized before"""
+    if hash_register is None:
+        return [None] * len(chunks)
+    cached = map_output_cache(hash_register, node, pass_number)
+    outputs = [cached.get(chunk_hash(chunk)) for chunk in chunks]
+    for _ in range(len(outputs) - outputs.count(None)):
+        recorder.record_cache_hit(node, "map")
+    return outputs
+
+
+def merge_map_outputs(outputs, missing_chunks, missing_outputs):
+    """Fill in the new map outputs for the chunks without cached output"""
+    new_outputs = iter(missing_outputs)
+    return [next(new_outputs) if output is None else output for output in outputs]
+
+
+def cache_map_outputs(chunks, outputs, hash_register=None, node="", pass_number=0):
+    """Cache the map outputs of the chunks under one key per node and pass, replacing the outputs of previous chunks"""
+    if hash_register is None:
+        return
+    cache = {chunk_hash(chunk): output for chunk, output in zip(chunks, outputs)}
+    key, hashes = map_outputs_key(node, pass_number), dumps(list(cache))
+    if hash_register.is_changed(key, hashes):
+        hash_register.set(key, hashes, dumps(cache))
+
+
+def map_output_cache(hash_register, node="", pass_number=0):
+    """Return the cached map outputs of the node and pass, by chunk hash"""
+    key = map_outputs_key(node, pass_number)
+    return loads(hash_register.get(key)) if key in hash_register.hashes else {}
+
+
+def needs_another_pass(outputs):
+    """Return whether the map outputs are too big to combine in one reduce prompt, and need to be summarized first"""
+    reduce_tokens = count_tokens(reduce_prompt.format(text=join_map_outputs(outputs)), cfg.MODEL_CHAT_NAME)
+    return len(outputs) > 1 and reduce_tokens > chunk_tokens()
+
+
+def join_map_outputs(outputs):
+    """Join the map outputs into the text for the reduce prompt"""
+    return "\n\n".join(outputs)
+
+
+def map_outputs_key(node, pass_number=0):
+    """Return the hash register key for the map outputs of the chunks of the node in the pass"""
+    return f"chunks@{pass_number}@{node}"
+
+
+def chunk_hash(chunk):
+    """Return the hash of the chunk, which depends on the model and the map prompt too"""
+    return md5(f"{cfg.MODEL_CHAT_NAME}{map_template}{chunk}".encode("utf-8"), usedforsecurity=False).hexdigest()
+
+
+def split_into_chunks(text, file_name=""):
+    """Split the code or list of summaries into chunks that each fill the prompt of one map step"""
+    if isinstance(text, list):
+        return pack_segments([f"{summary}\n\n" for summary in text], chunk_tokens(), cfg.MODEL_CHAT_NAME)
+    return chunk_text(text, chunk_tokens(), cfg.MODEL_CHAT_NAME, file_name)
+
+
+def chunk_tokens():
+    """Return the token budget of a chunk: the configured chunk size, limited by what fits in the map prompt"""
+    available = cfg.CONTEXT_WINDOW - count_tokens(map_template, cfg.MODEL_CHAT_NAME) - cfg.MAX_TOKENS_CHAIN
+    return min(cfg.CHUNK_TOKENS, available)
@@ -0,0 +1,174 @@
+"""Record the latency, tokens, cache hits, and retries of LLM calls, and aggregate them per node and per run.
+
+A node is a file, the files of a folder, or a folder, identified by its hash register key. The LLM calls are made
+through the call functions in this module, which record a call record for each call in the recorder of the run. The
+call functions let the shared governor admit and retry the calls, to stay within the rate limits of the provider.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import statistics
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from functools import cache
+from typing import TypedDict
+
+from src.classes import NodeMetrics, RunMetrics
+from src.config import cfg
+from src.governor import Governor
+from src.token_counter import count_message_tokens, count_tokens
+
+
+class CallRecord(TypedDict):
+    """The metrics of one LLM call, or of one cache hit that made an LLM call unnecessary."""
+
+    node: str
+    kind: str  # code, batch, summaries, map, or reduce
+    model: str
+    latency: float  # Seconds
+    prompt_tokens: int
+    completion_tokens: int
+    cache_hit: bool
+    retries: int
+
+
+class MetricsRecorder:
+    """Collect the call records of a run."""
+
+    def __init__(self) -> None:
+        self.records: list[CallRecord] = []
+        self.records_by_node: defaultdict[str, list[CallRecord]] = defaultdict(list)
+        self.lock = threading.Lock()
+
+    def record(self, record: CallRecord) -> None:
+        """Add the call record."""
+        with self.lock:
+            self.records.append(record)
+            self.records_by_node[record["node"]].append(record)
+
+    def record_cache_hit(self, node: str, kind: str) -> None:
+        """Record that the output for the node was found in the cache, so no LLM call was needed."""
+        self.record(CallRecord(node=node, kind=kind, model="", latency=0.0, prompt_tokens=0, completion_tokens=0, cache_hit=True, retries=0))
+
+    def node_metrics(self, node: str) -> NodeMetrics | None:
+        """Return the metrics of the node, or None if nothing was recorded for the node."""
+        with self.lock:
+            records = list(self.records_by_node.get(node, []))
+        return aggregate(records) if records else None
+
+    def run_metrics(self) -> RunMetrics:
+        """Return the metrics of the run, with latency percentiles of the LLM calls."""
+        with self.lock:
+            records = list(self.records)
+        latencies = sorted(record["latency"] for record in records if not record["cache_hit"])
+        p50, p95, p99 = percentiles(latencies, (50, 95, 99))
+        return RunMetrics(**aggregate(records), latency_p50=p50, latency_p95=p95, latency_p99=p99)
+
+    def clear(self) -> None:
+        """Forget the call records, to start a new run."""
+        with self.lock:
+            self.records.clear()
+            self.records_by_node.clear()
+
+
+recorder = MetricsRecorder()
+
+
+def aggregate(records: list[CallRecord]) -> NodeMetrics:
+    """Add up the call records."""
+    calls = [record for record in records if not record["cache_hit"]]
+    return NodeMetrics(
+        calls=len(calls),
+        cache_hits=len(records) - len(calls),
+        latency=sum(record["latency"] for record in calls),
+        prompt_tokens=sum(record["prompt_tokens"] for record in calls),
+        completion_tokens=sum(record["completion_tokens"] for record in calls),
+        cost=sum(cost(record["model"], record["prompt_tokens"], record["completion_tokens"]) for record in calls),
+        retries=sum(record["retries"] for record in calls),
+    )
+
+
+def percentiles(values: list[float], percents: tuple[int, ...]) -> list[float]:
+    """Return the percentiles of the values, or zeros if there are no values."""
+    if len(values) < 2:
+        return [values[0] if values else 0.0] * len(percents)
+    quantiles = statistics.quantiles(values, n=100, method="inclusive")
+    return [quantiles[percent - 1] for percent in percents]
+
+
+def cost(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    """Return the cost in dollars of the tokens, using the prices per 1000 tokens of the model in the configuration."""
+    prompt_price, completion_price = cfg.MODEL_PRICES.get(model, (0.0, 0.0))
+    return (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1000
+
+
+@cache
+def governor() -> Governor:
+    """Return the governor shared by all LLM calls of the process, created on first use."""
+    return Governor(cfg.RATE_LIMIT_REQUESTS_PER_MINUTE, cfg.RATE_LIMIT_TOKENS_PER_MINUTE, cfg.MAX_WORKERS, cfg.MAX_RETRIES)
+
+
+def call_llm(llm, prompt, node: str, kind: str) -> str:
+    """Call the LLM when the governor admits it, and record the call. Return the text of the answer."""
+    prompt_tokens = count_prompt_tokens(prompt, getattr(llm, "model_name", ""))
+    start = time.perf_counter()
+    output, retries = governor().call(lambda: llm.invoke(prompt), prompt_tokens + max_completion_tokens(llm))
+    return record_call(llm, prompt_tokens, output, node, kind, time.perf_counter() - start, retries)
+
+
+async def acall_llm(llm, prompt, node: str, kind: str) -> str:
+    """Call the LLM when the governor admits it, without blocking the event loop, and record the call."""
+    prompt_tokens = count_prompt_tokens(prompt, getattr(llm, "model_name", ""))
+    start = time.perf_counter()
+    output, retries = await governor().acall(lambda: llm.ainvoke(prompt), prompt_tokens + max_completion_tokens(llm))
+    return record_call(llm, prompt_tokens, output, node, kind, time.perf_counter() - start, retries)
+
+
+def max_completion_tokens(llm) -> int:
+    """Return the maximum number of completion tokens of the LLM client, or zero if not limited."""
+    max_tokens = getattr(llm, "max_tokens", None)
+    return max_tokens if isinstance(max_tokens, int) else 0
+
+
+def count_prompt_tokens(prompt, model: str) -> int:
+    """Return the number of tokens of the prompt: text, or chat messages."""
+    return count_message_tokens(prompt, model) if isinstance(prompt, list) else count_tokens(str(prompt), model)
+
+
+def call_llm_batch(llm, prompts: list, node: str, kind: str, max_concurrency: int) -> list[str]:
+    """Call the LLM for each of the prompts, at most max_concurrency at a time, and record each call."""
+    with ThreadPoolExecutor(max_workers=max(1, min(max_concurrency, len(prompts)))) as executor:
+        return list(executor.map(lambda prompt: call_llm(llm, prompt, node, kind), prompts))
+
+
+async def acall_llm_batch(llm, prompts: list, node: str, kind: str, max_concurrency: int) -> list[str]:
+    """Call the LLM for each of the prompts without blocking the event loop, at most max_concurrency at a time."""
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+    async def limited_call(prompt) -> str:
+        async with semaphore:
+            return await acall_llm(llm, prompt, node, kind)
+
+    return list(await asyncio.gather(*(limited_call(prompt) for prompt in prompts)))
+
+
+def record_call(llm, prompt_tokens: int, output, node: str, kind: str, latency: float, retries: int) -> str:
+    """Record the call, with the token usage reported by the API or, if not reported, counted locally."""
+    model = getattr(llm, "model_name", "")
+    text = output.content if hasattr(output, "content") else output  # Completion LLMs return text
+    usage = getattr(output, "response_metadata", None)
+    usage = usage.get("token_usage") if isinstance(usage, dict) else None
+    if isinstance(usage, dict) and "prompt_tokens" in usage:
+        prompt_tokens, completion_tokens = usage["prompt_tokens"], usage.get("completion_tokens", 0)
+    else:
+        completion_tokens = count_tokens(str(text), model)
+    recorder.record(
+        CallRecord(
+            node=node, kind=kind, model=model, latency=latency, prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens, cache_hit=False, retries=retries,
+        )
+    )
+    return text
@@ -0,0 +1,264 @@
+"""Estimate the LLM calls, tokens, cost, and wall time of summarizing a path, without calling the LLM.
+
+The planner walks the tree with the same skip rules and cache checks as the summarizer, but doesn't change the hash
+register. Prompt tokens are counted locally. Completion tokens are estimated with the maximum number of tokens the
+summarizer allows for each answer, so the estimates are upper bounds for answers that fit. Summaries that the run
+would create are not known in advance, so prompts that summarize them count the estimated completion tokens instead.
+"""
+
+from __future__ import annotations
+
+from collections import defaultdict
+from pathlib import Path
+from typing import NamedTuple, TypedDict
+
+from src.config import cfg
+from src.hash_register import HashRegister
+from src.ingest import read_source
+from src.llm import (
+    BATCH_MARKER_TOKENS, batch_code_prompt, batch_files, code_prompt, code_summary_namespace, file_content_namespace, get_num_tokens,
+    model_name, summaries_prompt
+)
+from src.metrics import cost
+from src.token_counter import count_tokens
+from src.tokens_weighting import max_num_tokens
+from src.tree_index import TreeIndex, build_index, file_info
+
+
+class CallEstimate(TypedDict):
+    """The estimate of one LLM call."""
+
+    node: str
+    directory: str
+    kind: str  # code, batch, summaries, map, or reduce
+    model: str
+    prompt_tokens: int
+    completion_tokens: int
+    latency: float  # Seconds
+
+
+class NodeEstimate(NamedTuple):
+    """The estimate of the summary of a node: its size, whether it changes, and when it is ready."""
+
+    summary_tokens: int
+    changed: bool
+    finish_time: float  # Seconds after the start of the run, if LLM calls are not limited by concurrency
+
+
+class Plan:
+    """The estimated LLM calls and cache hits of summarizing a path."""
+
+    def __init__(self, path: Path, concurrency: int) -> None:
+        self.path = path
+        self.concurrency = concurrency
+        self.calls: list[CallEstimate] = []
+        self.cache_hits: defaultdict[str, int] = defaultdict(int)  # Directory to the number of cache hits in it
+        self.critical_path = 0.0  # Seconds
+
+    def totals(self, calls: list[CallEstimate] | None = None) -> dict[str, float]:
+        """Return the number of calls, tokens, cost, and latency of the calls, by default of all calls."""
+        calls = self.calls if calls is None else calls
+        return dict(
+            calls=len(calls),
+            prompt_tokens=sum(call["prompt_tokens"] for call in calls),
+            completion_tokens=sum(call["completion_tokens"] for call in calls),
+            cost=sum(cost(call["model"], call["prompt_tokens"], call["completion_tokens"]) for call in calls),
+            latency=sum(call["latency"] for call in calls),
+        )
+
+    def wall_time(self) -> float:
+        """Return the estimated wall time: the calls divided over the workers, but at least the longest chain of calls."""
+        return max(self.totals()["latency"] / max(1, self.concurrency), self.critical_path)
+
+    def by_directory(self) -> dict[str, dict[str, float]]:
+        """Return the totals of the calls in each directory, excluding the calls in its subdirectories."""
+        calls_by_directory: defaultdict[str, list[CallEstimate]] = defaultdict(list)
+        for call in self.calls:
+            calls_by_directory[call["directory"]].append(call)
+        directories = set(calls_by_directory) | set(self.cache_hits)
+        return {
+            directory: dict(self.totals(calls_by_directory[directory]), cache_hits=self.cache_hits[directory])
+            for directory in directories
+        }
+
+    def by_node(self) -> dict[str, dict[str, float]]:
+        """Return the totals of the calls for each file or folder."""
+        calls_by_node: defaultdict[str, list[CallEstimate]] = defaultdict(list)
+        for call in self.calls:
+            calls_by_node[call["node"]].append(call)
+        return {node: self.totals(calls) for node, calls in calls_by_node.items()}
+
+
+def plan_summary(path: Path, hash_register: HashRegister, concurrency: int, tree_index: TreeIndex | None = None) -> Plan:
+    """Estimate the LLM calls needed to summarize all code in the path."""
+    tree_index = tree_index or build_index(path)
+    plan = Plan(path, concurrency)
+    estimate = plan_path(plan, path, hash_register, tree_index)
+    plan.critical_path = estimate.finish_time if estimate else 0.0
+    return plan
+
+
+def plan_path(plan: Plan, path: Path, hash_register: HashRegister, tree_index: TreeIndex) -> NodeEstimate | None:
+    """Estimate the calls to summarize the path, recursively, like summarize_path."""
+    estimates = [plan_path(plan, subpath, hash_register, tree_index) for subpath in tree_index.subdirs(path)]
+    estimates.append(plan_files(plan, path, hash_register, tree_index))
+    return plan_combination(plan, path, estimates, hash_register, str(path), tree_index)
+
+
+def plan_files(plan: Plan, path: Path, hash_register: HashRegister, tree_index: TreeIndex) -> NodeEstimate | None:
+    """Estimate the calls to summarize the files in the folder, like summarize_files."""
+    estimates: dict[Path, NodeEstimate | None] = {}
+    changed = []
+    namespace = ""
+    for filename in tree_index.files_in(path):
+        key = str(filename)
+        stat = tree_index.stat(filename) if filename in tree_index else file_info(filename)
+        if hash_register.is_stat_unchanged(key, stat):
+            estimates[filename] = cached_estimate(plan, path, hash_register.get(key))
+            continue
+        if (contents := read_source(filename, cfg.MAX_FILE_BYTES)) is None:
+            estimates[filename] = None
+            continue
+        if not hash_register.is_changed(key, contents):
+            estimates[filename] = cached_estimate(plan, path, hash_register.get(key))
+            continue
+        namespace = namespace or code_summary_namespace()
+        if (summary_text := hash_register.find_by_content(file_content_namespace(namespace, filename), contents)) is not None:
+            estimates[filename] = cached_estimate(plan, path, summary_text)
+        elif (similar := hash_register.find_similar(namespace, key, contents)) is not None:
+            estimates[filename] = cached_estimate(plan, path, similar[1])
+        else:
+            changed.append((filename, contents))
+    estimates.update(plan_changed_files(plan, path, changed, hash_register, tree_index))
+    return plan_combination(
+        plan, path, [estimates[filename] for filename in tree_index.files_in(path)], hash_register, f"files@{path}", tree_index
+    )
+
+
+def plan_changed_files(
+    plan: Plan, path: Path, files: list[tuple[Path, str]], hash_register: HashRegister, tree_index: TreeIndex
+) -> dict[Path, NodeEstimate]:
+    """Estimate the calls to summarize the changed files, batching small files like batch_files."""
+    estimates = {}
+    for batch in batch_files(files):
+        if len(batch) == 1:
+            filename, contents = batch[0]
+            estimates[filename] = plan_code(plan, path, filename, contents, hash_register, tree_index)
+            continue
+        completion_tokens = [max_num_tokens(filename, cfg.BASE_MAX_TOKENS_CODE, tree_index) for filename, _ in batch]
+        prompt = batch_code_prompt([(filename.name, contents) for filename, contents in batch])
+        call = add_call(
+            plan, f"files@{path}", path, "batch", get_num_tokens(prompt),
+            sum(completion_tokens) + BATCH_MARKER_TOKENS * len(batch), model_name()
+        )
+        for (filename, _), tokens in zip(batch, completion_tokens):
+            estimates[filename] = NodeEstimate(tokens, True, call["latency"])
+    return estimates
+
+
+def plan_code(
+    plan: Plan, path: Path, filename: Path, code: str, hash_register: HashRegister, tree_index: TreeIndex
+) -> NodeEstimate:
+    """Estimate the calls to summarize the code of one file, with the map-reduce chain if the code doesn't fit."""
+    completion_tokens = max_num_tokens(filename, cfg.BASE_MAX_TOKENS_CODE, tree_index)
+    prompt_tokens = get_num_tokens(code_prompt(filename, code))
+    if prompt_tokens > cfg.CONTEXT_WINDOW:
+        return plan_chain(plan, path, str(filename), code, filename.name, hash_register)
+    call = add_call(plan, str(filename), path, "code", prompt_tokens, completion_tokens, model_name())
+    return NodeEstimate(completion_tokens, True, call["latency"])
+
+
+def plan_chain(
+    plan: Plan, path: Path, node: str, text: str | list[str], file_name: str, hash_register: HashRegister
+) -> NodeEstimate:
+    """Estimate the calls of the map-reduce chain: one map call per changed chunk and one reduce call."""
+    from src.llm_chains import chunk_hash, map_output_cache, split_into_chunks
+    from src.prompt_templates import map_template, reduce_template
+
+    chunks = split_into_chunks(text, file_name)
+    map_tokens = count_tokens(map_template, cfg.MODEL_CHAT_NAME)
+    map_latency = 0.0
+    cached = map_output_cache(hash_register, node)
+    for chunk in chunks:
+        if chunk_hash(chunk) not in cached:
+            prompt_tokens = map_tokens + count_tokens(chunk, cfg.MODEL_CHAT_NAME)
+            call = add_call(plan, node, path, "map", prompt_tokens, cfg.MAX_TOKENS_CHAIN, cfg.MODEL_CHAT_NAME)
+            map_latency = max(map_latency, call["latency"])
+        else:
+            plan.cache_hits[str(path)] += 1
+    prompt_tokens = count_tokens(reduce_template, cfg.MODEL_CHAT_NAME) + cfg.MAX_TOKENS_CHAIN * len(chunks)
+    call = add_call(plan, node, path, "reduce", prompt_tokens, cfg.MAX_TOKENS_CHAIN, cfg.MODEL_CHAT_NAME)
+    return NodeEstimate(cfg.MAX_TOKENS_CHAIN, True, map_latency + call["latency"])
+
+
+def plan_combination(
+    plan: Plan, path: Path, estimates: list[NodeEstimate | None], hash_register: HashRegister, key: str,
+    tree_index: TreeIndex
+) -> NodeEstimate | None:
+    """Estimate the call to summarize the summaries, like combine_summaries. Unchanged summaries need no call."""
+    estimates = [estimate for estimate in estimates if estimate is not None]
+    if not estimates:
+        return None
+    if len(estimates) == 1:
+        return estimates[0]
+    finish_time = max(estimate.finish_time for estimate in estimates)
+    if key in hash_register.hashes and not any(estimate.changed for estimate in estimates):
+        return cached_estimate(plan, path, hash_register.get(key), finish_time)
+    completion_tokens = max_num_tokens(path, cfg.BASE_MAX_TOKENS_SUM, tree_index)
+    prompt_tokens = get_num_tokens(summaries_prompt(path, [])) + sum(estimate.summary_tokens for estimate in estimates)
+    if prompt_tokens > cfg.CONTEXT_WINDOW:
+        # Summaries that the run would create are not known yet, so chunk placeholders of the estimated size
+        placeholders = ["summary " * estimate.summary_tokens for estimate in estimates]
+        chain = plan_chain(plan, path, key, placeholders, "", hash_register)
+        return NodeEstimate(chain.summary_tokens, True, finish_time + chain.finish_time)
+    call = add_call(plan, key, path, "summaries", prompt_tokens, completion_tokens, model_name())
+    return NodeEstimate(completion_tokens, True, finish_time + call["latency"])
+
+
+def cached_estimate(plan: Plan, directory: Path, summary_text: str, finish_time: float = 0.0) -> NodeEstimate:
+    """Count the cache hit and return the estimate of the cached summary."""
+    plan.cache_hits[str(directory)] += 1
+    return NodeEstimate(count_tokens(summary_text, model_name()), False, finish_time)
+
+
+def add_call(
+    plan: Plan, node: str, directory: Path, kind: str, prompt_tokens: int, completion_tokens: int, model: str
+) -> CallEstimate:
+    """Add the estimate of a call to the plan and return it."""
+    latency = cfg.PLAN_SECONDS_PER_CALL + completion_tokens * cfg.PLAN_SECONDS_PER_COMPLETION_TOKEN
+    call = CallEstimate(
+        node=node, directory=str(directory), kind=kind, model=model, prompt_tokens=prompt_tokens,
+        completion_tokens=completion_tokens, latency=latency
+    )
+    plan.calls.append(call)
+    return call
+
+
+def report(plan: Plan, top: int = 10) -> str:
+    """Return the plan as text: the totals, the totals by directory, and the files and folders that cost most."""
+    totals = plan.totals()
+    lines = [
+        f"Plan for {plan.path}: {totals['calls']} LLM calls, {sum(plan.cache_hits.values())} cache hits, "
+        f"{totals['prompt_tokens']} prompt tokens, {totals['completion_tokens']} completion tokens, "
+        f"${totals['cost']:.2f}, {plan.wall_time():.0f} seconds with {plan.concurrency} concurrent calls",
+        "",
+        f"{'calls':>7}{'hits':>7}{'prompt':>10}{'completion':>12}{'cost':>10}  directory",
+    ]
+    directories = sorted(plan.by_directory().items(), key=lambda item: (-item[1]["cost"], item[0]))
+    for directory, directory_totals in directories:
+        lines.append(
+            f"{directory_totals['calls']:7}{directory_totals['cache_hits']:7}{directory_totals['prompt_tokens']:10}"
+            f"{directory_totals['completion_tokens']:12}{directory_totals['cost']:10.4f}  {relative(directory, plan.path)}"
+        )
+    lines.extend(["", "Largest offenders:", f"{'calls':>7}{'prompt':>10}{'cost':>10}  file or folder"])
+    nodes = sorted(plan.by_node().items(), key=lambda item: (-item[1]["cost"], -item[1]["prompt_tokens"], item[0]))
+    for node, node_totals in nodes[:top]:
+        lines.append(f"{node_totals['calls']:7}{node_totals['prompt_tokens']:10}{node_totals['cost']:10.4f}  {relative(node, plan.path)}")
+    return "\n".join(lines)
+
+
+def relative(node: str, root: Path) -> str:
+    """Return the file or folder, possibly prefixed with files@, relative to the root, for brevity."""
+    prefix = "files@" if node.startswith("files@") else ""
+    path = Path(node.removeprefix(prefix))
+    return prefix + (str(path.relative_to(root)) if path != root else ".")
@@ -1,4 +1,4 @@
-from langchain.prompts import PromptTemplate
+from src.lazy_templates import LazyPromptTemplate
 
 #regular summary templates
 code_template = """
@@ -9,10 +9,22 @@ code_template = """
 
 def code_summary_prompt(name, code_str):
     """function to fill the code summary template, takes the file name and code as input"""
-    prompt = PromptTemplate(input_variables=["file_name", "code"], template=code_template)
+    prompt = LazyPromptTemplate(input_variables=["file_name", "code"], template=code_template)
     summary_prompt = prompt.format(file_name=name, code=code_str)
     return summary_prompt
 
+batch_code_template = """
+    Write a concise summary for each of the code files below. The code of each file is delineated by triple backticks. Don't include generalities, focus on specifics.
+    Start the summary of each file with a line containing only ### File followed by the number of the file.
+    {files}
+"""
+
+def batch_code_summary_prompt(files):
+    """function to fill the batch code summary template, takes a list of file names and code as input"""
+    files_text = "\n".join(f"File {index}: {name}\n```{code}```" for index, (name, code) in enumerate(files, start=1))
+    prompt = LazyPromptTemplate(input_variables=["files"], template=batch_code_template)
+    return prompt.format(files=files_text)
+
 summaries_template = """The following list of summaries delineated by triple backticks describes files and directories forming a codebase component.
     Component name: {component}
     List of Summaries: ```{summaries}```
@@ -21,7 +33,7 @@ summaries_template = """The following list of summaries delineated by triple bac
 
 def summaries_summary_prompt(name, summaries):
     """function to fill the summaries summary template, takes the component name and summaries as input"""
-    prompt = PromptTemplate(input_variables=["component", "summaries"], template=summaries_template)
+    prompt = LazyPromptTemplate(input_variables=["component", "summaries"], template=summaries_template)
     summary_prompt = prompt.format(component=name, summaries=summaries)
     return summary_prompt
 
@@ -33,7 +45,7 @@ Based on the list of summaries, distil a general description of the component
 Helpful Answer:
 """
 
-map_prompt = PromptTemplate(input_variables=['text'], template=map_template)
+map_prompt = LazyPromptTemplate(input_variables=['text'], template=map_template)
 
 reduce_template = """The following list of summaries delineated by triple backticks describes files and directories forming a codebase component.
     List of Summaries: ```{text}```
@@ -41,4 +53,4 @@ reduce_template = """The following list of summaries delineated by triple backti
     Take these summaries and distill them into a final consolidated summary of the component.
     Helpful answer:"""
 
-reduce_prompt = PromptTemplate(input_variables=['text'], template=reduce_template)
\ No newline at end of file
+reduce_prompt = LazyPromptTemplate(input_variables=['text'], template=reduce_template)
\ No newline at end of file
@@ -0,0 +1,67 @@
+"""Run a graph of dependent tasks concurrently, biggest tasks first."""
+
+from __future__ import annotations
+
+import heapq
+import itertools
+from collections.abc import Callable
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any
+
+
+class Task:
+    """A unit of work that can run as soon as all of its dependencies are done.
+
+    The run function receives the results of the dependencies, in the order of the dependencies.
+    The weight determines the dispatch order of tasks that are ready to run: heaviest first.
+    """
+
+    def __init__(self, run: Callable[[list[Any]], Any], dependencies: list[Task] | None = None, weight: int = 0) -> None:
+        self.run = run
+        self.dependencies = dependencies or []
+        self.weight = weight + sum(dependency.weight for dependency in self.dependencies)
+
+
+def run_tasks(root: Task, max_workers: int) -> Any:
+    """Run the root task and all tasks it depends on, using at most max_workers threads. Return the root result."""
+    tasks = _collect_tasks(root)
+    parents: dict[Task, list[Task]] = {task: [] for task in tasks}
+    pending = {task: len(task.dependencies) for task in tasks}
+    for task in tasks:
+        for dependency in task.dependencies:
+            parents[dependency].append(task)
+    results: dict[Task, Any] = {}
+    ready: list[tuple[int, int, Task]] = []
+    counter = itertools.count()  # Tie breaker so tasks themselves are never compared
+    for task in tasks:
+        if not task.dependencies:
+            heapq.heappush(ready, (-task.weight, next(counter), task))
+    running: dict[Future, Task] = {}
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        while ready or running:
+            while ready and len(running) < max(1, max_workers):
+                task = heapq.heappop(ready)[2]
+                dependency_results = [results[dependency] for dependency in task.dependencies]
+                running[executor.submit(task.run, dependency_results)] = task
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                task = running.pop(future)
+                results[task] = future.result()  # Reraises the exception of a failed task
+                for parent in parents[task]:
+                    pending[parent] -= 1
+                    if pending[parent] == 0:
+                        heapq.heappush(ready, (-parent.weight, next(counter), parent))
+    return results[root]
+
+
+def _collect_tasks(root: Task) -> list[Task]:
+    """Return the root task and all tasks it depends on, directly or indirectly."""
+    tasks, seen, stack = [], set(), [root]
+    while stack:
+        task = stack.pop()
+        if task in seen:
+            continue
+        seen.add(task)
+        tasks.append(task)
+        stack.extend(task.dependencies)
+    return tasks
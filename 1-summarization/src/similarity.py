@@ -0,0 +1,149 @@
+"""Find summarized files that are nearly the same as a file, so the summary of the one can be reused for the other.
+
+Files are compared by the Jaccard similarity of their shingles, the sequences of a few consecutive words. The MinHash
+signature of a file estimates that similarity: the fraction of equal values of two signatures. Locality-sensitive
+hashing finds the candidates without comparing with every file: the signature is cut into bands and files that have
+an identical band are candidates. The signatures and bands are stored in the summary cache database, next to the
+hashes of the hash register. Texts longer than a maximum are not compared, so large files don't cost much CPU time.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+import threading
+import zlib
+from array import array
+from functools import lru_cache
+from hashlib import md5, shake_128
+from json import dumps, loads
+from typing import TypedDict
+
+MAX_HASH = 0xFFFFFFFF
+SHINGLES_PER_BLOCK = 1024  # Number of shingles whose hashes are kept in memory at once when computing a signature
+
+
+class SimilarityMetrics(TypedDict):
+    """Metrics of reusing the summaries of nearly the same files."""
+
+    threshold: float
+    lookups: int
+    hits: int
+    hit_rate: float
+    mean_similarity: float  # Estimated Jaccard similarity of the files whose summary was reused
+
+
+class MinHasher:
+    """Compute MinHash signatures of texts, with one 32-bit hash per permutation, all taken from one digest per shingle."""
+
+    def __init__(self, permutations: int = 64, shingle_words: int = 5, seed: int = 1) -> None:
+        self.permutations = permutations
+        self.shingle_words = shingle_words
+        self.seed = seed.to_bytes(8, "little")  # The same seed gives the same hashes, so signatures can be stored
+
+    def shingles(self, text: str) -> set[int]:
+        """Return the hashes of the sequences of shingle_words consecutive words of the text."""
+        words = text.split()
+        size = self.shingle_words
+        starts = range(max(1, len(words) - size + 1))
+        return {zlib.crc32(" ".join(words[start: start + size]).encode("utf-8")) for start in starts}
+
+    def hashes(self, shingle: int) -> array[int]:
+        """Return the hashes of the shingle, one per permutation, computed at once by one extendable-output digest."""
+        return array("I", shake_128(self.seed + shingle.to_bytes(4, "little")).digest(4 * self.permutations))
+
+    def signature(self, text: str) -> list[int]:
+        """Return the MinHash signature of the text: per permutation, the minimum hash of the shingles."""
+        shingles = list(self.shingles(text))
+        signature = [MAX_HASH] * self.permutations
+        for start in range(0, len(shingles), SHINGLES_PER_BLOCK):
+            block = [self.hashes(shingle) for shingle in shingles[start: start + SHINGLES_PER_BLOCK]]
+            signature = list(map(min, signature, map(min, zip(*block))))
+        return signature
+
+
+def similarity(signature: list[int], other: list[int]) -> float:
+    """Return the estimated Jaccard similarity of the texts with the signatures."""
+    return sum(value == other_value for value, other_value in zip(signature, other)) / len(signature)
+
+
+class SimilarityIndex:
+    """Signatures of summarized texts, with their bands indexed to find nearly the same texts."""
+
+    def __init__(
+        self, connection: sqlite3.Connection, lock: threading.Lock, threshold: float, hasher: MinHasher | None = None,
+        bands: int = 16, max_characters: int = 1048576,
+    ) -> None:
+        self.connection = connection
+        self.lock = lock  # The connection is shared with the hashes
+        self.threshold = threshold
+        self.hasher = hasher or MinHasher()
+        self.max_characters = max_characters
+        self.rows = self.hasher.permutations // bands
+        self.bands = bands
+        self.signature = lru_cache(maxsize=256)(self.hasher.signature)  # A text is looked up before it is added
+        with self.lock:
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS minhashes "
+                "(key TEXT PRIMARY KEY, namespace TEXT NOT NULL, signature TEXT NOT NULL, hash TEXT)"
+            )
+            columns = [row[1] for row in self.connection.execute("PRAGMA table_info(minhashes)")]
+            if "hash" not in columns:  # Table created before the hash of the text was stored
+                self.connection.execute("ALTER TABLE minhashes ADD COLUMN hash TEXT")
+            self.connection.execute("CREATE TABLE IF NOT EXISTS minhash_bands (bucket TEXT NOT NULL, key TEXT NOT NULL)")
+            self.connection.execute("CREATE INDEX IF NOT EXISTS minhash_bands_bucket ON minhash_bands (bucket)")
+            self.connection.execute("CREATE INDEX IF NOT EXISTS minhash_bands_key ON minhash_bands (key)")
+
+    def add(self, key: str, namespace: str, text: str, hash: str) -> None:
+        """Store the signature and the hash of the text at the key, replacing those of a previous text at the key.
+
+        A text that is too long to compare only removes the previous text at the key.
+        """
+        signature = self.signature(text) if len(text) <= self.max_characters else None
+        with self.lock, self.connection:  # The connection rolls back the transaction if a statement fails
+            self.connection.execute("BEGIN")
+            self.connection.execute("DELETE FROM minhash_bands WHERE key = ?", (key,))
+            if signature is None:
+                self.connection.execute("DELETE FROM minhashes WHERE key = ?", (key,))
+                return
+            self.connection.execute(
+                "INSERT OR REPLACE INTO minhashes (key, namespace, signature, hash) VALUES (?, ?, ?, ?)",
+                (key, namespace, dumps(signature), hash),
+            )
+            self.connection.executemany(
+                "INSERT INTO minhash_bands (bucket, key) VALUES (?, ?)",
+                [(bucket, key) for bucket in self.buckets(namespace, signature)],
+            )
+
+    def find(self, namespace: str, text: str) -> list[tuple[str, float, str]]:
+        """Return the key, similarity, and hash of the texts in the namespace that are at least the threshold similar,
+        most similar first. Texts that are too long to compare have no similar texts."""
+        if len(text) > self.max_characters:
+            return []
+        signature = self.signature(text)
+        buckets = self.buckets(namespace, signature)
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT key, signature, hash FROM minhashes WHERE namespace = ? AND key IN "
+                f"(SELECT key FROM minhash_bands WHERE bucket IN ({', '.join('?' * len(buckets))}))",
+                (namespace, *buckets),
+            ).fetchall()
+        candidates = [(key, similarity(signature, loads(other)), hash) for key, other, hash in rows]
+        return sorted(
+            [candidate for candidate in candidates if candidate[1] >= self.threshold], key=lambda candidate: -candidate[1]
+        )
+
+    def rename(self, old_key: str, new_key: str) -> None:
+        """Move the signature at the old key, if any, to the new key."""
+        with self.lock, self.connection:
+            self.connection.execute("BEGIN")
+            for table in ("minhashes", "minhash_bands"):
+                self.connection.execute(f"DELETE FROM {table} WHERE key = ?", (new_key,))
+                self.connection.execute(f"UPDATE {table} SET key = ? WHERE key = ?", (new_key, old_key))
+
+    def buckets(self, namespace: str, signature: list[int]) -> list[str]:
+        """Return the LSH buckets of the signature: a hash of each band, with the namespace and the band number."""
+        bands = [signature[band * self.rows: (band + 1) * self.rows] for band in range(self.bands)]
+        return [
+            md5(f"{namespace}:{number}:{band}".encode("utf-8"), usedforsecurity=False).hexdigest()
+            for number, band in enumerate(bands)
+        ]
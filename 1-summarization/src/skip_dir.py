@@ -1,22 +1,27 @@
+import fnmatch
+import re
 from pathlib import Path
 
+from src.ignore import IgnoreMatcher
+
+dirs_to_skip = [".*", "*.egg-info", "build", "venv", "__pycache__", "testdata"]
+filenames_to_skip = [".*", "__init__.py", "*.txt", "*.xml", "*.json", "*.png", "*.ico", "*.gif", "*.zip", "summarize_code.py", "...summary_cache.json", "*.pdf", "*.docx"]
+
+# The patterns combined into one regex each, so a name is matched once instead of once per pattern
+skipped_dir_names = re.compile("|".join(fnmatch.translate(pattern) for pattern in dirs_to_skip))
+skipped_file_names = re.compile("|".join(fnmatch.translate(pattern) for pattern in filenames_to_skip))
+
+
 def skip_dir(path: Path) -> bool:
     """Return whether to skip the directory."""
-    dirs_to_skip = [".*", "*.egg-info", "build", "venv", "__pycache__", "testdata"]
-    for dir in dirs_to_skip:
-        for part in path.parts:
-            if part in (".", ".."):
-                continue
-            if Path(part).match(dir):
-                return True
-    return False
+    return any(skipped_dir_names.match(part) for part in path.parts if part not in (".", ".."))
 
 
 def skip_file(filename: Path) -> bool:
     """Return whether to skip the file."""
-    filenames_to_skip = [".*", "__init__.py", "*.txt", "*.xml", "*.json", "*.png", "*.ico", "*.gif", "*.zip", "summarize_code.py", "...summary_cache.json", "*.pdf", "*.docx"]
-    for filename_to_skip in filenames_to_skip:
-        if filename.match(filename_to_skip):
-            return True
-    return False
+    return skipped_file_names.match(filename.name) is not None
+
 
+def ignore_matcher(root: Path) -> IgnoreMatcher:
+    """Return a matcher that skips what skip_dir and skip_file skip, and what the ignore files of the root exclude."""
+    return IgnoreMatcher(root, skipped_dir_names, skipped_file_names)
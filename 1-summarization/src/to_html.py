@@ -1,8 +1,63 @@
+import json
 import re
+from hashlib import md5
 from pathlib import Path
-from typing import Dict
+from typing import Dict, Iterator
 from src.classes import Summary, Configurations
 
+SHARD_FOLDER = "shards"
+SHARD_DEPTH = 1  # Depth of the top-level components, whose nested summaries are stored in shards
+
+# Renders the summaries in a shard with the same markup as iter_html_from_summary, when the reader expands them
+SHARD_SCRIPT = r"""
+<script>
+  const configKeys = ['prompts', 'time', 'max_base_tokens_code', 'max_base_tokens_summaries', 'model_type', 'model_name'];
+
+  function markdownToHtml(text) {
+    return text.replace(/\n/g, '<br>').replace(/\*\*(.+?)\*\*/g, '<b>$1</b>');
+  }
+
+  function header(summary) {
+    return `Summary of ${summary.path.split(/[\\/]/).pop()}`;
+  }
+
+  function summaryHtml(summary, depth) {
+    const parts = [`<h2 class="summary-header depth-${depth}">${header(summary)}</h2>`];
+    for (const [key, value] of Object.entries(summary)) {
+      if (!configKeys.includes(key) && !['summaries', 'details', 'metrics'].includes(key)) {
+        const formattedValue = typeof value === 'string' ? markdownToHtml(value) : value;
+        parts.push(`<p class="depth-${depth}"><b>${key}:</b> ${formattedValue}</p>`);
+      }
+    }
+    if (summary.summaries && summary.summaries.length) {
+      parts.push(`<details class="summary-detail depth-${depth}">`);
+      parts.push('  <summary class="summary-title">Summaries used as input</summary>');
+      parts.push(...summary.summaries.map((subSummary) => summaryHtml(subSummary, depth + 1)));
+      parts.push('</details>');
+    }
+    return parts.join('\n');
+  }
+
+  async function loadShard(event) {
+    const details = event.target;
+    try {
+      const response = await fetch(details.dataset.shard);
+      const shard = await response.json();
+      const html = shard.summaries.map((summary) => summaryHtml(summary, shard.depth));
+      details.insertAdjacentHTML('beforeend', '\n' + html.join('\n'));
+    } catch (error) {
+      details.insertAdjacentHTML(
+        'beforeend', `<p>Could not load ${details.dataset.shard} (${error}). Serve the report with a web server.</p>`
+      );
+    }
+  }
+
+  for (const details of document.querySelectorAll('details[data-shard]')) {
+    details.addEventListener('toggle', loadShard, {once: true});
+  }
+</script>
+"""
+
 def write_to_html_file(html_content, file_path):
     with open(file_path, 'w', encoding='utf-8') as file:  # Specify encoding here
         file.write(html_content)
@@ -17,73 +72,166 @@ def markdown_to_html(text: str) -> str:
     return html_text
 
 def generate_html_from_configurations(config: Configurations, depth: int) -> str:
-    html_parts = []
-    html_parts.append(f'<details class="config-details" style="margin-left: {depth*20}px;">')
-    html_parts.append(f'<summary class="summary-title">Configuration Details</summary>')
+    return '\n'.join(iter_html_from_configurations(config, depth))
+
+def iter_html_from_configurations(config: Configurations, depth: int) -> Iterator[str]:
+    yield f'<details class="config-details depth-{depth}">'
+    yield f'<summary class="summary-title">Configuration Details</summary>'
     for key, value in config.items():
         if key == 'prompts':
-            html_parts.append(generate_prompts_html(value, depth+1))
+            yield from iter_prompts_html(value, depth+1)
         else:
-            html_parts.append(f'<p style="margin-left: {depth*20}px;"><b>{key}:</b> {value}</p>')
-    html_parts.append('</details>')
-    return '\n'.join(html_parts)
+            yield f'<p class="depth-{depth}"><b>{key}:</b> {value}</p>'
+    yield '</details>'
 
 def generate_html_from_summary(summary: Summary, depth: int = 0, header: str = "") -> str:
-    html_parts = []
+    return '\n'.join(iter_html_from_summary(summary, depth, header))
+
+def iter_html_from_summary(summary: Summary, depth: int = 0, header: str = "", shard_depth: int = -1) -> Iterator[str]:
+    """Yield the lines of HTML for the summary and its nested summaries, so the report needn't be held in memory.
+
+    The nested summaries of summaries at the shard depth are left out; the report loads them from their shard instead.
+    """
     configKeys = ['prompts', 'time', 'max_base_tokens_code', 'max_base_tokens_summaries', 'model_type', 'model_name']
 
     # Adding header if provided
     if header:
-        html_parts.append(f'<h2 style="margin-left: {depth * 20}px; color: #333366;">{header}</h2>')
+        yield f'<h2 class="summary-header depth-{depth}">{header}</h2>'
     
     # Configuration section
     if depth == 0:  # Only at the top level
-        html_parts.append(f'<div class="configuration" style="margin-left: {depth * 20}px; background-color: #f3f3f3; padding: 10px; border-radius: 8px; margin: 10px 0;">')
-        html_parts.append(f'  <h3 style="color: #666699;">Configurations</h3>')
+        yield f'<div class="configuration">'
+        yield f'  <h3 class="configuration-title">Configurations</h3>'
     
         for key in configKeys:
             if key == 'prompts' and key in summary['details']:  # special handling for prompts as collapsible section
-                html_parts.append(generate_prompts_html(summary['details']['prompts'], depth + 2))
+                yield from iter_prompts_html(summary['details']['prompts'], depth + 2)
             elif key != 'prompts':
-                html_parts.append(f'    <p style="margin-left: {20}px;"><b>{key}:</b> {summary["details"][key]}</p>')
+                yield f'    <p class="depth-1"><b>{key}:</b> {summary["details"][key]}</p>'
 
-        html_parts.append(f'</div>')
+        yield f'</div>'
+        if 'llm_metrics' in summary['details']:
+            yield from iter_metrics_html(summary)
     
     # Handling other keys outside of the configuration
     for key, value in summary.items():
-        if key not in configKeys and key != 'summaries' and key != 'details':
+        if key not in configKeys and key not in ('summaries', 'details', 'metrics'):
             # Apply markdown_to_html function to convert value if it's a string
             formatted_value = markdown_to_html(value) if isinstance(value, str) else value
-            html_parts.append(f'<p style="margin-left: {depth * 20}px;"><b>{key}:</b> {formatted_value}</p>')
-
-    # for key, value in summary.items():
-    #     if key not in configKeys and key != 'summaries' and key != 'details':
-    #         html_parts.append(f'<p style="margin-left: {depth * 20}px;"><b>{key}:</b> {value}</p>')
+            yield f'<p class="depth-{depth}"><b>{key}:</b> {formatted_value}</p>'
             
     # For nested summaries
-    if 'summaries' in summary and summary['summaries']:
-        html_parts.append(f'<details class="summary-detail" style="margin-left: {depth*20}px;">')
-        html_parts.append(f'  <summary class="summary-title" style="font-weight: bold; cursor: pointer;">Summaries used as input</summary>')
+    if 'summaries' in summary and summary['summaries'] and depth == shard_depth:
+        yield f'<details class="summary-detail depth-{depth}" data-shard="{SHARD_FOLDER}/{shard_name(summary)}.json">'
+        yield f'  <summary class="summary-title">Summaries used as input</summary>'
+        yield f'</details>'
+    elif 'summaries' in summary and summary['summaries']:
+        yield f'<details class="summary-detail depth-{depth}">'
+        yield f'  <summary class="summary-title">Summaries used as input</summary>'
         
         for sub_summary in summary['summaries']:
-            html_parts.append(generate_html_from_summary(sub_summary, depth + 1, f"Summary of {Path(sub_summary['path']).name}"))
+            yield from iter_html_from_summary(
+                sub_summary, depth + 1, f"Summary of {Path(sub_summary['path']).name}", shard_depth
+            )
         
-        html_parts.append(f'</details>')
-    
-    return '\n'.join(html_parts)
+        yield f'</details>'
 
 def generate_prompts_html(prompts: Dict[str, str], depth: int) -> str:
-    html_parts = []
-    html_parts.append(f'    <details class="prompts-details" style="margin-left: {depth*20}px;">')
-    html_parts.append(f'      <summary class="summary-title">Prompts Details</summary>')
-    html_parts.append(f'      <ul>')
+    return '\n'.join(iter_prompts_html(prompts, depth))
+
+def iter_prompts_html(prompts: Dict[str, str], depth: int) -> Iterator[str]:
+    yield f'    <details class="prompts-details depth-{depth}">'
+    yield f'      <summary class="summary-title">Prompts Details</summary>'
+    yield f'      <ul>'
     for prompt_key, prompt_value in prompts.items():
-        html_parts.append(f'        <li><b>{prompt_key}:</b> {prompt_value}</li>')
-    html_parts.append(f'      </ul>')
-    html_parts.append(f'    </details>')
-    return '\n'.join(html_parts)
+        yield f'        <li><b>{prompt_key}:</b> {prompt_value}</li>'
+    yield f'      </ul>'
+    yield f'    </details>'
+
+def iter_metrics_html(summary: Summary, top: int = 10) -> Iterator[str]:
+    """Yield the lines of HTML for the LLM metrics of the run and the slowest and most expensive components."""
+    run_metrics = summary['details']['llm_metrics']
+    yield f'<details class="metrics">'
+    yield f'  <summary class="summary-title">LLM Metrics</summary>'
+    throttling = summary['details'].get('llm_throttling', {})
+    similar_reuse = summary['details'].get('similar_reuse', {})
+    for key, value in [
+        *run_metrics.items(), *((f'throttling_{key}', value) for key, value in throttling.items()),
+        *((f'similar_{key}', value) for key, value in similar_reuse.items()),
+    ]:
+        yield f'    <p class="depth-1"><b>{key}:</b> {value:.4g}</p>' if isinstance(value, float) else f'    <p class="depth-1"><b>{key}:</b> {value}</p>'
+    components = component_metrics(summary)
+    for title, key, unit in (('Slowest components', 'latency', 's'), ('Most expensive components', 'cost', '$')):
+        yield f'    <h3 class="configuration-title">{title}</h3>'
+        yield f'    <table class="metrics-table">'
+        yield f'      <tr><th>Component</th><th>{key} ({unit})</th><th>calls</th><th>cache hits</th></tr>'
+        for path, metrics in sorted(components.items(), key=lambda item: item[1][key], reverse=True)[:top]:
+            yield (
+                f'      <tr><td>{path}</td><td>{metrics[key]:.4g}</td><td>{metrics["calls"]}</td>'
+                f'<td>{metrics["cache_hits"]}</td></tr>'
+            )
+        yield f'    </table>'
+    yield f'</details>'
+
+def component_metrics(summary: Summary) -> Dict[str, dict]:
+    """Return the metrics of each component, including the metrics of the nested summaries of the component."""
+    components: Dict[str, dict] = {}
+
+    def add_up(summary: Summary) -> dict:
+        totals = dict(summary.get('metrics') or dict(calls=0, cache_hits=0, latency=0.0, cost=0.0))
+        for sub_summary in summary.get('summaries') or []:
+            for key, value in add_up(sub_summary).items():
+                if key in ('calls', 'cache_hits', 'latency', 'cost'):
+                    totals[key] = totals.get(key, 0) + value
+        components[summary['path']] = totals  # Replaces the summary of the files of the folder, which has the same path
+        return totals
+
+    add_up(summary)
+    return components
+
+def summary_depth(summary: Summary) -> int:
+    """Return the depth of the most deeply nested summary, without recursion."""
+    max_depth, stack = 0, [(summary, 0)]
+    while stack:
+        summary, depth = stack.pop()
+        max_depth = max(max_depth, depth)
+        stack.extend((sub_summary, depth + 1) for sub_summary in summary.get('summaries') or [])
+    return max_depth
+
+def depth_styles(max_depth: int) -> str:
+    """Return the CSS classes that indent the HTML elements of summaries by their depth."""
+    return '\n'.join(f'      .depth-{depth} {{ margin-left: {depth * 20}px; }}' for depth in range(max_depth + 1))
+
+def shard_name(summary: Summary) -> str:
+    """Return the name of the shard with the nested summaries of the summary."""
+    return md5(summary['path'].encode('utf-8'), usedforsecurity=False).hexdigest()
+
+def write_sharded_report(summary: Summary, directory: Path) -> Path:
+    """Write the report as a shell page with the top-level components, plus a JSON shard per top-level component.
+
+    The page loads the nested summaries of a component from its shard when the reader expands them, so the time to
+    first view doesn't depend on the size of the code base. Browsers don't allow loading shards from file:// URLs, so
+    the report has to be served, for example with python -m http.server.
+    """
+    (directory / SHARD_FOLDER).mkdir(parents=True, exist_ok=True)
+    for component in summary.get('summaries') or []:
+        if component.get('summaries'):
+            shard = {'depth': SHARD_DEPTH + 1, 'summaries': component['summaries']}
+            with open(directory / SHARD_FOLDER / f"{shard_name(component)}.json", 'w', encoding='utf-8') as file:
+                json.dump(shard, file)
+    with open(directory / "index.html", 'w', encoding='utf-8') as file:
+        file.writelines(iter_summary_html(summary, SHARD_DEPTH))
+    return directory / "index.html"
 
 def summary_to_html_enhanced(summary: Summary) -> str:
+    return ''.join(iter_summary_html(summary))
+
+def write_summary_html(summary: Summary, file_path) -> None:
+    """Write the report to the file while generating it."""
+    with open(file_path, 'w', encoding='utf-8') as file:
+        file.writelines(iter_summary_html(summary))
+
+def iter_summary_html(summary: Summary, shard_depth: int = -1) -> Iterator[str]:
     # Updated CSS styles for design alignment
     style = """
     <style>
@@ -107,6 +255,12 @@ def summary_to_html_enhanced(summary: Summary) -> str:
       h3 {
         color: #666;
       }
+      .summary-header {
+        color: #333366;
+      }
+      .configuration-title {
+        color: #666699;
+      }
       .summary-container {
         max-width: 960px;
         margin: 0 auto;
@@ -116,9 +270,9 @@ def summary_to_html_enhanced(summary: Summary) -> str:
         box-shadow: 0 4px 8px rgba(0, 0, 0, 0.1);
       }
       .configuration {
-        background-color: #fafafa;
-        padding: 20px;
-        margin-bottom: 20px;
+        background-color: #f3f3f3;
+        padding: 10px;
+        margin: 10px 0;
         border-radius: 8px;
         box-shadow: 0 2px 4px rgba(0, 0, 0, 0.05);
       }
@@ -166,8 +320,22 @@ def summary_to_html_enhanced(summary: Summary) -> str:
       p {
         line-height: 1.6;
       }
+      .metrics {
+        background-color: #f3f3f3;
+        border-radius: 8px;
+      }
+      .metrics-table {
+        border-collapse: collapse;
+        margin-left: 20px;
+      }
+      .metrics-table th, .metrics-table td {
+        border-bottom: 1px solid #ddd;
+        padding: 4px 10px;
+        text-align: left;
+      }
+{depth_styles}
     </style>
-    """
+    """.replace('{depth_styles}', depth_styles(summary_depth(summary)))
 
         # HTML structure with UTF-8 Charset Declaration
     html_structure = f"""<!DOCTYPE html>
@@ -183,12 +351,12 @@ def summary_to_html_enhanced(summary: Summary) -> str:
     <div class="summary-container">
     """
 
-    html_str = generate_html_from_summary(summary, 0, f"Summary of {summary['path']}")
-    html_structure += html_str
-    html_structure += '\n</div></body></html>'
-    
-    return html_structure
-
-
-
-
+    yield html_structure
+    separator = ''
+    for line in iter_html_from_summary(summary, 0, f"Summary of {summary['path']}", shard_depth):
+        yield separator + line
+        separator = '\n'
+    if shard_depth >= 0:
+        yield f'\n</div>{SHARD_SCRIPT}</body></html>'
+    else:
+        yield '\n</div></body></html>'
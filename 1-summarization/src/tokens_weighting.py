@@ -1,25 +1,22 @@
-import os
+from __future__ import annotations
 import math
 from pathlib import Path
 
-from src.skip_dir import skip_dir, skip_file
+from src.skip_dir import ignore_matcher
+from src.tree_index import TreeIndex
 
 
-def number_of_files(dir_path:Path) -> int:
-    """Count number of files in a directory"""
-    count = 0
-    for path in os.scandir(dir_path):
-        if path.is_file() and not skip_file(Path(path)):
-            count += 1
-        if path.is_dir() and not skip_dir(Path(path)):
-            count += number_of_files(path)
+def number_of_files(dir_path:Path, tree_index: TreeIndex | None = None) -> int:
+    """Count number of files in a directory, using the tree index if the directory is indexed"""
+    if tree_index is not None and dir_path in tree_index:
+        return tree_index.number_of_files(dir_path)
+    if not Path(dir_path).is_dir():
+        return 1
+    return sum(len(files) for _, _, files in ignore_matcher(Path(dir_path)).walk())
 
-        else: continue
-    return count
 
-
-def max_num_tokens(path: Path, base_max_tokens) -> int:
+def max_num_tokens(path: Path, base_max_tokens, tree_index: TreeIndex | None = None) -> int:
     """Calculate the max numer of tokens usable in the output, takes base tokens and number of files as int input"""
-    number_of_files_in_dir = number_of_files(path)
+    number_of_files_in_dir = number_of_files(path, tree_index)
     max_num_tokens = math.ceil(base_max_tokens + math.sqrt(number_of_files_in_dir * 30))
     return max_num_tokens
\ No newline at end of file
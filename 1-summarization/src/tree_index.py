@@ -0,0 +1,180 @@
+"""Index the directories and files to summarize, using a single walk of the file system.
+
+Skipped directories, including the directories excluded by .gitignore and .summaryignore files, are not walked.
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import NamedTuple
+
+from src.ignore import IGNORE_FILE_NAMES
+from src.skip_dir import ignore_matcher
+
+
+class FileInfo(NamedTuple):
+    """The file system information of a file to summarize."""
+
+    size: int
+    mtime_ns: int
+    inode: int
+
+
+class TreeIndex:
+    """The directories and files to summarize, with their sizes, modification times, and file counts."""
+
+    def __init__(self, root: Path) -> None:
+        self.root = root
+        self.dirs: dict[Path, list[Path]] = {}  # Directory to its subdirectories that are not skipped
+        self.files: dict[Path, list[Path]] = {}  # Directory to its files that are not skipped
+        self.file_info: dict[Path, FileInfo] = {}
+        self.file_counts: dict[Path, int] = {}  # Directory to the number of files in it, recursively
+        self.matcher = ignore_matcher(root)
+
+    def subdirs(self, path: Path) -> list[Path]:
+        """Return the subdirectories of the path that are not skipped."""
+        return self.dirs[path]
+
+    def files_in(self, path: Path) -> list[Path]:
+        """Return the files in the path that are not skipped."""
+        return self.files[path]
+
+    def number_of_files(self, path: Path) -> int:
+        """Return the number of files in the path, recursively. A file counts as one file."""
+        return 1 if path in self.file_info else self.file_counts[path]
+
+    def stat(self, path: Path) -> FileInfo:
+        """Return the file system information of the file."""
+        return self.file_info[path]
+
+    def size(self, path: Path) -> int:
+        """Return the size of the file in bytes."""
+        return self.file_info[path].size
+
+    def __contains__(self, path: object) -> bool:
+        """Return whether the path is indexed."""
+        return path in self.file_info or path in self.file_counts
+
+
+def file_info(path: Path) -> FileInfo:
+    """Return the file system information of a file that is not indexed."""
+    stat = path.stat()
+    return FileInfo(stat.st_size, stat.st_mtime_ns, stat.st_ino)
+
+
+def build_index(root: Path) -> TreeIndex:
+    """Walk the root directory once and index the directories and files that are not skipped."""
+    index = TreeIndex(root)
+    _index_dir(index, root)
+    return index
+
+
+def index_files(root: Path, file_info: dict[Path, FileInfo]) -> TreeIndex:
+    """Index the given files below the root, without walking the file system. Skipped files and directories are left out."""
+    index = TreeIndex(root)
+    index.dirs[root], index.files[root], index.file_counts[root] = [], [], 0
+    for path in sorted(file_info):
+        parents = list(reversed(path.relative_to(root).parents))[1:]  # The directories below the root, top first
+        if index.matcher.ignored(path):
+            continue
+        directory = root
+        for parent in parents:
+            if (subdir := root / parent) not in index.dirs:
+                index.dirs[directory].append(subdir)
+                index.dirs[subdir], index.files[subdir], index.file_counts[subdir] = [], [], 0
+            directory = subdir
+        index.files[directory].append(path)
+        index.file_info[path] = file_info[path]
+        ancestor = directory
+        while True:
+            index.file_counts[ancestor] += 1
+            if ancestor == root:
+                break
+            ancestor = ancestor.parent
+    return index
+
+
+def refresh_index(index: TreeIndex, paths: set[Path]) -> set[Path]:
+    """Update the index for paths that were changed, added, or removed. Return the directories that were rescanned.
+
+    Only the indexed directories containing the paths are rescanned, without descending into subdirectories that were
+    already indexed. If an ignore file changed, the subdirectories of its directory are indexed anew.
+    """
+    directories = set()
+    for path in paths:
+        if path.name in IGNORE_FILE_NAMES and path.parent in index.dirs:  # The ignore rules may have changed
+            _forget_subdirs(index, path.parent)
+        directory = path.parent
+        while directory not in index.dirs and directory != index.root and directory != directory.parent:
+            directory = directory.parent
+        if directory in index.dirs:
+            directories.add(directory)
+    rescanned = set()
+    for directory in sorted(directories, key=lambda directory: len(directory.parts)):
+        if directory in index.dirs:  # Not removed by rescanning its parent
+            _rescan_dir(index, directory)
+            rescanned.add(directory)
+    return rescanned
+
+
+def _index_dir(index: TreeIndex, path: Path) -> int:
+    """Index the directory and return the number of files in it, recursively."""
+    dirs, files = _scan_dir(index, path)
+    index.dirs[path], index.files[path] = dirs, files
+    count = len(files) + sum(_index_dir(index, subdir) for subdir in dirs)
+    index.file_counts[path] = count
+    return count
+
+
+def _rescan_dir(index: TreeIndex, path: Path) -> None:
+    """Rescan the directory, index new subdirectories, forget removed ones, and update the file counts."""
+    for filename in index.files[path]:
+        del index.file_info[filename]
+    try:
+        dirs, files = _scan_dir(index, path)
+    except (FileNotFoundError, NotADirectoryError):  # Removed; rescanning its parent forgets it
+        dirs, files = [], []
+    for subdir in set(index.dirs[path]) - set(dirs):
+        _forget_dir(index, subdir)
+    for subdir in set(dirs) - set(index.dirs[path]):
+        _index_dir(index, subdir)
+    index.dirs[path], index.files[path] = dirs, files
+    count = len(files) + sum(index.file_counts[subdir] for subdir in dirs)
+    change, ancestor = count - index.file_counts[path], path
+    while True:
+        index.file_counts[ancestor] += change
+        if ancestor == index.root:
+            break
+        ancestor = ancestor.parent
+
+
+def _forget_subdirs(index: TreeIndex, path: Path) -> None:
+    """Remove the subdirectories of the directory from the index and forget the ignore rules, so rescanning the
+    directory indexes the subdirectories anew."""
+    index.matcher.forget(path)
+    for subdir in index.dirs[path]:
+        _forget_dir(index, subdir)
+    index.dirs[path] = []
+
+
+def _forget_dir(index: TreeIndex, path: Path) -> None:
+    """Remove the directory and its contents from the index."""
+    for subdir in index.dirs.pop(path):
+        _forget_dir(index, subdir)
+    for filename in index.files.pop(path):
+        del index.file_info[filename]
+    del index.file_counts[path]
+
+
+def _scan_dir(index: TreeIndex, path: Path) -> tuple[list[Path], list[Path]]:
+    """Scan the directory, index its files, and return its subdirectories and files that are not skipped."""
+    dirs, files = [], []
+    for entry, is_dir in index.matcher.scan(path):
+        entry_path = path / entry.name
+        if is_dir:
+            dirs.append(entry_path)
+        else:
+            stat = entry.stat()
+            index.file_info[entry_path] = FileInfo(stat.st_size, stat.st_mtime_ns, entry.inode())
+            files.append(entry_path)
+    return dirs, files
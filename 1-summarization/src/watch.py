@@ -0,0 +1,189 @@
+"""Watch a directory tree for changes, with inotify on Linux and by polling elsewhere.
+
+Watchers report the paths of files and directories that were changed, added, or removed. Changes are debounced: a
+burst of changes, such as a checkout or a commit, is reported as one set of paths once the tree is quiet.
+"""
+
+from __future__ import annotations
+
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import struct
+import sys
+import time
+from collections.abc import Collection
+from pathlib import Path
+from typing import Protocol
+
+from src.ignore import IGNORE_FILE_NAMES, IgnoreMatcher
+from src.skip_dir import ignore_matcher
+from src.tree_index import FileInfo, build_index
+
+# Inotify event masks, from <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+WATCH_MASK = (
+    IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF
+    | IN_MOVE_SELF | IN_ONLYDIR
+)
+EVENT_HEADER = struct.Struct("iIII")  # Watch descriptor, mask, cookie, and length of the name
+READ_BYTES = 65536
+
+
+class Watcher(Protocol):
+    """Source of changed paths."""
+
+    matcher: IgnoreMatcher  # Decides which of the changed paths are skipped
+
+    def changes(self, timeout: float) -> dict[Path, bool]:
+        """Wait at most timeout seconds for changes and return the changed paths, if any, with whether each is a directory."""
+
+    def close(self) -> None:
+        """Stop watching."""
+
+
+class InotifyWatcher:
+    """Watch the directories of a tree with inotify, adding watches for directories created later."""
+
+    def __init__(self, root: Path) -> None:
+        self.root = root
+        self.libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.paths: dict[int, Path] = {}  # Watch descriptor to directory
+        self.matcher = ignore_matcher(root)
+        self.add_watches(root)
+
+    def add_watches(self, directory: Path) -> None:
+        """Watch the directory and its subdirectories that are not skipped."""
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(directory), WATCH_MASK)
+        if wd < 0:  # Removed before it could be watched, or out of watches
+            logging.warning("Can't watch %s: %s", directory, os.strerror(ctypes.get_errno()))
+            return
+        self.paths[wd] = directory
+        try:
+            entries = list(self.matcher.scan(directory))
+        except OSError:
+            return
+        for entry, is_dir in entries:
+            if is_dir and not entry.is_symlink():
+                self.add_watches(directory / entry.name)
+
+    def changes(self, timeout: float) -> dict[Path, bool]:
+        """Read the pending events and return the changed paths, with whether each is a directory according to the event."""
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return {}
+        changed: dict[Path, bool] = {}
+        data = os.read(self.fd, READ_BYTES)
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            name = data[offset + EVENT_HEADER.size: offset + EVENT_HEADER.size + length].rstrip(b"\0")
+            offset += EVENT_HEADER.size + length
+            if mask & IN_Q_OVERFLOW:  # Events were lost, so anything may have changed
+                changed[self.root] = True
+                continue
+            if mask & IN_IGNORED:  # The directory was removed
+                self.paths.pop(wd, None)
+                continue
+            if wd not in self.paths:
+                continue
+            path = self.paths[wd] / os.fsdecode(name) if name else self.paths[wd]
+            changed[path] = bool(mask & IN_ISDIR) or not name  # Events without a name are about the directory itself
+            if path.name in IGNORE_FILE_NAMES:
+                self.matcher.forget(path.parent)
+            if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO) and not self.matcher.skip(path, is_dir=True):
+                self.add_watches(path)
+        return changed
+
+    def close(self) -> None:
+        """Close the inotify instance, which removes the watches."""
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    """Watch a tree by comparing the size, modification time, and inode of its files at an interval."""
+
+    def __init__(self, root: Path, interval: float) -> None:
+        self.root = root
+        self.interval = interval
+        self.matcher = ignore_matcher(root)
+        self.snapshot = self.take_snapshot()
+
+    def take_snapshot(self) -> dict[Path, FileInfo]:
+        """Return the file system information of the files that are not skipped."""
+        return build_index(self.root).file_info
+
+    def changes(self, timeout: float) -> dict[Path, bool]:
+        """Wait for the interval, or the timeout if shorter, and return the files that differ from the last snapshot."""
+        time.sleep(min(self.interval, timeout))
+        self.matcher = ignore_matcher(self.root)  # Ignore files may have changed since the last snapshot
+        snapshot = self.take_snapshot()
+        changed = {
+            path: False for path in snapshot.keys() | self.snapshot.keys() if snapshot.get(path) != self.snapshot.get(path)
+        }
+        self.snapshot = snapshot
+        return changed
+
+    def close(self) -> None:
+        """Nothing to close."""
+
+
+def open_watcher(root: Path, poll_interval: float) -> Watcher:
+    """Return an inotify watcher on Linux, and a polling watcher if inotify is not available."""
+    if sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(root)
+        except (OSError, AttributeError) as reason:  # AttributeError: the C library has no inotify functions
+            logging.warning("Can't use inotify, polling for changes instead: %s", reason)
+    return PollingWatcher(root, poll_interval)
+
+
+def wait_for_changes(watcher: Watcher, debounce: float, ignore: Collection[Path] = ()) -> set[Path]:
+    """Wait for changes, then keep collecting changes until there are none for debounce seconds.
+
+    Changes to skipped files and to ignored paths, such as the output folders of the summarizer, are left out. Changes
+    to ignore files are kept, because they change which files are skipped.
+    """
+    changed: set[Path] = set()
+    while not changed:
+        changed = relevant(watcher.changes(3600), watcher.matcher, ignore)
+    while more := relevant(watcher.changes(debounce), watcher.matcher, ignore):
+        changed |= more
+    return changed
+
+
+def relevant(changes: dict[Path, bool], matcher: IgnoreMatcher, ignore: Collection[Path]) -> set[Path]:
+    """Return the changed paths that the matcher doesn't skip, and that are not ignored or in an ignored directory.
+
+    The root itself is relevant, and so are the ignore files in directories that are not skipped. Whether a path is a
+    directory is taken from the change, because a removed directory can't be checked in the file system.
+    """
+    return {
+        path for path, is_dir in changes.items()
+        if not any(path == other or other in path.parents for other in ignore)
+        and (path == matcher.root or not skipped(path, is_dir, matcher))
+    }
+
+
+def skipped(path: Path, is_dir: bool, matcher: IgnoreMatcher) -> bool:
+    """Return whether the matcher skips the path below its root, or for ignore files, the directory of the file."""
+    if path.name in IGNORE_FILE_NAMES:
+        return path.parent != matcher.root and matcher.ignored(path.parent, is_dir=True)
+    return matcher.ignored(path, is_dir)
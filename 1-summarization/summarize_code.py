@@ -1,86 +1,469 @@
 from __future__ import annotations
+import argparse
 import logging
+import re
 import pprint
-import sys
 import timeit
-import yaml
-import box
+from functools import partial
+from itertools import groupby
 from pathlib import Path
 
 from src.add_to_JSON import write_json
-from src.hash_register import load_hashes, save_hashes, HashRegister
-from src.llm import llm_generate_summary, llm_summarize_summary
-from src.prompt_templates import code_template, summaries_template, map_template, reduce_template
-from src.chat_prompt_templates import chat_code_summary_template, chat_sum_summary_template, one_shot_code_summary_template, one_shot_sum_summary_template
-from src.skip_dir import skip_file, skip_dir
-from src.to_html import summary_to_html_enhanced, write_to_html_file
+from src.config import cfg
+from src.batch import BatchBackend, OpenAIBatchBackend, run_batch
+from src.git_diff import GitChanges, git_changes
+from src.ingest import read_source
+from src.hash_register import open_hashes_database, HashRegister
+from src.llm import (
+    batch_files, code_summary_namespace, code_summary_request, file_content_namespace, is_prompt_too_big, llm_generate_summary,
+    llm_generate_summaries, llm_summarize_summary, summaries_summary_request
+)
+from src.metrics import governor, recorder
+from src.planner import plan_summary, report
+from src.scheduler import Task, run_tasks
+from src.similarity import SimilarityMetrics
+from src.tree_index import FileInfo, TreeIndex, build_index, file_info, index_files, refresh_index
+from src.to_html import write_sharded_report, write_summary_html
+from src.watch import open_watcher, wait_for_changes
 from src.classes import Summary, Configurations
 
 
-with open('config/config.yml', 'r', encoding='utf8') as ymlfile:
-    cfg = box.Box(yaml.safe_load(ymlfile))
+BYTES_PER_TOKEN = 4  # Rough number of bytes per token, to recognize small files before reading them
 
 
-def summarize_files(path: Path, hash_register: HashRegister) -> Summary:
+def summarize_files(path: Path, hash_register: HashRegister, tree_index: TreeIndex | None = None) -> Summary | None:
     """Summarize the files in a folder."""
-    files = [subpath for subpath in path.iterdir() if subpath.is_file() and not skip_file(subpath)]
-    if len(files) == 1:
-        return summarize_file(files[0], hash_register)
-    summaries = [summarize_file(filename, hash_register) for filename in files]
-    return summarize_summaries(path, summaries, hash_register, files_only=True)
-
-
-def summarize_file(filename: Path, hash_register: HashRegister) -> Summary:
-    """Summarize one file."""
-    with filename.open(encoding="utf-8") as code_file:
-        contents = code_file.read()
-    if hash_register.is_changed(str(filename), contents):
-        summary_text = llm_generate_summary(path, contents)
-        hash_register.set(str(filename), contents, summary_text)
-    else:
-        summary_text = hash_register.get(str(filename))
-    return Summary(path=str(filename), summary=summary_text)
+    tree_index = tree_index or build_index(path)
+    summaries = summarize_batch(tree_index.files_in(path), hash_register, tree_index)
+    return combine_summaries(path, summaries, hash_register, files_only=True, tree_index=tree_index)
+
+
+def summarize_file(filename: Path, hash_register: HashRegister, tree_index: TreeIndex | None = None) -> Summary | None:
+    """Summarize one file. Files whose size, modification time, and inode did not change are not read.
+
+    Return None if the file is binary or minified, and thus not summarized.
+    """
+    return summarize_batch([filename], hash_register, tree_index)[0]
+
+
+def summarize_batch(filenames: list[Path], hash_register: HashRegister, tree_index: TreeIndex | None = None) -> list[Summary | None]:
+    """Summarize the files, letting the LLM summarize several small changed files per request.
+
+    Return None for files that are binary or minified, and thus not summarized.
+    """
+    summary_texts, changed = registered_summaries(filenames, hash_register, tree_index)
+    namespace = code_summary_namespace() if changed else ""
+    for batch in batch_files(changed):
+        if len(batch) == 1:
+            new_texts = [None]
+        else:
+            new_texts = llm_generate_summaries([(filename, contents) for filename, contents, _ in batch], tree_index)
+        for (filename, contents, stat), summary_text in zip(batch, new_texts):
+            if summary_text is None:  # Not batched, or the LLM did not summarize the file in its batch answer
+                summary_text = llm_generate_summary(filename, contents, tree_index, hash_register)
+            hash_register.set_content(file_content_namespace(namespace, filename), contents, summary_text)
+            hash_register.set(str(filename), contents, summary_text, stat)
+            hash_register.set_similar(namespace, str(filename), contents)
+            summary_texts[filename] = summary_text
+    return [
+        None if summary_texts[filename] is None else add_metrics(Summary(path=str(filename), summary=summary_texts[filename]), str(filename))
+        for filename in filenames
+    ]
+
+
+def registered_summaries(
+    filenames: list[Path], hash_register: HashRegister, tree_index: TreeIndex | None = None
+) -> tuple[dict[Path, str | None], list[tuple[Path, str, FileInfo]]]:
+    """Return the summary texts of the files that need no new summary, and the contents and stat data of the others.
+
+    Files that are binary or minified have None as summary text. A file that is nearly the same as another file that
+    was summarized before, for example apart from a license header or a version string, gets the summary of that file,
+    with the name of that file replaced by its own name.
+    """
+    summary_texts: dict[Path, str | None] = {}
+    changed = []
+    namespace = ""  # Determined when first needed, because it requires building the prompt template
+    for filename in filenames:
+        stat = tree_index.stat(filename) if tree_index and filename in tree_index else file_info(filename)
+        if hash_register.is_stat_unchanged(str(filename), stat):
+            summary_texts[filename] = hash_register.get(str(filename))
+            recorder.record_cache_hit(str(filename), "code")
+            continue
+        contents = summary_texts[filename] = read_source(filename, cfg.MAX_FILE_BYTES)
+        if contents is None:
+            continue
+        if not hash_register.is_changed(str(filename), contents):
+            summary_texts[filename] = hash_register.get(str(filename))
+            hash_register.set_stat(str(filename), stat)
+            recorder.record_cache_hit(str(filename), "code")
+            continue
+        namespace = namespace or code_summary_namespace()
+        if (summary_text := hash_register.find_by_content(file_content_namespace(namespace, filename), contents)) is not None:
+            summary_texts[filename] = summary_text
+            hash_register.set(str(filename), contents, summary_text, stat)
+            hash_register.set_similar(namespace, str(filename), contents)
+            recorder.record_cache_hit(str(filename), "code")
+        elif (similar := hash_register.find_similar(namespace, str(filename), contents)) is not None:
+            similar_key, summary_text = similar
+            summary_text = summary_texts[filename] = replace_file_name(summary_text, Path(similar_key).name, filename.name)
+            # Not added to the similarity index, so reused summaries are not reused in turn for files that drift further
+            hash_register.set(str(filename), contents, summary_text, stat)
+            recorder.record_cache_hit(str(filename), "code")
+        else:
+            changed.append((filename, contents, stat))
+    return summary_texts, changed
+
+
+def replace_file_name(summary_text: str, old_name: str, new_name: str) -> str:
+    """Replace the whole-word occurrences of the old file name in the summary, so io.py doesn't change audio.py."""
+    return re.sub(rf"(?<![\w.-]){re.escape(old_name)}(?![\w-])", lambda _: new_name, summary_text)
 
 
 def summarize_summaries(
     path: Path,
     summaries: list[Summary],
     hash_register: HashRegister,
-    files_only: bool = False
+    files_only: bool = False,
+    tree_index: TreeIndex | None = None
 ) -> Summary:
     """"Summarize the summaries for path."""
     key = f"files@{path}" if files_only else str(path)
     try:
         summary_texts = [summary["summary"] for summary in summaries]
         if hash_register.is_changed(key, str(summary_texts)):
-            summary_text = llm_summarize_summary(path, summary_texts)
+            summary_text = llm_summarize_summary(path, summary_texts, tree_index, hash_register, node=key)
             hash_register.set(key, str(summary_texts), summary_text)
         else:
             summary_text = hash_register.get(key)
+            recorder.record_cache_hit(key, "summaries")
     except ValueError:
         print(path)
         print(summaries)
         raise
-    return Summary(path=str(path), summary=summary_text, summaries=summaries)
+    return add_metrics(Summary(path=str(path), summary=summary_text, summaries=summaries), key)
+
+
+def add_metrics(summary: Summary, node: str) -> Summary:
+    """Add the metrics of the LLM calls for the node to the summary, if any were recorded."""
+    if (metrics := recorder.node_metrics(node)) is not None:
+        summary["metrics"] = metrics
+    return summary
+
+
+def combine_summaries(
+    path: Path,
+    summaries: list[Summary | None],
+    hash_register: HashRegister,
+    files_only: bool = False,
+    tree_index: TreeIndex | None = None
+) -> Summary | None:
+    """Summarize the summaries for path, ignoring missing summaries. One summary needs no further summarizing."""
+    summaries = [summary for summary in summaries if summary is not None]
+    if not summaries:
+        return None
+    if len(summaries) == 1:
+        return summaries[0]
+    return summarize_summaries(path, summaries, hash_register, files_only, tree_index)
 
 
-def summarize_path(path: Path, hash_register: HashRegister) -> Summary:
+def summarize_path(path: Path, hash_register: HashRegister, tree_index: TreeIndex | None = None) -> Summary | None:
     """Summarize all code in the path, recursively."""
     logging.info("Summarizing %s", path)
-    dirs = [subpath for subpath in path.iterdir() if subpath.is_dir() and not skip_dir(subpath)]
-    summaries = [summarize_path(subpath, hash_register) for subpath in dirs]
-    summaries.append(summarize_files(path, hash_register))
-    return summaries[0] if len(summaries) == 1 else summarize_summaries(path, summaries, hash_register)
+    tree_index = tree_index or build_index(path)
+    summaries = [summarize_path(subpath, hash_register, tree_index) for subpath in tree_index.subdirs(path)]
+    summaries.append(summarize_files(path, hash_register, tree_index))
+    return combine_summaries(path, summaries, hash_register, tree_index=tree_index)
+
+
+def summarize_path_concurrently(path: Path, hash_register: HashRegister, max_workers: int) -> Summary | None:
+    """Summarize all code in the path, running independent LLM calls concurrently."""
+    return run_tasks(plan_path(path, hash_register, build_index(path)), max_workers)
+
+
+class IncrementalSummarizer:
+    """Summarize a path, and after changes summarize only the folders with changes and their ancestors again.
+
+    The summaries of folders without changes are kept in memory, so they need neither a walk nor a cache lookup.
+    """
+
+    def __init__(self, path: Path, hash_register: HashRegister) -> None:
+        self.path = path
+        self.hash_register = hash_register
+        self.tree_index = build_index(path)
+        self.folder_summaries: dict[Path, Summary | None] = {}
+        self.files_summaries: dict[Path, Summary | None] = {}  # Summary of the files in a folder
+
+    def update(self, changed_paths: set[Path] | None = None) -> Summary | None:
+        """Summarize the path again, after the changed paths changed. Without changed paths, summarize everything."""
+        recorder.clear()
+        if changed_paths is None or self.path in changed_paths:  # The watcher may report the root if it lost events
+            self.tree_index = build_index(self.path)
+            self.folder_summaries.clear()
+            self.files_summaries.clear()
+            changed_folders: set[Path] = set()
+        else:
+            changed_folders = refresh_index(self.tree_index, changed_paths)
+            for folder in set(self.folder_summaries) - set(self.tree_index.dirs):  # Removed folders
+                del self.folder_summaries[folder]
+                self.files_summaries.pop(folder, None)
+        stale_folders = set(changed_folders)
+        for folder in changed_folders:
+            stale_folders.update(folder.parents)
+        return self.summarize_folder(self.path, changed_folders, stale_folders)
+
+    def summarize_folder(self, path: Path, changed_folders: set[Path], stale_folders: set[Path]) -> Summary | None:
+        """Summarize the folder, reusing the summaries of folders without changes."""
+        if path in self.folder_summaries and path not in stale_folders:
+            return self.folder_summaries[path]
+        summaries = [
+            self.summarize_folder(subpath, changed_folders, stale_folders) for subpath in self.tree_index.subdirs(path)
+        ]
+        if path in changed_folders or path not in self.files_summaries:
+            self.files_summaries[path] = summarize_files(path, self.hash_register, self.tree_index)
+        summaries.append(self.files_summaries[path])
+        summary = combine_summaries(path, summaries, self.hash_register, tree_index=self.tree_index)
+        self.folder_summaries[path] = summary
+        return summary
+
+
+def summarize_path_since(path: Path, hash_register: HashRegister, revision: str) -> Summary | None:
+    """Summarize all code in the path, given the changes since the revision according to git.
 
+    Files that git reports as unchanged are trusted to have the summary in the hash register, without reading or even
+    statting them. Only folders with changes and their ancestors are summarized again. The summaries of renamed files
+    move to the new path.
+    """
+    changes = git_changes(path, revision)
+    return summarize_changes(path, hash_register, changes)
 
-def add_info_to_dict(summary, time):
+
+def summarize_changes(path: Path, hash_register: HashRegister, changes: GitChanges) -> Summary | None:
+    """Summarize all code in the path, summarizing only the changed files and the folders containing them again."""
+    for old_path, new_path in changes.renames.items():
+        hash_register.rename(str(old_path), str(new_path))
+    tree_index = index_files(path, changes.files)
+    changed_paths = changes.changed | set(changes.renames) | set(changes.renames.values())
+    changed_folders = {changed_path.parent for changed_path in changed_paths}
+    affected_folders = set(changed_folders)
+    for folder in changed_folders:
+        affected_folders.update(folder.parents)
+    return summarize_affected_path(path, hash_register, tree_index, changes.changed, affected_folders)
+
+
+def summarize_affected_path(
+    path: Path, hash_register: HashRegister, tree_index: TreeIndex, changed_files: set[Path], affected_folders: set[Path]
+) -> Summary | None:
+    """Summarize the path, taking the summaries of unchanged files and of folders without changes from the register."""
+    if path not in affected_folders:
+        try:
+            return registered_summary(path, hash_register, tree_index)
+        except KeyError:  # Not summarized before, so summarize the folder after all
+            pass
+    summaries = [
+        summarize_affected_path(subpath, hash_register, tree_index, changed_files, affected_folders)
+        for subpath in tree_index.subdirs(path)
+    ]
+    files = tree_index.files_in(path)
+    trusted = {filename for filename in files if filename not in changed_files and str(filename) in hash_register.hashes}
+    untrusted = [filename for filename in files if filename not in trusted]
+    new_summaries = dict(zip(untrusted, summarize_batch(untrusted, hash_register, tree_index)))
+    file_summaries = [
+        registered_file_summary(filename, hash_register) if filename in trusted else new_summaries[filename]
+        for filename in files
+    ]
+    summaries.append(combine_summaries(path, file_summaries, hash_register, files_only=True, tree_index=tree_index))
+    return combine_summaries(path, summaries, hash_register, tree_index=tree_index)
+
+
+def registered_summary(path: Path, hash_register: HashRegister, tree_index: TreeIndex) -> Summary | None:
+    """Return the summary of the folder from the register, without LLM calls or file access.
+
+    Files without a registered summary were skipped as binary or minified. Raise KeyError if a folder summary that
+    would be needed is not registered.
+    """
+    summaries = [registered_summary(subpath, hash_register, tree_index) for subpath in tree_index.subdirs(path)]
+    file_summaries = [
+        registered_file_summary(filename, hash_register)
+        for filename in tree_index.files_in(path) if str(filename) in hash_register.hashes
+    ]
+    summaries.append(registered_combination(path, file_summaries, hash_register, f"files@{path}"))
+    return registered_combination(path, summaries, hash_register, str(path))
+
+
+def registered_file_summary(filename: Path, hash_register: HashRegister) -> Summary:
+    """Return the summary of the file from the register."""
+    recorder.record_cache_hit(str(filename), "code")
+    return Summary(path=str(filename), summary=hash_register.get(str(filename)))
+
+
+def registered_combination(path: Path, summaries: list[Summary | None], hash_register: HashRegister, key: str) -> Summary | None:
+    """Combine the summaries like combine_summaries, taking the summary of the summaries from the register."""
+    summaries = [summary for summary in summaries if summary is not None]
+    if len(summaries) < 2:
+        return summaries[0] if summaries else None
+    recorder.record_cache_hit(key, "summaries")
+    return Summary(path=str(path), summary=hash_register.get(key), summaries=summaries)
+
+
+def watch_path(path: Path, hash_register: HashRegister, sharded_report: bool) -> None:
+    """Summarize the path and write the outputs, and do so again after each burst of changes, until interrupted."""
+    summarizer = IncrementalSummarizer(path, hash_register)
+    watcher = open_watcher(path, cfg.WATCH_POLL_SECONDS)
+    output_folders = {
+        Path(cfg.JSON_FILE_NAME).resolve().parent, Path(cfg.HTML_FILE_NAME).resolve().parent,
+        Path(cfg.HTML_REPORT_DIRECTORY).resolve()
+    }
+    changed_paths = None
+    try:
+        while True:
+            start = timeit.default_timer()
+            if (summary := summarizer.update(changed_paths)) is not None:
+                write_outputs(summary, timeit.default_timer() - start, sharded_report, hash_register.similarity_metrics())
+            logging.info("Watching %s for changes", path)
+            changed_paths = wait_for_changes(watcher, cfg.WATCH_DEBOUNCE_SECONDS, output_folders)
+            logging.info("Summarizing %d changed paths", len(changed_paths))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
+
+
+def plan_path(path: Path, hash_register: HashRegister, tree_index: TreeIndex) -> Task:
+    """Create the task that summarizes the path, with the tasks for the subdirectories and files as dependencies."""
+    tasks = [plan_path(subpath, hash_register, tree_index) for subpath in tree_index.subdirs(path)]
+    tasks.append(plan_files(path, hash_register, tree_index))
+    if len(tasks) == 1:
+        return tasks[0]
+    return Task(partial(combine_summaries, path, hash_register=hash_register, tree_index=tree_index), tasks)
+
+
+def plan_files(path: Path, hash_register: HashRegister, tree_index: TreeIndex) -> Task:
+    """Create the task that summarizes the files in a folder, with the tasks that summarize the files as dependencies.
+
+    Small files are summarized by one task, so they can be summarized in batches. Other files get a task each.
+    """
+    files = tree_index.files_in(path)
+    small_files = [filename for filename in files if tree_index.size(filename) <= cfg.BATCH_FILE_TOKENS * BYTES_PER_TOKEN]
+    if len(small_files) < 2:
+        small_files = []
+    tasks = [
+        Task(lambda _, filename=filename: [summarize_file(filename, hash_register, tree_index)], weight=tree_index.size(filename))
+        for filename in files if filename not in small_files
+    ]
+    if small_files:
+        weight = sum(tree_index.size(filename) for filename in small_files)
+        tasks.append(Task(lambda _: summarize_batch(small_files, hash_register, tree_index), weight=weight))
+    return Task(
+        lambda results: combine_summaries(
+            path, [summary for summaries in results for summary in summaries], hash_register, True, tree_index
+        ),
+        tasks,
+    )
+
+
+def summarize_path_in_batches(
+    path: Path, hash_register: HashRegister, backend: BatchBackend, batch_directory: Path, tree_index: TreeIndex | None = None
+) -> Summary | None:
+    """Summarize all code in the path with offline batch jobs, for throughput and lower cost instead of low latency.
+
+    The first batch job summarizes the files, the second one the files of each folder, and the next ones the folders,
+    deepest folders first. Requests that fail or don't fit in one prompt are run directly afterwards.
+    """
+    tree_index = tree_index or build_index(path)
+    directories = sorted(tree_index.dirs, key=lambda directory: len(directory.parts), reverse=True)
+    filenames = [filename for directory in directories for filename in tree_index.files_in(directory)]
+    summaries = summarize_files_in_batch(filenames, hash_register, backend, batch_directory / "files.jsonl", tree_index)
+    file_summaries = dict(zip(filenames, summaries))
+    files_summaries = summarize_summaries_in_batch(
+        [(directory, [file_summaries[filename] for filename in tree_index.files_in(directory)]) for directory in directories],
+        hash_register, backend, batch_directory / "folder-files.jsonl", True, tree_index
+    )
+    folder_summaries: dict[Path, Summary | None] = {}
+    for depth, wave in groupby(directories, key=lambda directory: len(directory.parts)):
+        items = [
+            (directory, [folder_summaries[subdir] for subdir in tree_index.subdirs(directory)] + [files_summaries[directory]])
+            for directory in wave
+        ]
+        requests_file = batch_directory / f"folders-depth-{depth}.jsonl"
+        folder_summaries.update(summarize_summaries_in_batch(items, hash_register, backend, requests_file, tree_index=tree_index))
+    return folder_summaries[path]
+
+
+def summarize_files_in_batch(
+    filenames: list[Path], hash_register: HashRegister, backend: BatchBackend, requests_file: Path, tree_index: TreeIndex | None = None
+) -> list[Summary | None]:
+    """Summarize the changed files with one batch job, sending files with the same name and identical contents once."""
+    _, changed = registered_summaries(filenames, hash_register, tree_index)
+    requests, custom_ids = {}, {}
+    for filename, contents, _ in changed:
+        if (filename.name, contents) in custom_ids:  # Summaries name the file, so only files with the same name share one
+            continue
+        llm, prompt = code_summary_request(filename, contents, tree_index)
+        if not is_prompt_too_big(llm, prompt):
+            custom_ids[filename.name, contents] = f"file-{len(requests)}"
+            requests[custom_ids[filename.name, contents]] = (llm, prompt)
+    answers = run_batch(requests, backend, requests_file)
+    namespace = code_summary_namespace()
+    for filename, contents, stat in changed:
+        if (summary_text := answers.get(custom_ids.get((filename.name, contents), ""))) is not None:
+            hash_register.set_content(file_content_namespace(namespace, filename), contents, summary_text)
+            hash_register.set(str(filename), contents, summary_text, stat)
+            hash_register.set_similar(namespace, str(filename), contents)
+    # The summaries are registered now, so only files that failed or didn't fit in one prompt still need the LLM
+    return summarize_batch(filenames, hash_register, tree_index)
+
+
+def summarize_summaries_in_batch(
+    items: list[tuple[Path, list[Summary | None]]],
+    hash_register: HashRegister,
+    backend: BatchBackend,
+    requests_file: Path,
+    files_only: bool = False,
+    tree_index: TreeIndex | None = None
+) -> dict[Path, Summary | None]:
+    """Combine the summaries of each path, summarizing the summaries that changed with one batch job."""
+    requests, inputs = {}, {}
+    for path, summaries in items:
+        key = f"files@{path}" if files_only else str(path)
+        summary_texts = [summary["summary"] for summary in summaries if summary is not None]
+        if len(summary_texts) > 1 and hash_register.is_changed(key, str(summary_texts)):
+            llm, prompt = summaries_summary_request(path, summary_texts, tree_index)
+            if not is_prompt_too_big(llm, prompt):
+                custom_id = f"summaries-{len(requests)}"
+                requests[custom_id] = (llm, prompt)
+                inputs[custom_id] = (key, str(summary_texts))
+    for custom_id, summary_text in run_batch(requests, backend, requests_file).items():
+        key, summary_texts = inputs[custom_id]
+        hash_register.set(key, summary_texts, summary_text)
+    # The summaries are registered now, so only summaries that failed or didn't fit in one prompt still need the LLM
+    return {path: combine_summaries(path, summaries, hash_register, files_only, tree_index) for path, summaries in items}
+
+
+def write_outputs(
+    summary: Summary, seconds: float, sharded_report: bool = False, similar_reuse: SimilarityMetrics | None = None
+) -> None:
+    """Add the configuration to the summary and write it to the JSON results file and the HTML report."""
+    time = f"{round(seconds/60)} minutes" if seconds > 100 else f"{round(seconds)} seconds"
+    summaries_data = add_info_to_dict(summary, time, similar_reuse)
+    write_json(summaries_data)
+    if sharded_report:
+        write_sharded_report(summaries_data, Path(cfg.HTML_REPORT_DIRECTORY))
+    else:
+        write_summary_html(summaries_data, cfg.HTML_FILE_NAME)
+
+
+def add_info_to_dict(summary, time, similar_reuse: SimilarityMetrics | None = None):
     """Add configuration settings info to dictionary"""
+    from src.prompt_templates import code_template, summaries_template, map_template, reduce_template
+    from src.chat_prompt_templates import chat_code_summary_template, chat_sum_summary_template, one_shot_code_summary_template, one_shot_sum_summary_template
     details = Configurations(
         time=time,
         max_base_tokens_code=cfg.BASE_MAX_TOKENS_CODE,
         max_base_tokens_summaries=cfg.BASE_MAX_TOKENS_SUM,
         model_type=cfg.MODEL_TYPE,
         model_name=cfg.MODEL_NAME if cfg.MODEL_TYPE == "completion" else cfg.MODEL_CHAT_NAME,
+        llm_metrics=recorder.run_metrics(),
+        llm_throttling=governor().throttle_metrics(),
         prompts={
         'code_prompt':code_template,
         'summaries_prompt':summaries_template,
@@ -91,30 +474,77 @@ def add_info_to_dict(summary, time):
         'chat_code_1shot': str(one_shot_code_summary_template),
         'chat_sum_1shot': str(one_shot_sum_summary_template)
         })
+    if similar_reuse is not None:
+        details['similar_reuse'] = similar_reuse
     summary['details'] = details
     return summary
 
 
 if __name__ == "__main__":
     try:
+        parser = argparse.ArgumentParser(description="Summarize a code base, using an LLM.")
+        parser.add_argument("path", help="folder with the code to summarize")
+        parser.add_argument(
+            "--paranoid", action="store_true", help="hash the contents of all files, even if their stat data did not change"
+        )
+        parser.add_argument(
+            "--batch", action="store_true", help="submit the LLM requests as offline batch jobs, for a cheap first run"
+        )
+        parser.add_argument(
+            "--sharded-report", action="store_true",
+            help="write the HTML report as a page that loads the summaries of each top-level component when expanded"
+        )
+        parser.add_argument(
+            "--plan", nargs="?", const=cfg.MAX_WORKERS, type=int, metavar="CONCURRENCY",
+            help="estimate the LLM calls, tokens, cost, and wall time at the given concurrency, without calling the LLM"
+        )
+        parser.add_argument(
+            "--watch", action="store_true",
+            help="keep running and summarize the changed files and their folders again after each change"
+        )
+        parser.add_argument(
+            "--since", metavar="REVISION",
+            help="summarize only the files that changed since the git revision, trusting the summaries of the other files"
+        )
+        args = parser.parse_args()
         logging.basicConfig(level=logging.INFO)
-        path = Path(sys.argv[1]).resolve(strict=True)
+        path = Path(args.path).resolve(strict=True)
         start = timeit.default_timer()
-        summary_cache = Path(".summary_cache.json")
-        hash_register = load_hashes(summary_cache)
-        summary = summarize_path(path, hash_register)
-        save_hashes(summary_cache, hash_register)
-        end = timeit.default_timer()
-        time =  f"{round((end-start)/60)} minutes" if (end-start) > 100 else f"{round(end-start)} seconds"
-        #add configuration/details data
-        summaries_data = add_info_to_dict(summary, time)
-        #write to json file
-        write_json(summaries_data)
-        #generate and write to html file
-        html_str = summary_to_html_enhanced(summaries_data)
-        write_to_html_file(html_str, cfg.HTML_FILE_NAME)
+        hash_register = open_hashes_database(
+            Path(".summary_cache.db"), json_file_path=Path(".summary_cache.json"), paranoid=args.paranoid,
+            similarity_threshold=cfg.SIMILARITY_THRESHOLD, shingle_words=cfg.SIMILARITY_SHINGLE_WORDS,
+            similarity_max_characters=cfg.SIMILARITY_MAX_CHARACTERS,
+        )
+        if args.plan is not None:
+            print(report(plan_summary(path, hash_register, args.plan)))
+            hash_register.hashes.close()
+            raise SystemExit(0)
+        if args.watch:
+            watch_path(path, hash_register, args.sharded_report)
+            hash_register.hashes.close()
+            raise SystemExit(0)
+        if args.since:
+            summary = summarize_path_since(path, hash_register, args.since)
+        elif args.batch:
+            backend = OpenAIBatchBackend(poll_interval=cfg.BATCH_JOB_POLL_SECONDS)
+            summary = summarize_path_in_batches(path, hash_register, backend, Path(cfg.BATCH_JOB_DIRECTORY))
+        else:
+            summary = summarize_path_concurrently(path, hash_register, cfg.MAX_WORKERS)
+        logging.info(
+            "Reused the summary of identical content for %d of %d changed files (%.0f%%)",
+            hash_register.content_hits, hash_register.content_lookups, 100 * hash_register.content_hit_rate()
+        )
+        similar_reuse = hash_register.similarity_metrics()
+        logging.info(
+            "Reused the summary of nearly the same content for %d of %d changed files (%.0f%%, threshold %.2f)",
+            similar_reuse["hits"], similar_reuse["lookups"], 100 * similar_reuse["hit_rate"], similar_reuse["threshold"]
+        )
+        hash_register.hashes.close()
+        if summary is None:
+            raise SystemExit(f"Path {args.path} contains no files to summarize.")
+        write_outputs(summary, timeit.default_timer() - start, args.sharded_report, similar_reuse)
     except FileNotFoundError:
-        print(f"Path {sys.argv[1]} does not exist. Please provide valid path.")
+        print(f"Path {args.path} does not exist. Please provide valid path.")
     # except OSError:
     #     print(f"Permission Denied. Please grant the necessary permissions.")
     # except Exception as e:
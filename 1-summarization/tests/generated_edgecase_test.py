@@ -81,11 +81,11 @@ class TestLLM(unittest.TestCase):
             mock_cfg.CONTEXT_WINDOW = 0
             self.assertTrue(is_prompt_too_big(None, "test"))
 
-    def test_get_num_tokens_invalid_model(self):
+    def test_get_num_tokens_without_llm_client(self):
         with patch('src.llm.OpenAI') as mock_open_ai:
             mock_open_ai.side_effect = ValueError("Invalid model")
-            with self.assertRaises(ValueError):
-                get_num_tokens("test")
+            self.assertGreater(get_num_tokens("test"), 0)
+            mock_open_ai.assert_not_called()
 
 class TestOutputPresentation(unittest.TestCase):
 
@@ -113,7 +113,7 @@ class TestOutputPresentation(unittest.TestCase):
 
     def test_generate_prompts_html_empty_prompts(self):
         prompts = {}
-        expected_html = '''    <details class="prompts-details" style="margin-left: 40px;">
+        expected_html = '''    <details class="prompts-details depth-2">
       <summary class="summary-title">Prompts Details</summary>
       <ul>
       </ul>
@@ -142,7 +142,7 @@ class TestOutputPresentation(unittest.TestCase):
             details={}
         )
         html = summary_to_html_enhanced(summary)
-        self.assertIn('<h2 style="margin-left: 0px; color: #333366;">Summary of </h2>', html)
+        self.assertIn('<h2 class="summary-header depth-0">Summary of </h2>', html)
         self.assertNotIn('<div class="configuration"', html)
         self.assertNotIn('<details class="summary-detail"', html)
 
@@ -156,7 +156,7 @@ if __name__ == '__main__':
 # 3. Handling file not found and empty code scenarios in `llm_generate_summary`.
 # 4. Testing prompt too big scenario in `llm_generate_summary`.
 # 5. Handling empty summaries in `llm_summarize_summary`.
-# 6. Testing invalid model errors in `create_llm`, `create_chat_llm`, and `get_num_tokens`.
+# 6. Testing invalid model errors in `create_llm` and `create_chat_llm`, and counting tokens without an LLM client in `get_num_tokens`.
 # 7. Handling no context window scenario in `is_prompt_too_big`.
 # 8. Testing no markdown text in `markdown_to_html`.
 # 9. Handling empty prompts in `generate_prompts_html`.
@@ -0,0 +1,51 @@
+"""Unit tests for the results file."""
+
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from src.add_to_JSON import convert_json, read_experiment, read_experiments, write_json
+
+
+class ResultsFileTestCase(unittest.TestCase):
+    """Unit tests for appending and reading results."""
+
+    def setUp(self) -> None:
+        """Create a folder for the results file."""
+        self.directory = tempfile.TemporaryDirectory()
+        self.filename = Path(self.directory.name) / "results.jsonl"
+
+    def tearDown(self) -> None:
+        """Remove the folder."""
+        self.directory.cleanup()
+
+    def test_append(self) -> None:
+        """Test that records are appended per experiment."""
+        write_json({"run": 1}, self.filename, "experiment 1")
+        write_json({"run": 2}, self.filename, "experiment 2")
+        write_json({"run": 3}, self.filename, "experiment 1")
+        self.assertEqual([{"run": 1}, {"run": 3}], read_experiment("experiment 1", self.filename))
+        self.assertEqual(3, len(self.filename.read_text().splitlines()))
+
+    def test_partial_record(self) -> None:
+        """Test that a partial record left by a crash is ignored and overwritten by the next record."""
+        write_json({"run": 1}, self.filename, "experiment")
+        with self.filename.open("a") as file:
+            file.write('{"experiment": "experiment", "da')
+        self.assertEqual([{"run": 1}], read_experiment("experiment", self.filename))
+        write_json({"run": 2}, self.filename, "experiment")
+        self.assertEqual([{"run": 1}, {"run": 2}], read_experiment("experiment", self.filename))
+
+    def test_missing_index(self) -> None:
+        """Test that the index is rebuilt from the results file if it is missing."""
+        write_json({"run": 1}, self.filename, "experiment")
+        self.filename.with_name("results.jsonl.index").unlink()
+        self.assertEqual([{"run": 1}], read_experiment("experiment", self.filename))
+
+    def test_convert(self) -> None:
+        """Test that a JSON results file can be converted."""
+        json_filename = Path(self.directory.name) / "results.json"
+        json_filename.write_text(json.dumps({"experiment 1": [{"run": 1}, {"run": 2}], "experiment 2": [{"run": 3}]}))
+        self.assertEqual(self.filename, convert_json(json_filename))
+        self.assertEqual({"experiment 1": [{"run": 1}, {"run": 2}], "experiment 2": [{"run": 3}]}, read_experiments(self.filename))
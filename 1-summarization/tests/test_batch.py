@@ -0,0 +1,82 @@
+"""Unit tests for summarizing with offline batch jobs."""
+
+import json
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+import summarize_code
+from src.batch import LocalFileBackend, read_answers
+from src.hash_register import HashRegister
+
+
+def answer(body: dict) -> str:
+    """Answer a batch request with the size of the request, so answers differ per prompt."""
+    return f"Summary of {len(json.dumps(body))} characters of request"
+
+
+def summary_texts(summary) -> tuple:
+    """Return the paths and texts of the summary and its nested summaries, leaving out the metrics of the run."""
+    return summary["path"], summary["summary"], [summary_texts(sub_summary) for sub_summary in summary.get("summaries", [])]
+
+
+class SummarizeInBatchesTestCase(unittest.TestCase):
+    """Unit tests for summarizing a folder with batch jobs."""
+
+    def setUp(self) -> None:
+        """Create a folder with a subfolder to summarize."""
+        # The batch requests are created with the settings of the LLM clients, which need an API key
+        patch.dict(os.environ, {"OPENAI_API_KEY": "fake key for creating clients in unit tests"}).start()
+        self.addCleanup(patch.stopall)
+        self.directory = tempfile.TemporaryDirectory()
+        self.root = Path(self.directory.name).resolve() / "tree"  # Next to the backend and batch folders
+        (self.root / "sub").mkdir(parents=True)
+        for filename in ("a.py", "b.py", "sub/c.py", "sub/d.py"):
+            (self.root / filename).write_text(f"print('{filename}')\n")
+        self.backend = LocalFileBackend(self.root.parent / "backend", answer)
+        self.batch_directory = self.root.parent / "batches"
+
+    def tearDown(self) -> None:
+        """Remove the folders."""
+        self.directory.cleanup()
+
+    def summarize(self, hash_register: HashRegister):
+        """Summarize the folder in batches, failing if the LLM is called directly."""
+        with patch.object(summarize_code, "llm_generate_summary", side_effect=AssertionError), \
+                patch.object(summarize_code, "llm_generate_summaries", side_effect=AssertionError), \
+                patch.object(summarize_code, "llm_summarize_summary", side_effect=AssertionError):
+            return summarize_code.summarize_path_in_batches(self.root, hash_register, self.backend, self.batch_directory)
+
+    def test_waves(self) -> None:
+        """Test that files, files per folder, and folders are summarized in separate batch jobs."""
+        hash_register = HashRegister({})
+        summary = self.summarize(hash_register)
+        self.assertEqual(str(self.root), summary["path"])
+        self.assertEqual([str(self.root / "sub"), str(self.root)], [item["path"] for item in summary["summaries"]])
+        jobs = sorted(path.name for path in self.batch_directory.glob("*.jsonl") if "results" not in path.name)
+        self.assertEqual(["files.jsonl", "folder-files.jsonl", f"folders-depth-{len(self.root.parts)}.jsonl"], jobs)
+        self.assertIn(str(self.root / "sub" / "c.py"), hash_register.hashes)
+
+    def test_no_changes(self) -> None:
+        """Test that a second run submits no batch jobs."""
+        hash_register = HashRegister({})
+        summary = self.summarize(hash_register)
+        with patch.object(self.backend, "submit", side_effect=AssertionError):
+            self.assertEqual(summary_texts(summary), summary_texts(self.summarize(hash_register)))
+
+
+class ReadAnswersTestCase(unittest.TestCase):
+    """Unit tests for reading the answers of a batch job."""
+
+    def test_endpoints_agree(self) -> None:
+        """Test that answers of the chat and completion endpoints are stripped the same way."""
+        results = [
+            {"custom_id": "chat", "response": {"status_code": 200, "body": {"choices": [{"message": {"content": "Chat.\n"}}]}}},
+            {"custom_id": "completion", "response": {"status_code": 200, "body": {"choices": [{"text": "\n\nText."}]}}},
+        ]
+        with tempfile.TemporaryDirectory() as directory:
+            results_file = Path(directory) / "results.jsonl"
+            results_file.write_text("".join(json.dumps(result) + "\n" for result in results), encoding="utf-8")
+            self.assertEqual({"chat": "Chat.", "completion": "Text."}, read_answers(results_file))
@@ -0,0 +1,48 @@
+"""Unit tests for summarizing small files in batches."""
+
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+import summarize_code
+from src.hash_register import HashRegister
+from src.llm import split_batch_summaries
+
+
+class SplitBatchSummariesTestCase(unittest.TestCase):
+    """Unit tests for splitting the answer to a batch prompt."""
+
+    def test_split(self) -> None:
+        """Test that the answer is split at the file markers."""
+        self.assertEqual(["One.", "Two."], split_batch_summaries("### File 1\nOne.\n### File 2\nTwo.\n", 2))
+
+    def test_missing_file(self) -> None:
+        """Test that files without summary get None, and unknown file numbers are ignored."""
+        self.assertEqual([None, "Two."], split_batch_summaries("File 2:\nTwo.\nFile 3:\nThree.", 2))
+
+
+class SummarizeBatchTestCase(unittest.TestCase):
+    """Unit tests for summarizing files in batches."""
+
+    def setUp(self) -> None:
+        """Create small files to summarize."""
+        self.directory = tempfile.TemporaryDirectory()
+        self.filenames = []
+        for index in range(3):
+            filename = Path(self.directory.name) / f"file{index}.py"
+            filename.write_text(f"x = {index}\n")
+            self.filenames.append(filename)
+
+    def tearDown(self) -> None:
+        """Remove the files."""
+        self.directory.cleanup()
+
+    def test_batch(self) -> None:
+        """Test that small files are summarized with one request, falling back to one request per missing summary."""
+        with patch.object(summarize_code, "llm_generate_summaries", return_value=["Zero.", None, "Two."]) as batch:
+            with patch.object(summarize_code, "llm_generate_summary", return_value="One.") as single:
+                summaries = summarize_code.summarize_batch(self.filenames, HashRegister({}))
+        batch.assert_called_once()
+        single.assert_called_once()
+        self.assertEqual(["Zero.", "One.", "Two."], [summary["summary"] for summary in summaries])
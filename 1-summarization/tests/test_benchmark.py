@@ -0,0 +1,48 @@
+"""Unit tests for the benchmark suite."""
+
+import tempfile
+import unittest
+from pathlib import Path
+
+from benchmarks.benchmark import METRICS, measure
+from benchmarks.synthetic_tree import generate_tree
+
+
+class BenchmarkTestCase(unittest.TestCase):
+    """Unit tests for generating trees and measuring runs."""
+
+    def setUp(self) -> None:
+        """Create a folder for the tree."""
+        self.directory = tempfile.TemporaryDirectory()
+        self.tree = Path(self.directory.name) / "tree"
+
+    def tearDown(self) -> None:
+        """Remove the folder."""
+        self.directory.cleanup()
+
+    def test_generate_tree(self) -> None:
+        """Test that the tree has the requested shape and the same contents for the same seed."""
+        self.assertEqual(3 * (1 + 2 + 4), generate_tree(self.tree, width=2, depth=2, files_per_folder=3, file_size=100))
+        other_tree = Path(self.directory.name) / "other"
+        generate_tree(other_tree, width=2, depth=2, files_per_folder=3, file_size=100)
+        filename = Path("package_1") / "package_0" / "module_2.py"
+        self.assertEqual((self.tree / filename).read_text(), (other_tree / filename).read_text())
+
+    def test_cold_and_warm(self) -> None:
+        """Test that a warm run reuses the summaries of the cold run."""
+        generate_tree(self.tree, width=2, depth=1, files_per_folder=2, file_size=100)
+        cache_file_name = Path(self.directory.name) / "cache.db"
+        cold = measure(self.tree, cache_file_name, latency=0, max_workers=0)
+        warm = measure(self.tree, cache_file_name, latency=0, max_workers=0)
+        self.assertEqual(set(METRICS), set(cold))
+        self.assertGreater(cold["llm_calls_per_node"], 0)
+        self.assertEqual(0, warm["llm_calls_per_node"])
+        self.assertLess(warm["filesystem_calls"], cold["filesystem_calls"])
+
+    def test_similarity(self) -> None:
+        """Test that the time spent computing MinHash signatures is measured if similarity is on."""
+        generate_tree(self.tree, width=2, depth=1, files_per_folder=2, file_size=100)
+        cache_file_name = Path(self.directory.name) / "cache.db"
+        self.assertEqual(0, measure(self.tree, cache_file_name, latency=0, max_workers=0)["similarity_time"])
+        cache_file_name.unlink()
+        self.assertGreater(measure(self.tree, cache_file_name, latency=0, max_workers=0, similarity=0.95)["similarity_time"], 0)
@@ -0,0 +1,79 @@
+"""Unit tests for the chunker."""
+
+import unittest
+
+from src.chunker import chunk_text, pack_segments, python_segments
+from src.token_counter import count_tokens
+
+MODEL = "gpt-4-turbo"
+
+PYTHON_CODE = '''"""Module docstring."""
+
+import os
+
+
+def first():
+    """First function."""
+    return os.getcwd()
+
+
+@decorator
+def second():
+    return 2
+
+
+class Example:
+    """Example class."""
+
+    def method(self):
+        return 3
+
+    def other_method(self):
+        return 4
+'''
+
+
+class ChunkerTestCase(unittest.TestCase):
+    """Unit tests for splitting text into chunks."""
+
+    def test_fits(self) -> None:
+        """Test that text that fits the budget is one chunk."""
+        self.assertEqual([PYTHON_CODE], chunk_text(PYTHON_CODE, 10000, MODEL, "example.py"))
+
+    def test_budget(self) -> None:
+        """Test that chunks fit the budget and together contain the complete text."""
+        chunks = chunk_text(PYTHON_CODE, 30, MODEL, "example.py")
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual(PYTHON_CODE, "".join(chunks))
+        for chunk in chunks:
+            self.assertLessEqual(count_tokens(chunk, MODEL), 30)
+
+    def test_python_boundaries(self) -> None:
+        """Test that Python code is split before functions, including their decorators."""
+        chunks = chunk_text(PYTHON_CODE, 30, MODEL, "example.py")
+        self.assertTrue(any(chunk.startswith("@decorator\ndef second") for chunk in chunks))
+
+    def test_split_big_class(self) -> None:
+        """Test that a class that does not fit is split at its methods."""
+        segments = python_segments(PYTHON_CODE, PYTHON_CODE.splitlines(keepends=True), 10, MODEL)
+        self.assertIn("    def other_method(self):\n        return 4\n", segments)
+
+    def test_invalid_python(self) -> None:
+        """Test that code that can't be parsed is split at line boundaries."""
+        code = "def broken(:\n" + "x = 1\n" * 200
+        chunks = chunk_text(code, 50, MODEL, "broken.py")
+        self.assertEqual(code, "".join(chunks))
+        self.assertTrue(all(chunk.endswith("\n") for chunk in chunks))
+
+    def test_balanced(self) -> None:
+        """Test that chunks have about the same size."""
+        segments = ["word " * 10 + "\n"] * 11
+        sizes = [count_tokens(chunk, MODEL) for chunk in pack_segments(segments, 100, MODEL)]
+        self.assertEqual(2, len(sizes))
+        self.assertLessEqual(max(sizes) - min(sizes), count_tokens(segments[0], MODEL))
+
+    def test_long_line(self) -> None:
+        """Test that a line that does not fit the budget is split."""
+        chunks = chunk_text("x" * 10000, 100, MODEL)
+        self.assertEqual("x" * 10000, "".join(chunks))
+        self.assertGreater(len(chunks), 1)
@@ -0,0 +1,32 @@
+"""Unit tests for the client registry."""
+
+import unittest
+
+from src.clients import clear_clients, get_client
+
+
+class FakeClient:
+    """Fake LLM client that records its parameters."""
+
+    def __init__(self, http_client, **params) -> None:
+        self.http_client = http_client
+        self.params = params
+
+
+class ClientRegistryTestCase(unittest.TestCase):
+    """Unit tests for the client registry."""
+
+    def tearDown(self) -> None:
+        """Forget the clients created by the test."""
+        clear_clients()
+
+    def test_same_parameters(self) -> None:
+        """Test that the client is reused for the same parameters."""
+        self.assertIs(get_client(FakeClient, model="a", max_tokens=10), get_client(FakeClient, max_tokens=10, model="a"))
+
+    def test_different_parameters(self) -> None:
+        """Test that a new client is created for different parameters, sharing the HTTP client."""
+        client1 = get_client(FakeClient, model="a", max_tokens=10)
+        client2 = get_client(FakeClient, model="a", max_tokens=20)
+        self.assertIsNot(client1, client2)
+        self.assertIs(client1.http_client, client2.http_client)
@@ -0,0 +1,25 @@
+"""Unit tests that the copies of the standard library modules in the other experiments match the originals."""
+
+import unittest
+from pathlib import Path
+
+SOURCE = Path(__file__).parents[1] / "src"
+EXPERIMENTS = Path(__file__).parents[2]
+
+COPIES = {
+    "token_counter.py": ["4-user_stories/src/token_counter.py"],
+    "governor.py": ["3-testing_agent/code_gen/governor.py", "4-user_stories/src/governor.py"],
+    "ignore.py": ["3-testing_agent/code_gen/ignore.py"],
+}
+
+
+class CopiesTestCase(unittest.TestCase):
+    def test_copies_match_originals(self):
+        for name, copies in COPIES.items():
+            for copy in copies:
+                with self.subTest(copy=copy):
+                    self.assertEqual((EXPERIMENTS / copy).read_bytes(), (SOURCE / name).read_bytes())
+
+
+if __name__ == "__main__":
+    unittest.main()
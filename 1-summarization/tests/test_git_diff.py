@@ -0,0 +1,87 @@
+"""Unit tests for summarizing the changes since a git revision."""
+
+import shutil
+import subprocess
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import DEFAULT, patch
+
+import summarize_code
+from src.git_diff import git_changes
+from src.hash_register import HashRegister
+
+
+@unittest.skipUnless(shutil.which("git"), "git is not installed")
+class GitChangesTestCase(unittest.TestCase):
+    """Unit tests for summarizing the files that git reports as changed."""
+
+    def setUp(self) -> None:
+        """Create a git repository with two folders, summarize it, and commit it."""
+        self.directory = tempfile.TemporaryDirectory()
+        self.root = Path(self.directory.name).resolve()
+        self.git("init", "-q")
+        for folder in ("one", "two"):
+            (self.root / folder).mkdir()
+            for name in ("a", "b"):
+                (self.root / folder / f"{name}.py").write_text(f"{folder}_{name} = 1\n")
+        self.commit()
+        self.hash_register = HashRegister({})
+        with self.patch_llm():
+            summarize_code.summarize_path(self.root, self.hash_register)
+
+    def tearDown(self) -> None:
+        """Remove the repository."""
+        self.directory.cleanup()
+
+    def git(self, *args: str) -> None:
+        """Run git in the repository."""
+        subprocess.run(["git", "-C", str(self.root), *args], check=True, capture_output=True)
+
+    def commit(self) -> None:
+        """Commit all changes."""
+        self.git("add", "-A")
+        self.git("-c", "user.name=Test", "-c", "user.email=test@example.org", "commit", "-q", "-m", "Change")
+
+    @staticmethod
+    def patch_llm():
+        """Replace the LLM functions by mocks that return fixed summaries."""
+        return patch.multiple(
+            summarize_code,
+            llm_generate_summary=DEFAULT,
+            llm_generate_summaries=lambda files, *args: [f"Summary of {path.name}." for path, _ in files],
+            llm_summarize_summary=lambda path, *args, **kwargs: f"Summary of {path.name}.",
+        )
+
+    def test_changes(self) -> None:
+        """Test that git reports the modified file and the rename."""
+        (self.root / "one" / "a.py").write_text("one_a = 2\n")
+        self.git("mv", "two/b.py", "two/c.py")
+        changes = git_changes(self.root, "HEAD")
+        self.assertEqual({self.root / "one" / "a.py"}, changes.changed)
+        self.assertEqual({self.root / "two" / "b.py": self.root / "two" / "c.py"}, changes.renames)
+        self.assertEqual(
+            sorted(self.root / path for path in ("one/a.py", "one/b.py", "two/a.py", "two/c.py")), sorted(changes.files)
+        )
+
+    def test_summarize_since(self) -> None:
+        """Test that only the modified file is summarized and read, and the rename reuses the summary."""
+        (self.root / "one" / "a.py").write_text("one_a = 2\n")
+        self.git("mv", "two/b.py", "two/c.py")
+        self.commit()
+        with self.patch_llm() as mocks, patch.object(summarize_code, "read_source", wraps=summarize_code.read_source) as read:
+            mocks["llm_generate_summary"].return_value = "New summary of a.py."
+            summary = summarize_code.summarize_path_since(self.root, self.hash_register, "HEAD~1")
+        mocks["llm_generate_summary"].assert_called_once()
+        read.assert_called_once()
+        self.assertEqual("Summary of b.py.", self.hash_register.get(str(self.root / "two" / "c.py")))
+        self.assertNotIn(str(self.root / "two" / "b.py"), self.hash_register.hashes)
+        files_of_one = summary["summaries"][0]["summaries"]
+        self.assertEqual(["New summary of a.py.", "Summary of b.py."], [file["summary"] for file in files_of_one])
+
+    def test_no_changes(self) -> None:
+        """Test that without changes the summary is taken from the register, without reading files."""
+        with self.patch_llm() as mocks, patch.object(summarize_code, "read_source", side_effect=AssertionError):
+            summary = summarize_code.summarize_path_since(self.root, self.hash_register, "HEAD")
+        mocks["llm_generate_summary"].assert_not_called()
+        self.assertEqual("Summary of " + self.root.name + ".", summary["summary"])
@@ -0,0 +1,130 @@
+"""Unit tests for governing the rate and concurrency of LLM requests, against a local server that throttles."""
+
+import json
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from src.governor import Governor, TokenBucket
+
+
+class ThrottlingServer(ThreadingHTTPServer):
+    """Fake OpenAI chat completions server that throttles the first requests and requests above a concurrency."""
+
+    daemon_threads = True
+
+    def __init__(self, throttled_requests: int = 0, max_in_flight: int = 1000, status: int = 429) -> None:
+        super().__init__(("127.0.0.1", 0), ThrottlingHandler)
+        self.throttled_requests = throttled_requests
+        self.max_in_flight = max_in_flight
+        self.status = status
+        self.in_flight = 0
+        self.requests = 0
+        self.lock = threading.Lock()
+
+    @property
+    def base_url(self) -> str:
+        """Return the base URL of the API."""
+        return f"http://127.0.0.1:{self.server_address[1]}/v1"
+
+
+class ThrottlingHandler(BaseHTTPRequestHandler):
+    """Answer chat completion requests, or refuse them like a rate limited API."""
+
+    def do_POST(self) -> None:
+        """Answer the request after a short delay, unless it is throttled."""
+        self.rfile.read(int(self.headers["Content-Length"]))
+        server = self.server
+        with server.lock:
+            server.requests += 1
+            server.in_flight += 1
+            throttled = server.requests <= server.throttled_requests or server.in_flight > server.max_in_flight
+        try:
+            time.sleep(0.02)
+            if throttled:
+                self.reply(server.status, {"error": {"message": "Rate limit exceeded", "type": "requests", "code": None}})
+            else:
+                message = {"role": "assistant", "content": "Summary."}
+                usage = {"prompt_tokens": 10, "completion_tokens": 2, "total_tokens": 12}
+                choice = {"index": 0, "message": message, "finish_reason": "stop"}
+                self.reply(200, {"id": "1", "object": "chat.completion", "created": 0, "model": "gpt-4-turbo", "choices": [choice], "usage": usage})
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+
+    def reply(self, status: int, body: dict) -> None:
+        """Send the JSON response."""
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        if status == 429:
+            self.send_header("Retry-After", "0")
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format: str, *args) -> None:
+        """Don't log requests."""
+
+
+class GovernorTestCase(unittest.TestCase):
+    """Unit tests for the governor, calling a throttling server with the OpenAI client."""
+
+    def start_server(self, **kwargs) -> ThrottlingServer:
+        """Start the server in a thread and create a client that doesn't retry by itself."""
+        from openai import OpenAI
+
+        server = ThrottlingServer(**kwargs)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        self.client = OpenAI(base_url=server.base_url, api_key="fake key", max_retries=0)
+        return server
+
+    def complete(self) -> str:
+        """Call the chat completions API."""
+        response = self.client.chat.completions.create(model="gpt-4-turbo", messages=[{"role": "user", "content": "Hi"}])
+        return response.choices[0].message.content
+
+    def test_retry_throttled(self) -> None:
+        """Test that throttled calls are retried, and the throttling is measured."""
+        self.start_server(throttled_requests=2)
+        governor = Governor(requests_per_minute=6000, tokens_per_minute=100000, max_concurrency=4, base_delay=0.01)
+        self.assertEqual(("Summary.", 2), governor.call(self.complete, tokens=10))
+        metrics = governor.throttle_metrics()
+        self.assertEqual((1, 2, 2), (metrics["calls"], metrics["throttled"], metrics["retries"]))
+        self.assertLess(metrics["concurrency_limit"], 4)
+
+    def test_adapt_concurrency(self) -> None:
+        """Test that concurrent calls all succeed when the server only allows a few in flight."""
+        server = self.start_server(max_in_flight=2)
+        governor = Governor(requests_per_minute=6000, tokens_per_minute=100000, max_concurrency=8, base_delay=0.01, max_retries=20)
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(lambda _: governor.call(self.complete)[0], range(24)))
+        self.assertEqual(["Summary."] * 24, results)
+        metrics = governor.throttle_metrics()
+        self.assertGreater(metrics["throttled"], 0)
+        self.assertGreater(metrics["throttled_seconds"], 0)
+        self.assertEqual(24 + metrics["retries"], server.requests)
+
+    def test_no_retry(self) -> None:
+        """Test that client errors are not retried."""
+        from openai import BadRequestError
+
+        server = self.start_server(throttled_requests=1, status=400)
+        governor = Governor(requests_per_minute=6000, tokens_per_minute=100000, max_concurrency=4, base_delay=0.01)
+        self.assertRaises(BadRequestError, governor.call, self.complete)
+        self.assertEqual(1, server.requests)
+        self.assertEqual(0, governor.in_flight)
+
+
+class TokenBucketTestCase(unittest.TestCase):
+    """Unit tests for the token bucket."""
+
+    def test_take(self) -> None:
+        """Test that taking more than the bucket holds means waiting until it has refilled."""
+        bucket = TokenBucket(per_minute=60)
+        self.assertEqual(0, bucket.take(60))
+        self.assertAlmostEqual(30, bucket.take(30), delta=0.1)
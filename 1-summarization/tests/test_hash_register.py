@@ -1,8 +1,12 @@
 """Unit tests for the hash register."""
 
+import tempfile
 import unittest
+from pathlib import Path
+from unittest.mock import patch
 
-from src.hash_register import HashRegister
+from src import hash_register
+from src.hash_register import HashRegister, open_hashes_database, save_hashes
 
 
 class HashRegisterTestCase(unittest.TestCase):
@@ -26,3 +30,89 @@ class HashRegisterTestCase(unittest.TestCase):
     def test_check_missing(self) -> None:
         """Test that an item that has not been registered is reported as changed."""
         self.assertTrue(self.register.is_changed("key", "input"))
+
+    def test_unchanged_stat(self) -> None:
+        """Test that a file with the same stat data is unchanged."""
+        self.register.set("key", "input", "output", (10, 123, 1))
+        self.assertTrue(self.register.is_stat_unchanged("key", (10, 123, 1)))
+
+    def test_changed_stat(self) -> None:
+        """Test that a file with different stat data, or without registered stat data, is not known to be unchanged."""
+        self.register.set("key", "input", "output", (10, 123, 1))
+        self.register.set("other key", "input", "output")
+        self.assertFalse(self.register.is_stat_unchanged("key", (10, 456, 1)))
+        self.assertFalse(self.register.is_stat_unchanged("other key", (10, 123, 1)))
+
+    def test_set_stat(self) -> None:
+        """Test that new stat data can be registered without changing the hash and output."""
+        self.register.set("key", "input", "output", (10, 123, 1))
+        self.register.set_stat("key", (10, 456, 1))
+        self.assertTrue(self.register.is_stat_unchanged("key", (10, 456, 1)))
+        self.assertFalse(self.register.is_changed("key", "input"))
+
+    def test_find_by_content(self) -> None:
+        """Test that the output for the same input can be found, regardless of the key."""
+        self.register.set_content("model@prompt", "input", "output")
+        self.assertEqual("output", self.register.find_by_content("model@prompt", "input"))
+        self.assertIsNone(self.register.find_by_content("model@other prompt", "input"))
+        self.assertIsNone(self.register.find_by_content("model@prompt", "other input"))
+        self.assertAlmostEqual(1 / 3, self.register.content_hit_rate())
+
+    def test_paranoid(self) -> None:
+        """Test that a paranoid register never trusts the stat data."""
+        register = HashRegister({}, paranoid=True)
+        register.set("key", "input", "output", (10, 123, 1))
+        self.assertFalse(register.is_stat_unchanged("key", (10, 123, 1)))
+
+
+class SQLiteHashRegisterTestCase(unittest.TestCase):
+    """Unit tests for the hash register stored in a SQLite database."""
+
+    def setUp(self) -> None:
+        """Set up test fixtures."""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.database = Path(self.tmp_dir.name) / "hashes.db"
+        self.register = open_hashes_database(self.database)
+
+    def tearDown(self) -> None:
+        """Remove the database."""
+        self.register.hashes.close()
+        self.tmp_dir.cleanup()
+
+    def test_set_is_committed(self) -> None:
+        """Test that a registered pair is stored in the database immediately."""
+        self.register.set("key", "input", "output")
+        reopened = open_hashes_database(self.database)
+        self.assertFalse(reopened.is_changed("key", "input"))
+        self.assertEqual("output", reopened.get("key"))
+        reopened.hashes.close()
+
+    def test_check_missing(self) -> None:
+        """Test that an item that has not been registered is reported as changed."""
+        self.assertTrue(self.register.is_changed("key", "input"))
+
+    def test_stat_is_committed(self) -> None:
+        """Test that the stat data of a file is stored in the database."""
+        self.register.set("key", "input", "output", (10, 123, 1))
+        reopened = open_hashes_database(self.database)
+        self.assertTrue(reopened.is_stat_unchanged("key", (10, 123, 1)))
+        reopened.hashes.close()
+
+    def test_cache_is_bounded(self) -> None:
+        """Test that only the most recently used entries are cached, and that evicted entries are read from the database."""
+        with patch.object(hash_register, "MAX_CACHED_ENTRIES", 2):
+            for key in ("a", "b", "c"):
+                self.register.set(key, "input", f"output {key}")
+            self.register.get("b")
+            self.register.set("d", "input", "output d")
+            self.assertEqual(["b", "d"], list(self.register.hashes.cache))
+            self.assertEqual("output a", self.register.get("a"))
+
+    def test_import_json(self) -> None:
+        """Test that the JSON hashes file is imported into a new database."""
+        json_file = Path(self.tmp_dir.name) / "hashes.json"
+        save_hashes(json_file, HashRegister({"key": ("hash", "output")}))
+        register = open_hashes_database(Path(self.tmp_dir.name) / "imported.db", json_file_path=json_file)
+        self.assertEqual("output", register.get("key"))
+        self.assertEqual(["key"], list(register.hashes))
+        register.hashes.close()
@@ -0,0 +1,113 @@
+"""Unit tests for skipping paths excluded by skip patterns and ignore files."""
+
+import tempfile
+import unittest
+from pathlib import Path
+
+from src.ignore import IgnoreRules
+from src.skip_dir import ignore_matcher, skip_dir, skip_file
+from src.tree_index import build_index, refresh_index
+
+
+class IgnoreRulesTestCase(unittest.TestCase):
+    """Unit tests for matching paths against the patterns of one ignore file."""
+
+    def ignored(self, lines: list[str], path: str, is_dir: bool = False) -> bool | None:
+        """Return whether the patterns ignore the path, relative to the directory of the ignore file."""
+        return IgnoreRules(Path("/repo"), lines).ignored(f"/repo/{path}", is_dir)
+
+    def test_name_at_any_depth(self) -> None:
+        """Test that a pattern without a slash matches names at any depth."""
+        self.assertTrue(self.ignored(["*.log"], "a/b/debug.log"))
+        self.assertTrue(self.ignored(["node_modules"], "web/node_modules", is_dir=True))
+        self.assertIsNone(self.ignored(["*.log"], "debug.log.py"))
+
+    def test_anchored(self) -> None:
+        """Test that a pattern with a slash only matches relative to the directory of the ignore file."""
+        self.assertTrue(self.ignored(["/generated"], "generated", is_dir=True))
+        self.assertIsNone(self.ignored(["/generated"], "src/generated", is_dir=True))
+        self.assertTrue(self.ignored(["src/*.py"], "src/gen.py"))
+        self.assertIsNone(self.ignored(["src/*.py"], "src/sub/gen.py"))
+
+    def test_double_asterisk(self) -> None:
+        """Test that ** matches any number of directories."""
+        self.assertTrue(self.ignored(["**/fixtures/*.py"], "fixtures/a.py"))
+        self.assertTrue(self.ignored(["**/fixtures/*.py"], "a/b/fixtures/a.py"))
+        self.assertTrue(self.ignored(["docs/**/*.md"], "docs/a/b/c.md"))
+        self.assertTrue(self.ignored(["out/**"], "out/a/b.py"))
+
+    def test_directory_only(self) -> None:
+        """Test that a pattern with a trailing slash only matches directories."""
+        self.assertTrue(self.ignored(["build/"], "build", is_dir=True))
+        self.assertIsNone(self.ignored(["build/"], "build"))
+
+    def test_last_match_decides(self) -> None:
+        """Test that the last matching pattern decides, so negated patterns re-include paths."""
+        self.assertFalse(self.ignored(["*.py", "!keep.py"], "keep.py"))
+        self.assertTrue(self.ignored(["!keep.py", "*.py"], "keep.py"))
+        self.assertTrue(self.ignored(["# comment", "", "\\#literal.py"], "#literal.py"))
+
+
+class SkipTestCase(unittest.TestCase):
+    """Unit tests for the skip patterns."""
+
+    def test_skip_dir(self) -> None:
+        """Test that a directory is skipped if one of its parts matches a skip pattern."""
+        self.assertTrue(skip_dir(Path("src/__pycache__")))
+        self.assertTrue(skip_dir(Path(".git/objects")))
+        self.assertTrue(skip_dir(Path("pkg.egg-info")))
+        self.assertFalse(skip_dir(Path("../src/builder")))
+
+    def test_skip_file(self) -> None:
+        """Test that a file is skipped if its name matches a skip pattern."""
+        self.assertTrue(skip_file(Path("pkg/__init__.py")))
+        self.assertTrue(skip_file(Path("data.json")))
+        self.assertTrue(skip_file(Path(".env")))
+        self.assertFalse(skip_file(Path(".github/main.py")))
+
+
+class IgnoreMatcherTestCase(unittest.TestCase):
+    """Unit tests for walking a tree with ignore files."""
+
+    def setUp(self) -> None:
+        """Set up a tree with nested ignore files."""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp_dir.name)
+        for filename in ("main.py", "gen.py", "node_modules/lib.js", "web/app.js", "web/gen.py", "web/dist/bundle.js"):
+            (self.root / filename).parent.mkdir(parents=True, exist_ok=True)
+            (self.root / filename).write_text("code")
+        (self.root / ".gitignore").write_text("node_modules/\ngen.py\n")
+        (self.root / "web" / ".summaryignore").write_text("dist/\n!gen.py\n")
+
+    def tearDown(self) -> None:
+        """Remove the tree."""
+        self.tmp_dir.cleanup()
+
+    def files(self) -> set[str]:
+        """Return the files that are not skipped, relative to the root."""
+        return {path.relative_to(self.root).as_posix() for _, _, files in ignore_matcher(self.root).walk() for path in files}
+
+    def test_walk(self) -> None:
+        """Test that the walk skips what the ignore files exclude, and that deeper ignore files take precedence."""
+        self.assertEqual({"main.py", "web/app.js", "web/gen.py"}, self.files())
+
+    def test_ignored(self) -> None:
+        """Test that a path is ignored if one of the directories between the root and the path is ignored."""
+        matcher = ignore_matcher(self.root)
+        self.assertTrue(matcher.ignored(self.root / "node_modules" / "lib.js"))
+        self.assertTrue(matcher.ignored(self.root / "web" / "dist" / "bundle.js"))
+        self.assertFalse(matcher.ignored(self.root / "web" / "gen.py"))
+
+    def test_index(self) -> None:
+        """Test that the tree index leaves out what the ignore files exclude."""
+        index = build_index(self.root)
+        self.assertEqual([self.root / "web"], index.subdirs(self.root))
+        self.assertEqual(3, index.number_of_files(self.root))
+
+    def test_refresh_after_ignore_file_changed(self) -> None:
+        """Test that refreshing the index after an ignore file changed applies the new rules below its directory."""
+        index = build_index(self.root)
+        (self.root / "web" / ".summaryignore").write_text("!gen.py\n")
+        refresh_index(index, {self.root / "web" / ".summaryignore"})
+        self.assertEqual([self.root / "web" / "dist"], index.subdirs(self.root / "web"))
+        self.assertEqual(4, index.number_of_files(self.root))
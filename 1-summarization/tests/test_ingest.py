@@ -0,0 +1,71 @@
+"""Unit tests for reading source files."""
+
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+from src import llm
+from src.config import cfg
+from src.ingest import READ_CHUNK_BYTES, SNIFF_BYTES, TRUNCATION_MARKER, read_source
+
+
+class ReadSourceTestCase(unittest.TestCase):
+    """Unit tests for reading source files."""
+
+    def setUp(self) -> None:
+        """Set up a folder for the source files."""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp_dir.name) / "source"
+
+    def tearDown(self) -> None:
+        """Remove the folder."""
+        self.tmp_dir.cleanup()
+
+    def test_text(self) -> None:
+        """Test that a text file is read completely."""
+        self.path.write_text("def f():\n    return 'ü'\n", encoding="utf-8")
+        self.assertEqual("def f():\n    return 'ü'\n", read_source(self.path, 1000))
+
+    def test_binary(self) -> None:
+        """Test that a binary file is skipped."""
+        self.path.write_bytes(b"\x89PNG\r\n\x1a\n\0\0\0\rIHDR")
+        self.assertIsNone(read_source(self.path, 1000))
+
+    def test_minified(self) -> None:
+        """Test that a minified file is skipped."""
+        self.path.write_text("var a=1;" * 5000)
+        self.assertIsNone(read_source(self.path, 100000))
+
+    def test_not_utf8(self) -> None:
+        """Test that a file that is not valid UTF-8 is decoded with replacement characters."""
+        self.path.write_bytes("naïve = True\n".encode("latin-1"))
+        self.assertEqual("na�ve = True\n", read_source(self.path, 1000))
+
+    def test_truncate(self) -> None:
+        """Test that a file larger than the maximum size is truncated, without breaking characters."""
+        self.path.write_text("x = 'ü'\n" * 20000, encoding="utf-8")
+        source = read_source(self.path, 100000)
+        self.assertTrue(source.endswith(TRUNCATION_MARKER))
+        self.assertLessEqual(len(source.removesuffix(TRUNCATION_MARKER).encode("utf-8")), 100000)
+        self.assertNotIn("�", source)
+
+    def test_invalid_utf8_after_split_character(self) -> None:
+        """Test that a character split over two chunks is kept when invalid UTF-8 later in the file switches decoders."""
+        head = b"x = 1\n" * ((SNIFF_BYTES + READ_CHUNK_BYTES - 1) // 6)
+        head += b"#" * (SNIFF_BYTES + READ_CHUNK_BYTES - 1 - len(head))
+        self.path.write_bytes(head + "é\n".encode("utf-8") + b"y = '\xff'\n")
+        source = read_source(self.path, 1000000)
+        self.assertTrue(source.endswith("#é\ny = '\ufffd'\n"))
+
+    def test_larger_than_context_window(self) -> None:
+        """Test that a file with more tokens than the context window is read completely and summarized in chunks."""
+        self.path.write_text("".join(f"value_{index} = compute({index})\n" for index in range(cfg.CONTEXT_WINDOW)))
+        self.assertLess(self.path.stat().st_size, cfg.MAX_FILE_BYTES)
+        source = read_source(self.path, cfg.MAX_FILE_BYTES)
+        self.assertEqual(self.path.read_text(), source)
+        with patch.object(llm, "create_chat_llm", return_value=MagicMock()) as create_llm, \
+                patch.object(llm, "create_llm", create_llm), \
+                patch.object(llm, "chain_summarize_summaries", return_value="Summary of chunks.") as chain:
+            self.assertEqual("Summary of chunks.", llm.llm_generate_summary(self.path, source))
+        chain.assert_called_once_with(source, "source", None, node=str(self.path))
@@ -0,0 +1,50 @@
+"""Unit tests for summarizing with the LLM without blocking the event loop."""
+
+import unittest
+from pathlib import Path
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from src import llm
+from src.metrics import recorder
+
+
+def fake_response(content: str) -> MagicMock:
+    """Return a fake LLM response."""
+    return MagicMock(content=content)
+
+
+class AsyncSummaryTestCase(unittest.IsolatedAsyncioTestCase):
+    """Unit tests for the asynchronous summary functions."""
+
+    def setUp(self) -> None:
+        """Set up a fake LLM that answers with a fixed summary."""
+        self.llm = MagicMock(model_name="gpt-4-turbo")
+        self.llm.ainvoke = AsyncMock(return_value=fake_response("Summary."))
+        patch.object(llm, "create_chat_llm", return_value=self.llm).start()
+        patch.object(llm, "create_llm", return_value=self.llm).start()
+        self.addCleanup(patch.stopall)
+        recorder.clear()
+        self.addCleanup(recorder.clear)
+
+    async def test_generate_summary(self) -> None:
+        """Test that the code is summarized with one awaited call, recorded for the file."""
+        self.assertEqual("Summary.", await llm.allm_generate_summary(Path("main.py"), "print('hello')\n"))
+        self.llm.ainvoke.assert_awaited_once()
+        self.llm.invoke.assert_not_called()
+        self.assertEqual(1, recorder.node_metrics("main.py")["calls"])
+
+    async def test_summarize_summary(self) -> None:
+        """Test that the summaries are summarized with one awaited call, recorded for the node."""
+        summary = await llm.allm_summarize_summary(Path("src"), ["Summary of a.", "Summary of b."], node="node")
+        self.assertEqual("Summary.", summary)
+        self.assertIn("Summary of b.", str(self.llm.ainvoke.call_args.args[0]))
+        self.assertEqual(1, recorder.node_metrics("node")["calls"])
+
+    async def test_prompt_too_big(self) -> None:
+        """Test that code that doesn't fit in the context is summarized with the map-reduce chain."""
+        chain = AsyncMock(return_value="reduced")
+        with patch.object(llm, "is_prompt_too_big", return_value=True), \
+                patch.object(llm, "achain_summarize_summaries", chain):
+            self.assertEqual("reduced", await llm.allm_generate_summary(Path("main.py"), "print('hello')\n"))
+        chain.assert_awaited_once_with("print('hello')\n", "main.py", None, node="main.py")
+        self.llm.ainvoke.assert_not_awaited()
@@ -0,0 +1,114 @@
+"""Unit tests for the map-reduce chain."""
+
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from src import llm_chains
+from src.hash_register import HashRegister
+from src.metrics import recorder
+
+
+def fake_response(content: str) -> MagicMock:
+    """Return a fake LLM response."""
+    return MagicMock(content=content)
+
+
+class ChainTestCase(unittest.TestCase):
+    """Unit tests for summarizing chunks."""
+
+    def setUp(self) -> None:
+        """Set up a fake LLM and split the input into three chunks."""
+        self.llm = MagicMock(model_name="gpt-4-turbo")
+        self.llm.invoke.side_effect = self.invoke
+        self.map_prompts = []
+        self.chunks = ["chunk 1\n", "chunk 2\n", "chunk 3\n"]
+        patch.object(llm_chains, "create_chain_llm", return_value=self.llm).start()
+        patch.object(llm_chains, "split_into_chunks", lambda text, file_name="": list(text)).start()
+        self.addCleanup(patch.stopall)
+
+    def invoke(self, prompt: str) -> MagicMock:
+        """Answer map prompts with the number of the chunk and reduce prompts with a fixed answer."""
+        if prompt.startswith(llm_chains.map_template[:20]):
+            self.map_prompts.append(prompt)
+            return fake_response(f"map {prompt.split('chunk ')[1][0]}")
+        return fake_response("reduced")
+
+    def test_map_reduce(self) -> None:
+        """Test that all chunks are mapped and the map outputs are reduced."""
+        self.assertEqual("reduced", llm_chains.chain_summarize_summaries(self.chunks))
+        self.assertEqual(3, len(self.map_prompts))
+        self.assertIn("map 2", self.llm.invoke.call_args.args[0])
+
+    def test_cache(self) -> None:
+        """Test that only changed chunks are mapped again."""
+        hash_register = HashRegister({})
+        llm_chains.chain_summarize_summaries(self.chunks, hash_register=hash_register)
+        self.map_prompts.clear()
+        llm_chains.chain_summarize_summaries(["chunk 1\n", "changed chunk 2\n", "chunk 3\n"], hash_register=hash_register)
+        self.assertEqual(1, len(self.map_prompts))
+        self.assertIn("changed chunk 2", self.map_prompts[0])
+
+    def test_replaced_chunks_are_dropped(self) -> None:
+        """Test that the map outputs of a node are stored together, so outputs of chunks that changed don't pile up."""
+        hash_register = HashRegister({})
+        llm_chains.chain_summarize_summaries(self.chunks, hash_register=hash_register, node="node")
+        changed_chunks = ["chunk 1\n", "changed chunk 2\n", "chunk 3\n"]
+        llm_chains.chain_summarize_summaries(changed_chunks, hash_register=hash_register, node="node")
+        self.assertEqual(["chunks@0@node"], list(hash_register.hashes))
+        self.assertEqual(["map 1", "map 2", "map 3"], list(llm_chains.map_output_cache(hash_register, "node").values()))
+
+    def test_all_cached(self) -> None:
+        """Test that no map calls are made if all chunks are cached."""
+        hash_register = HashRegister({})
+        llm_chains.chain_summarize_summaries(self.chunks, hash_register=hash_register)
+        llm_chains.chain_summarize_summaries(self.chunks, hash_register=hash_register)
+        self.assertEqual(3, len(self.map_prompts))
+        self.assertEqual(5, self.llm.invoke.call_count)
+
+    def test_metrics(self) -> None:
+        """Test that the map and reduce calls, and the cached map outputs, are recorded for the node."""
+        hash_register = HashRegister({})
+        recorder.clear()
+        self.addCleanup(recorder.clear)
+        llm_chains.chain_summarize_summaries(self.chunks, hash_register=hash_register, node="node")
+        llm_chains.chain_summarize_summaries(self.chunks, hash_register=hash_register, node="node")
+        node_metrics = recorder.node_metrics("node")
+        self.assertEqual(5, node_metrics["calls"])
+        self.assertEqual(3, node_metrics["cache_hits"])
+
+
+class AsyncChainTestCase(unittest.IsolatedAsyncioTestCase):
+    """Unit tests for summarizing chunks without blocking the event loop."""
+
+    def setUp(self) -> None:
+        """Set up a fake LLM and split the input into three chunks."""
+        self.llm = MagicMock(model_name="gpt-4-turbo")
+        self.llm.ainvoke = AsyncMock(side_effect=self.ainvoke)
+        self.map_prompts = []
+        self.chunks = ["chunk 1\n", "chunk 2\n", "chunk 3\n"]
+        patch.object(llm_chains, "create_chain_llm", return_value=self.llm).start()
+        patch.object(llm_chains, "split_into_chunks", lambda text, file_name="": list(text)).start()
+        self.addCleanup(patch.stopall)
+
+    async def ainvoke(self, prompt: str) -> MagicMock:
+        """Answer map prompts with the number of the chunk and reduce prompts with a fixed answer."""
+        if prompt.startswith(llm_chains.map_template[:20]):
+            self.map_prompts.append(prompt)
+            return fake_response(f"map {prompt.split('chunk ')[1][0]}")
+        return fake_response("reduced")
+
+    async def test_map_reduce(self) -> None:
+        """Test that all chunks are mapped and the map outputs are reduced, without calling the LLM synchronously."""
+        self.assertEqual("reduced", await llm_chains.achain_summarize_summaries(self.chunks))
+        self.assertEqual(3, len(self.map_prompts))
+        self.assertIn("map 2", self.llm.ainvoke.call_args.args[0])
+        self.llm.invoke.assert_not_called()
+
+    async def test_cache(self) -> None:
+        """Test that only changed chunks are mapped again."""
+        hash_register = HashRegister({})
+        await llm_chains.achain_summarize_summaries(self.chunks, hash_register=hash_register)
+        self.map_prompts.clear()
+        await llm_chains.achain_summarize_summaries(["chunk 1\n", "changed chunk 2\n", "chunk 3\n"], hash_register=hash_register)
+        self.assertEqual(1, len(self.map_prompts))
+        self.assertIn("changed chunk 2", self.map_prompts[0])
@@ -0,0 +1,46 @@
+"""Unit tests for recording the metrics of LLM calls."""
+
+import unittest
+from unittest.mock import MagicMock, patch
+
+from src.metrics import MetricsRecorder, call_llm, cost, percentiles
+
+
+class MetricsRecorderTestCase(unittest.TestCase):
+    """Unit tests for the metrics recorder."""
+
+    def setUp(self) -> None:
+        """Create a recorder and an LLM that reports its token usage."""
+        self.recorder = MetricsRecorder()
+        self.llm = MagicMock(model_name="gpt-4-turbo")
+        self.llm.invoke.return_value = MagicMock(
+            content="answer", response_metadata={"token_usage": {"prompt_tokens": 1000, "completion_tokens": 100}}
+        )
+
+    def test_call(self) -> None:
+        """Test that a call is recorded for the node with the token usage reported by the API."""
+        with patch("src.metrics.recorder", self.recorder):
+            self.assertEqual("answer", call_llm(self.llm, "prompt", "node", "code"))
+        metrics = self.recorder.node_metrics("node")
+        self.assertEqual((1, 0, 1000, 100), (metrics["calls"], metrics["cache_hits"], metrics["prompt_tokens"], metrics["completion_tokens"]))
+        self.assertAlmostEqual(0.013, metrics["cost"])
+
+    def test_cache_hit(self) -> None:
+        """Test that cache hits are counted, but don't add to the latency of the run."""
+        self.recorder.record_cache_hit("node", "code")
+        run_metrics = self.recorder.run_metrics()
+        self.assertEqual((0, 1, 0.0), (run_metrics["calls"], run_metrics["cache_hits"], run_metrics["latency_p99"]))
+        self.assertIsNone(self.recorder.node_metrics("other node"))
+
+
+class MetricsFunctionsTestCase(unittest.TestCase):
+    """Unit tests for the metrics functions."""
+
+    def test_percentiles(self) -> None:
+        """Test the percentiles of latencies."""
+        self.assertEqual([50.5, 95.05, 99.01], [round(value, 2) for value in percentiles(list(range(1, 101)), (50, 95, 99))])
+        self.assertEqual([2.0, 2.0], percentiles([2.0], (50, 99)))
+
+    def test_cost_of_unknown_model(self) -> None:
+        """Test that tokens of models without a price cost nothing."""
+        self.assertEqual(0.0, cost("unknown", 1000, 1000))
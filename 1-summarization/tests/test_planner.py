@@ -0,0 +1,62 @@
+"""Unit tests for estimating the LLM calls of a run."""
+
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+import summarize_code
+from src.hash_register import HashRegister
+from src.planner import plan_summary, report
+
+
+class PlanSummaryTestCase(unittest.TestCase):
+    """Unit tests for planning a run."""
+
+    def setUp(self) -> None:
+        """Create a folder with two small files and a subfolder with a large file."""
+        self.directory = tempfile.TemporaryDirectory()
+        self.root = Path(self.directory.name).resolve()
+        (self.root / "sub").mkdir()
+        (self.root / "a.py").write_text("a = 1\n")
+        (self.root / "b.py").write_text("b = 2\n")
+        (self.root / "sub" / "c.py").write_text("".join(f"c{index} = {index}\n" for index in range(500)))
+
+    def tearDown(self) -> None:
+        """Remove the folder."""
+        self.directory.cleanup()
+
+    def test_plan_matches_run(self) -> None:
+        """Test that the plan has the calls the run makes: a batch, a file, the files of the root, and the root."""
+        hash_register = HashRegister({})
+        plan = plan_summary(self.root, hash_register, concurrency=2)
+        self.assertEqual({}, hash_register.hashes)
+        with patch.object(summarize_code, "llm_generate_summaries", return_value=["A.", "B."]) as batch, \
+                patch.object(summarize_code, "llm_generate_summary", return_value="C.") as single, \
+                patch.object(summarize_code, "llm_summarize_summary", return_value="Summary.") as summaries:
+            summarize_code.summarize_path(self.root, hash_register)
+        self.assertEqual(
+            sorted(["batch", "code", "summaries", "summaries"]), sorted(call["kind"] for call in plan.calls)
+        )
+        self.assertEqual(batch.call_count + single.call_count + summaries.call_count, len(plan.calls))
+        self.assertGreater(plan.totals()["cost"], 0)
+        self.assertGreaterEqual(plan.wall_time(), plan.totals()["latency"] / 2)
+
+    def test_cached(self) -> None:
+        """Test that a run after an unchanged run needs no calls."""
+        hash_register = HashRegister({})
+        with patch.object(summarize_code, "llm_generate_summaries", return_value=["A.", "B."]), \
+                patch.object(summarize_code, "llm_generate_summary", return_value="C."), \
+                patch.object(summarize_code, "llm_summarize_summary", return_value="Summary."):
+            summarize_code.summarize_path(self.root, hash_register)
+        plan = plan_summary(self.root, hash_register, concurrency=2)
+        self.assertEqual([], plan.calls)
+        self.assertEqual(5, sum(plan.cache_hits.values()))  # Three files, the files of the root, and the root
+        self.assertEqual(0, plan.wall_time())
+
+    def test_report(self) -> None:
+        """Test that the report breaks the plan down by directory and lists the files and folders that cost most."""
+        text = report(plan_summary(self.root, HashRegister({}), concurrency=2), top=1)
+        self.assertIn("4 LLM calls, 0 cache hits", text)
+        self.assertIn("  sub\n", text)
+        self.assertEqual(2, len(text.split("Largest offenders:")[1].strip().splitlines()))  # Column names and one node
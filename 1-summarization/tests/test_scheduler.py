@@ -0,0 +1,48 @@
+"""Unit tests for the task scheduler."""
+
+import threading
+import time
+import unittest
+
+from src.scheduler import Task, run_tasks
+
+
+class SchedulerTestCase(unittest.TestCase):
+    """Unit tests for running task graphs."""
+
+    def test_results_are_passed_to_parent(self) -> None:
+        """Test that the parent task receives the results of its dependencies, in order."""
+        children = [Task(lambda _, index=index: index) for index in range(5)]
+        root = Task(lambda results: results, children)
+        self.assertEqual([0, 1, 2, 3, 4], run_tasks(root, max_workers=3))
+
+    def test_heaviest_task_first(self) -> None:
+        """Test that ready tasks are dispatched heaviest first."""
+        order = []
+        children = [Task(lambda _, weight=weight: order.append(weight), weight=weight) for weight in (1, 30, 20)]
+        run_tasks(Task(lambda _: None, children), max_workers=1)
+        self.assertEqual([30, 20, 1], order)
+
+    def test_concurrency(self) -> None:
+        """Test that independent tasks run concurrently, but not more than the maximum number of workers."""
+        lock = threading.Lock()
+        active, peak = [0], [0]
+
+        def work(_):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.05)
+            with lock:
+                active[0] -= 1
+
+        run_tasks(Task(lambda _: None, [Task(work) for _ in range(8)]), max_workers=3)
+        self.assertEqual(3, peak[0])
+
+    def test_exception(self) -> None:
+        """Test that an exception in a task is raised."""
+        def fail(_):
+            raise ValueError("failed")
+
+        with self.assertRaises(ValueError):
+            run_tasks(Task(lambda _: None, [Task(fail)]), max_workers=2)
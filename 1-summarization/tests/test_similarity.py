@@ -0,0 +1,176 @@
+"""Unit tests for reusing the summaries of nearly the same files."""
+
+import sqlite3
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+import summarize_code
+from src.hash_register import open_hashes_database
+from src.planner import plan_summary
+from src.similarity import MinHasher, SimilarityIndex, similarity
+
+CODE = "\n".join(f"def function_{index}(value):\n    return value * {index}\n" for index in range(100))
+
+
+class MinHasherTestCase(unittest.TestCase):
+    """Unit tests for the MinHash signatures."""
+
+    def setUp(self) -> None:
+        """Create the hasher."""
+        self.hasher = MinHasher()
+
+    def test_identical(self) -> None:
+        """Test that identical texts have the same signature."""
+        self.assertEqual(1.0, similarity(self.hasher.signature(CODE), self.hasher.signature(CODE)))
+
+    def test_nearly_the_same(self) -> None:
+        """Test that texts that differ in a header are estimated to be very similar."""
+        other = "# Copyright 2024, licensed under the Apache License\n" + CODE
+        self.assertGreater(similarity(self.hasher.signature(CODE), self.hasher.signature(other)), 0.8)
+
+    def test_different(self) -> None:
+        """Test that unrelated texts are estimated to be dissimilar."""
+        other = "\n".join(f"class Model{index}:\n    name = 'model {index}'\n" for index in range(100))
+        self.assertLess(similarity(self.hasher.signature(CODE), self.hasher.signature(other)), 0.2)
+
+
+class SimilarityIndexTestCase(unittest.TestCase):
+    """Unit tests for finding nearly the same texts."""
+
+    def setUp(self) -> None:
+        """Create an index with one text."""
+        self.index = SimilarityIndex(sqlite3.connect(":memory:", isolation_level=None), threading.Lock(), threshold=0.8)
+        self.index.add("a.py", "model@prompt", CODE, "hash")
+
+    def test_find(self) -> None:
+        """Test that a nearly the same text in the same namespace is found."""
+        [(key, estimate, hash)] = self.index.find("model@prompt", CODE + "\n# Generated at 2024-05-01 12:00\n")
+        self.assertEqual(("a.py", "hash"), (key, hash))
+        self.assertGreaterEqual(estimate, 0.8)
+
+    def test_not_found(self) -> None:
+        """Test that texts below the threshold or in another namespace are not found."""
+        self.assertEqual([], self.index.find("model@prompt", CODE[: len(CODE) // 2]))
+        self.assertEqual([], self.index.find("model@other prompt", CODE))
+
+    def test_too_long(self) -> None:
+        """Test that texts longer than the maximum are not compared, and replace the previous text at the key."""
+        index = SimilarityIndex(self.index.connection, self.index.lock, threshold=0.8, max_characters=len(CODE))
+        self.assertEqual([], index.find("model@prompt", CODE + "# Long\n"))
+        index.add("a.py", "model@prompt", CODE + "# Long\n", "long hash")
+        self.assertEqual([], index.find("model@prompt", CODE))
+
+    def test_rollback(self) -> None:
+        """Test that a failed add is rolled back, so the previous text stays and the connection isn't left in a transaction."""
+        with patch.object(self.index, "buckets", side_effect=sqlite3.OperationalError("database is locked")):
+            self.assertRaises(sqlite3.OperationalError, self.index.add, "a.py", "model@prompt", "other text", "other hash")
+        self.assertFalse(self.index.connection.in_transaction)
+        self.assertEqual("a.py", self.index.find("model@prompt", CODE)[0][0])
+
+    def test_replace_and_rename(self) -> None:
+        """Test that adding a text at a key replaces the previous text, and that the key can be renamed."""
+        self.index.add("a.py", "model@prompt", "something else entirely", "other hash")
+        self.assertEqual([], self.index.find("model@prompt", CODE))
+        self.index.rename("a.py", "b.py")
+        self.assertEqual("b.py", self.index.find("model@prompt", "something else entirely")[0][0])
+
+
+class ReuseSimilarSummaryTestCase(unittest.TestCase):
+    """Unit tests for reusing the summary of a nearly the same file."""
+
+    def setUp(self) -> None:
+        """Create a register with a similarity index, and two files that differ in a version string."""
+        self.directory = tempfile.TemporaryDirectory()
+        self.register = open_hashes_database(Path(self.directory.name) / "cache.db", similarity_threshold=0.8)
+        self.original = Path(self.directory.name) / "original.py"
+        self.original.write_text('VERSION = "1.0"\n' + CODE)
+        self.copy = Path(self.directory.name) / "copy.py"
+        self.copy.write_text('VERSION = "1.1"\n' + CODE)
+
+    def tearDown(self) -> None:
+        """Close the register and remove the files."""
+        self.register.hashes.close()
+        self.directory.cleanup()
+
+    def test_reuse(self) -> None:
+        """Test that the summary of the nearly the same file is reused with its name patched, without calling the LLM."""
+        with patch.object(summarize_code, "llm_generate_summary", return_value="original.py multiplies values.") as llm:
+            summarize_code.summarize_file(self.original, self.register)
+            summary = summarize_code.summarize_file(self.copy, self.register)
+        llm.assert_called_once()
+        self.assertEqual("copy.py multiplies values.", summary["summary"])
+        metrics = self.register.similarity_metrics()
+        self.assertEqual((0.8, 2, 1, 0.5), (metrics["threshold"], metrics["lookups"], metrics["hits"], metrics["hit_rate"]))
+
+    def test_edited_file_summarized_again(self) -> None:
+        """Test that an edited file is summarized again instead of reusing the summary of its previous version."""
+        with patch.object(summarize_code, "llm_generate_summary", side_effect=["v1 summary", "v2 summary"]) as llm:
+            summarize_code.summarize_file(self.original, self.register)
+            self.original.write_text(self.original.read_text().replace("return value * 7", "raise RuntimeError"))
+            summary = summarize_code.summarize_file(self.original, self.register)
+        self.assertEqual(2, llm.call_count)
+        self.assertEqual("v2 summary", summary["summary"])
+
+    def test_reused_summary_is_not_reused_again(self) -> None:
+        """Test that a file whose summary was reused is not a source for other files, so summaries don't drift."""
+        with patch.object(summarize_code, "llm_generate_summary", return_value="Summary.") as llm:
+            summarize_code.summarize_file(self.original, self.register)
+            summarize_code.summarize_file(self.copy, self.register)
+            self.original.write_text("something else entirely")
+            summarize_code.summarize_file(self.original, self.register)
+            third = Path(self.directory.name) / "third.py"
+            third.write_text(self.copy.read_text() + "\n# Edited\n")
+            summarize_code.summarize_file(third, self.register)
+        self.assertEqual(3, llm.call_count)
+
+    def test_plan(self) -> None:
+        """Test that the plan counts a nearly the same file as a cache hit."""
+        with patch.object(summarize_code, "llm_generate_summary", return_value="Summary."):
+            summarize_code.summarize_file(self.original, self.register)
+        plan = plan_summary(Path(self.directory.name), self.register, concurrency=1)
+        self.assertEqual(["summaries"], [call["kind"] for call in plan.calls])
+
+
+class ReuseIdenticalSummaryTestCase(unittest.TestCase):
+    """Unit tests for reusing the summary of a file with identical contents."""
+
+    def setUp(self) -> None:
+        """Create a register without a similarity index, and a file."""
+        self.directory = tempfile.TemporaryDirectory()
+        self.register = open_hashes_database(Path(self.directory.name) / "cache.db")
+        self.original = Path(self.directory.name) / "original.py"
+        self.original.write_text(CODE)
+
+    def tearDown(self) -> None:
+        """Close the register and remove the files."""
+        self.register.hashes.close()
+        self.directory.cleanup()
+
+    def summarize(self, filename: Path) -> list[str]:
+        """Summarize the original file and then the file with the same contents, and return both summaries."""
+        filename.parent.mkdir(exist_ok=True)
+        filename.write_text(CODE)
+        with patch.object(summarize_code, "llm_generate_summary", side_effect=lambda path, *args: f"{path.name} summary"):
+            return [summarize_code.summarize_file(path, self.register)["summary"] for path in (self.original, filename)]
+
+    def test_same_name(self) -> None:
+        """Test that the summary of a file with the same name and contents is reused."""
+        self.assertEqual(["original.py summary"] * 2, self.summarize(Path(self.directory.name) / "sub" / "original.py"))
+
+    def test_other_name(self) -> None:
+        """Test that the summary of a file with another name is not reused, because it names the other file."""
+        self.assertEqual(["original.py summary", "copy.py summary"], self.summarize(Path(self.directory.name) / "copy.py"))
+
+
+class ReplaceFileNameTestCase(unittest.TestCase):
+    """Unit tests for patching the file name in a reused summary."""
+
+    def test_whole_words(self) -> None:
+        """Test that only whole-word and quoted occurrences of the file name are replaced."""
+        self.assertEqual(
+            "`copy.py` wraps audio.py; see copy.py.",
+            summarize_code.replace_file_name("`io.py` wraps audio.py; see io.py.", "io.py", "copy.py"),
+        )
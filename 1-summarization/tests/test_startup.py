@@ -0,0 +1,35 @@
+"""Unit tests for the startup time of the command line interface."""
+
+import subprocess
+import sys
+import unittest
+
+IMPORT_TIME_BUDGET = 0.5  # Seconds; importing LangChain alone takes more than a second
+HEAVY_MODULES = ("langchain", "langchain_core", "langchain_openai", "openai", "httpx", "tiktoken")
+
+MEASURE_IMPORT = f"""
+import sys, time
+start = time.perf_counter()
+import summarize_code
+print(time.perf_counter() - start)
+print(" ".join(sorted({{name.split(".")[0] for name in sys.modules}} & set({HEAVY_MODULES!r}))))
+"""
+
+
+class StartupTestCase(unittest.TestCase):
+    """Unit tests for importing the summarizer."""
+
+    def setUp(self) -> None:
+        """Import the summarizer in a fresh interpreter, so modules imported by other tests don't count."""
+        output = subprocess.run([sys.executable, "-c", MEASURE_IMPORT], capture_output=True, text=True, check=True)
+        import_time, heavy_modules = (output.stdout.splitlines() + [""])[:2]
+        self.import_time = float(import_time)
+        self.heavy_modules = heavy_modules.split()
+
+    def test_no_heavy_imports(self) -> None:
+        """Test that the LLM libraries and tokenizer are not imported until they are used."""
+        self.assertEqual([], self.heavy_modules)
+
+    def test_import_time(self) -> None:
+        """Test that importing the summarizer stays within the time budget."""
+        self.assertLess(self.import_time, IMPORT_TIME_BUDGET)
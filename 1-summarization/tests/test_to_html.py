@@ -0,0 +1,79 @@
+"""Unit tests for writing the HTML report."""
+
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from src.classes import Configurations, Summary
+from src.to_html import summary_to_html_enhanced, write_sharded_report, write_summary_html
+
+
+class WriteSummaryHtmlTestCase(unittest.TestCase):
+    """Unit tests for writing the HTML report while generating it."""
+
+    def setUp(self) -> None:
+        """Create a nested summary."""
+        details = Configurations(
+            time="1 second", max_base_tokens_code=100, max_base_tokens_summaries=200, model_type="chat",
+            model_name="model", prompts={"code": "Summarize"}
+        )
+        leaf = Summary(path="root/sub/file.py", summary="File **summary**")
+        sub = Summary(path="root/sub", summary="Folder summary", summaries=[leaf])
+        self.summary = Summary(path="root", summary="Root summary", summaries=[sub], details=details)
+
+    def test_write(self) -> None:
+        """Test that the written report is the same as the generated report."""
+        with tempfile.TemporaryDirectory() as directory:
+            filename = Path(directory) / "report.html"
+            write_summary_html(self.summary, filename)
+            self.assertEqual(summary_to_html_enhanced(self.summary), filename.read_text(encoding="utf-8"))
+
+    def test_depth_classes(self) -> None:
+        """Test that nested summaries are indented with CSS classes instead of inline styles."""
+        html = summary_to_html_enhanced(self.summary)
+        self.assertNotIn("style=", html)
+        self.assertIn('<h2 class="summary-header depth-2">Summary of file.py</h2>', html)
+        self.assertIn(".depth-2 { margin-left: 40px; }", html)
+        self.assertNotIn(".depth-3", html)
+
+
+class WriteShardedReportTestCase(unittest.TestCase):
+    """Unit tests for writing the report as a shell page plus shards."""
+
+    def test_shards(self) -> None:
+        """Test that the nested summaries of each top-level component are written to a shard."""
+        leaf = Summary(path="root/sub/file.py", summary="File summary")
+        sub = Summary(path="root/sub", summary="Folder summary", summaries=[leaf])
+        other = Summary(path="root/other.py", summary="Other summary")
+        details = Configurations(
+            time="1 second", max_base_tokens_code=100, max_base_tokens_summaries=200, model_type="chat",
+            model_name="model", prompts={}
+        )
+        summary = Summary(path="root", summary="Root summary", summaries=[sub, other], details=details)
+        with tempfile.TemporaryDirectory() as directory:
+            page = write_sharded_report(summary, Path(directory)).read_text(encoding="utf-8")
+            shards = list((Path(directory) / "shards").glob("*.json"))
+            self.assertEqual([{"depth": 2, "summaries": [leaf]}], [json.loads(shard.read_text()) for shard in shards])
+        self.assertIn(f'data-shard="shards/{shards[0].name}"', page)
+        self.assertIn("Summary of other.py", page)
+        self.assertNotIn("File summary", page)
+
+
+class MetricsHtmlTestCase(unittest.TestCase):
+    """Unit tests for the LLM metrics panel of the report."""
+
+    def test_metrics_panel(self) -> None:
+        """Test that the report shows the run metrics and the components by latency, including nested summaries."""
+        metrics = dict(calls=1, cache_hits=0, latency=2.0, prompt_tokens=10, completion_tokens=5, cost=0.5, retries=0)
+        leaf = Summary(path="root/slow/file.py", summary="File summary", metrics=metrics)
+        slow = Summary(path="root/slow", summary="Slow summary", summaries=[leaf], metrics={**metrics, "latency": 1.0})
+        fast = Summary(path="root/fast.py", summary="Fast summary", metrics={**metrics, "latency": 0.5})
+        details = Configurations(
+            time="1 second", max_base_tokens_code=100, max_base_tokens_summaries=200, model_type="chat",
+            model_name="model", prompts={}, llm_metrics={**metrics, "calls": 3, "latency_p50": 1.0}
+        )
+        html = summary_to_html_enhanced(Summary(path="root", summary="Root", summaries=[slow, fast], details=details))
+        self.assertIn('<p class="depth-1"><b>latency_p50:</b> 1</p>', html)
+        self.assertLess(html.index("<td>root/slow</td><td>3</td>"), html.index("<td>root/fast.py</td><td>0.5</td>"))
+        self.assertNotIn("<b>metrics:</b>", html)
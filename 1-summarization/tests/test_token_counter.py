@@ -0,0 +1,44 @@
+"""Unit tests for the token counter."""
+
+import unittest
+from collections import OrderedDict
+from unittest.mock import patch
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+from src import token_counter
+from src.token_counter import count_message_tokens, count_tokens, count_tokens_batch
+
+MODEL = "gpt-4-turbo"
+
+
+class TokenCounterTestCase(unittest.TestCase):
+    """Unit tests for counting tokens."""
+
+    def test_count(self) -> None:
+        """Test that text has a positive number of tokens."""
+        self.assertGreater(count_tokens("def hello():\n    return 'world'", MODEL), 0)
+
+    def test_batch(self) -> None:
+        """Test that counting a batch gives the same counts as counting the texts one by one."""
+        texts = ["one", "two words", "one", "a somewhat longer text with more tokens"]
+        self.assertEqual([count_tokens(text, MODEL) for text in texts], count_tokens_batch(texts, MODEL))
+
+    def test_memoized(self) -> None:
+        """Test that the same text is only tokenized once."""
+        estimate = patch.object(token_counter, "_estimate_tokens", wraps=token_counter._estimate_tokens)
+        with patch.dict(token_counter._encodings, {MODEL: ("estimate", None)}):
+            with patch.object(token_counter, "_counts", OrderedDict()), estimate as estimate_tokens:
+                self.assertEqual(count_tokens("counted twice", MODEL), count_tokens("counted twice", MODEL))
+        estimate_tokens.assert_called_once_with("counted twice")
+
+    def test_messages(self) -> None:
+        """Test that messages count the tokens of their content plus the tokens of the chat format."""
+        content = "Summarize this"
+        messages = [HumanMessage(content=content), AIMessage(content=content)]
+        expected = 2 * count_tokens(content, MODEL) + count_tokens("user", MODEL) + count_tokens("assistant", MODEL) + 9
+        self.assertEqual(expected, count_message_tokens(messages, MODEL))
+
+    def test_no_messages(self) -> None:
+        """Test that no messages have no tokens."""
+        self.assertEqual(0, count_message_tokens([], MODEL))
@@ -0,0 +1,89 @@
+"""Unit tests for the tree index."""
+
+import tempfile
+import unittest
+from pathlib import Path
+
+from src.tokens_weighting import number_of_files
+from src.tree_index import build_index, refresh_index
+
+
+class TreeIndexTestCase(unittest.TestCase):
+    """Unit tests for indexing a directory tree."""
+
+    def setUp(self) -> None:
+        """Set up a directory tree with files to summarize and files and directories to skip."""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp_dir.name)
+        (self.root / "pkg" / "sub").mkdir(parents=True)
+        (self.root / "__pycache__").mkdir()
+        (self.root / "main.py").write_text("print('main')")
+        (self.root / "notes.txt").write_text("skipped")
+        (self.root / "pkg" / "module.py").write_text("x = 1")
+        (self.root / "pkg" / "__init__.py").write_text("")
+        (self.root / "pkg" / "sub" / "other.py").write_text("y = 2")
+        (self.root / "__pycache__" / "main.pyc").write_text("skipped")
+        self.index = build_index(self.root)
+
+    def tearDown(self) -> None:
+        """Remove the directory tree."""
+        self.tmp_dir.cleanup()
+
+    def test_files(self) -> None:
+        """Test that skipped files are not indexed."""
+        self.assertEqual([self.root / "main.py"], self.index.files_in(self.root))
+
+    def test_subdirs(self) -> None:
+        """Test that skipped directories are not indexed."""
+        self.assertEqual([self.root / "pkg"], self.index.subdirs(self.root))
+
+    def test_size(self) -> None:
+        """Test that the file size is indexed."""
+        self.assertEqual(5, self.index.size(self.root / "pkg" / "module.py"))
+
+    def test_number_of_files(self) -> None:
+        """Test that the number of files is counted recursively, and that a file counts as one file."""
+        self.assertEqual(3, self.index.number_of_files(self.root))
+        self.assertEqual(2, self.index.number_of_files(self.root / "pkg"))
+        self.assertEqual(1, self.index.number_of_files(self.root / "main.py"))
+
+    def test_number_of_files_matches_scan(self) -> None:
+        """Test that the index counts the same number of files as scanning the directory."""
+        self.assertEqual(number_of_files(self.root), number_of_files(self.root, self.index))
+
+
+class RefreshIndexTestCase(unittest.TestCase):
+    """Unit tests for updating the tree index after changes."""
+
+    def setUp(self) -> None:
+        """Set up and index a directory tree."""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp_dir.name)
+        (self.root / "pkg" / "sub").mkdir(parents=True)
+        (self.root / "main.py").write_text("print('main')")
+        (self.root / "pkg" / "sub" / "other.py").write_text("y = 2")
+        self.index = build_index(self.root)
+
+    def tearDown(self) -> None:
+        """Remove the directory tree."""
+        self.tmp_dir.cleanup()
+
+    def test_added_folder(self) -> None:
+        """Test that a new folder is indexed and the file counts of its ancestors are updated."""
+        (self.root / "pkg" / "new").mkdir()
+        (self.root / "pkg" / "new" / "new.py").write_text("z = 3")
+        rescanned = refresh_index(self.index, {self.root / "pkg" / "new" / "new.py"})
+        self.assertEqual({self.root / "pkg"}, rescanned)
+        self.assertEqual([self.root / "pkg" / "new" / "new.py"], self.index.files_in(self.root / "pkg" / "new"))
+        self.assertEqual(3, self.index.number_of_files(self.root))
+
+    def test_removed_folder(self) -> None:
+        """Test that a removed folder is forgotten, and changed files get new file system information."""
+        (self.root / "pkg" / "sub" / "other.py").unlink()
+        (self.root / "pkg" / "sub").rmdir()
+        (self.root / "main.py").write_text("print('changed main')")
+        refresh_index(self.index, {self.root / "pkg" / "sub", self.root / "main.py"})
+        self.assertEqual([], self.index.subdirs(self.root / "pkg"))
+        self.assertNotIn(self.root / "pkg" / "sub", self.index)
+        self.assertEqual(len("print('changed main')"), self.index.size(self.root / "main.py"))
+        self.assertEqual(1, self.index.number_of_files(self.root))
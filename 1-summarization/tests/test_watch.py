@@ -0,0 +1,142 @@
+"""Unit tests for watching a directory tree and summarizing changes."""
+
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import DEFAULT, patch
+
+import summarize_code
+from src.hash_register import HashRegister
+from src.skip_dir import ignore_matcher
+from src.watch import InotifyWatcher, PollingWatcher, wait_for_changes
+
+
+class FakeWatcher:
+    """Watcher that reports prepared changes, one set per call."""
+
+    def __init__(self, root: Path, *changes: dict[Path, bool]) -> None:
+        self.matcher = ignore_matcher(root)
+        self.changes_to_report = list(changes)
+
+    def changes(self, timeout: float) -> dict[Path, bool]:
+        """Return the next prepared changes, or no changes once they have been reported."""
+        return self.changes_to_report.pop(0) if self.changes_to_report else {}
+
+    def close(self) -> None:
+        """Nothing to close."""
+
+
+class WatcherTestCase(unittest.TestCase):
+    """Unit tests for the watchers."""
+
+    def setUp(self) -> None:
+        """Create a folder to watch."""
+        self.directory = tempfile.TemporaryDirectory()
+        self.root = Path(self.directory.name).resolve()
+        (self.root / "sub").mkdir()
+        (self.root / "sub" / "a.py").write_text("a = 1\n")
+
+    def tearDown(self) -> None:
+        """Remove the folder."""
+        self.directory.cleanup()
+
+    @unittest.skipUnless(sys.platform.startswith("linux"), "inotify is only available on Linux")
+    def test_inotify(self) -> None:
+        """Test that inotify reports changed files, also in folders created after the watcher started."""
+        watcher = InotifyWatcher(self.root)
+        self.addCleanup(watcher.close)
+        (self.root / "sub" / "a.py").write_text("a = 2\n")
+        (self.root / "new").mkdir()
+        self.assertEqual({self.root / "sub" / "a.py": False, self.root / "new": True}, watcher.changes(1))
+        (self.root / "new" / "b.py").write_text("b = 1\n")
+        self.assertEqual({self.root / "new" / "b.py": False}, watcher.changes(1))
+
+    def test_polling(self) -> None:
+        """Test that polling reports changed, added, and removed files."""
+        watcher = PollingWatcher(self.root, interval=0)
+        (self.root / "sub" / "a.py").unlink()
+        (self.root / "b.py").write_text("b = 1\n")
+        self.assertEqual({self.root / "sub" / "a.py": False, self.root / "b.py": False}, watcher.changes(1))
+        self.assertEqual({}, watcher.changes(1))
+
+    def test_debounce(self) -> None:
+        """Test that a burst of changes is reported at once, leaving out skipped files and ignored folders."""
+        watcher = FakeWatcher(
+            self.root,
+            {},
+            {self.root / "a.py": False, self.root / "notes.txt": False},
+            {self.root / "b.py": False, self.root / "metrics" / "report.html": False},
+        )
+        self.assertEqual({self.root / "a.py", self.root / "b.py"}, wait_for_changes(watcher, 0, {self.root / "metrics"}))
+
+    def test_ignore_files(self) -> None:
+        """Test that changes excluded by ignore files are left out, relative to a root in a skipped folder."""
+        root = self.root / ".local" / "project"
+        (root / "build").mkdir(parents=True)
+        (root / ".gitignore").write_text("*.log\n")
+        changes = {root / "a.py", root / "debug.log", root / "build" / "b.py", root / ".gitignore", root / "build" / ".gitignore"}
+        changes = dict.fromkeys(changes, False)
+        self.assertEqual({root / "a.py", root / ".gitignore"}, wait_for_changes(FakeWatcher(root, changes), 0))
+
+    @unittest.skipUnless(sys.platform.startswith("linux"), "inotify is only available on Linux")
+    def test_removed_ignored_directory(self) -> None:
+        """Test that removing a directory that the ignore files exclude is not a relevant change."""
+        (self.root / "node_modules").mkdir()
+        (self.root / ".gitignore").write_text("node_modules/\n")
+        watcher = InotifyWatcher(self.root)
+        self.addCleanup(watcher.close)
+        (self.root / "node_modules").rmdir()
+        (self.root / "sub" / "a.py").write_text("a = 2\n")
+        self.assertEqual({self.root / "sub" / "a.py"}, wait_for_changes(watcher, 0.1))
+
+
+class IncrementalSummarizerTestCase(unittest.TestCase):
+    """Unit tests for summarizing only the folders with changes again."""
+
+    def setUp(self) -> None:
+        """Create a folder with two subfolders and summarize it."""
+        self.directory = tempfile.TemporaryDirectory()
+        self.root = Path(self.directory.name).resolve()
+        for folder in ("one", "two"):
+            (self.root / folder).mkdir()
+            for filename in ("a.py", "b.py"):
+                (self.root / folder / filename).write_text(f"{folder}_{filename[0]} = 1\n")
+        self.summarizer = summarize_code.IncrementalSummarizer(self.root, HashRegister({}))
+        with self.patch_llm() as mocks:
+            mocks["llm_generate_summaries"].return_value = ["Summary of a.", "Summary of b."]
+            mocks["llm_summarize_summary"].return_value = "Summary of summaries."
+            self.summarizer.update()
+
+    def tearDown(self) -> None:
+        """Remove the folder."""
+        self.directory.cleanup()
+
+    @staticmethod
+    def patch_llm():
+        """Replace the LLM functions by mocks."""
+        return patch.multiple(
+            summarize_code, llm_generate_summary=DEFAULT, llm_summarize_summary=DEFAULT, llm_generate_summaries=DEFAULT
+        )
+
+    def test_update(self) -> None:
+        """Test that only the changed file, the files of its folder, its folder, and the root are summarized again."""
+        (self.root / "one" / "a.py").write_text("one_a = 2\n")
+        summarize_files = patch.object(summarize_code, "summarize_files", wraps=summarize_code.summarize_files)
+        with self.patch_llm() as mocks, summarize_files as summarize_files:
+            mocks["llm_generate_summary"].return_value = "New summary."
+            mocks["llm_summarize_summary"].return_value = "New summary of summaries."
+            summary = self.summarizer.update({self.root / "one" / "a.py"})
+        summarize_files.assert_called_once_with(self.root / "one", self.summarizer.hash_register, self.summarizer.tree_index)
+        mocks["llm_generate_summary"].assert_called_once()
+        self.assertEqual(2, mocks["llm_summarize_summary"].call_count)  # The files of folder one, and the root
+        self.assertEqual(["one", "two"], [Path(sub_summary["path"]).name for sub_summary in summary["summaries"]])
+
+    def test_removed_folder(self) -> None:
+        """Test that a removed folder is left out of the summary."""
+        for filename in ("a.py", "b.py"):
+            (self.root / "two" / filename).unlink()
+        (self.root / "two").rmdir()
+        with self.patch_llm():
+            summary = self.summarizer.update({self.root / "two"})
+        self.assertEqual(str(self.root / "one"), summary["path"])
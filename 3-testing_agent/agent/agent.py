@@ -11,6 +11,8 @@ from langchain_community.tools.tavily_search import TavilySearchResults
 from tavily import TavilyClient
 from dotenv import load_dotenv
 
+from code_gen.rate_limits import openai_governor as governor, estimate_tokens, max_completion_tokens
+
 load_dotenv()
 
 def reduce_messages(left: list[AnyMessage], right: list[AnyMessage]) -> list[AnyMessage]:
@@ -53,6 +55,7 @@ class Agent:
             interrupt_before=["action"]
             )
         self.tools = {tool.name: tool for tool in tools}
+        self.llm = model
         self.model = model.bind_tools(tools)
 
     def exists_action(self, state:AgentState):
@@ -63,7 +66,9 @@ class Agent:
         messages = state["messages"]
         if self.system:
             messages = [SystemMessage(content=self.system)] + messages
-        message = self.model.invoke(messages)
+        message, _ = governor.call(
+            lambda: self.model.invoke(messages), estimate_tokens(messages) + max_completion_tokens(self.llm)
+        )
         return {"messages": [message]}
     
     def take_action(self, state: AgentState):
@@ -86,7 +91,7 @@ Only look up information when you are sure of what you want. \
 If you need to look up some information before asking a follow up question, you are allowed to do that!
 """
 tool = TavilySearchResults(max_results=2) #increased number of results
-model = ChatOpenAI(model="gpt-3.5-turbo")
+model = ChatOpenAI(model="gpt-3.5-turbo", max_retries=0)
 abot = Agent(model, [tool], system_message=prompt, checkpointer=memory)
 
 messages = [HumanMessage(content="What is the weather like in Amsterdam?")]
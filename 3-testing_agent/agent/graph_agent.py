@@ -14,6 +14,8 @@ from langchain_anthropic import ChatAnthropic
 from langchain_core.messages import ToolMessage, BaseMessage, HumanMessage, AIMessage
 from langchain_community.tools.tavily_search import TavilySearchResults
 
+from code_gen.rate_limits import anthropic_governor as governor, estimate_tokens, max_completion_tokens
+
 # load api keys
 load_dotenv()
 
@@ -33,14 +35,16 @@ def create_tools():
 def build_llm_with_tools(model="claude-3-haiku-20240307"):
     """Creates a LLM and binds it with a list of tools"""
     tools = create_tools()
-    llm = ChatAnthropic(model=model)
+    llm = ChatAnthropic(model=model, max_retries=0)
     return llm.bind_tools(tools)
 
 
 def chatbot(state: State):
     """Calls an LLM using a graph state"""
     llm = build_llm_with_tools()
-    return {"messages": [llm.invoke(state["messages"])]}
+    tokens = estimate_tokens(state["messages"]) + max_completion_tokens(llm.bound)
+    message, _ = governor.call(lambda: llm.invoke(state["messages"]), tokens)
+    return {"messages": [message]}
 
 
 #build the graph
@@ -0,0 +1,206 @@
+"""Govern the rate and concurrency of LLM requests, so concurrent calls stay within the rate limits of the provider.
+
+The governor admits a call when the request-per-minute and token-per-minute buckets allow it and fewer calls are in
+flight than the concurrency limit. The concurrency limit grows by about one for every limit successful calls and halves
+when the provider throttles (additive increase, multiplicative decrease). Throttled and transiently failed calls are
+retried with exponential backoff and full jitter, waiting at least as long as the provider asks.
+
+This module only uses the standard library, so each experiment can use a copy of it.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import random
+import threading
+import time
+from collections.abc import Awaitable, Callable
+from typing import Any, TypedDict, TypeVar
+
+T = TypeVar("T")
+
+RETRYABLE_ERRORS = ("APIConnectionError", "APITimeoutError")  # Names of the connection errors of the OpenAI and Anthropic clients
+
+
+class ThrottleMetrics(TypedDict):
+    """Metrics of the governor."""
+
+    calls: int
+    throttled: int  # Number of responses that said the rate limit was exceeded
+    retries: int
+    throttled_seconds: float  # Time calls waited for the buckets, a concurrency slot, or a backoff
+    concurrency_limit: float
+
+
+class TokenBucket:
+    """Bucket that refills at a rate per minute, up to one minute of capacity. Takes may run the bucket into debt."""
+
+    def __init__(self, per_minute: float) -> None:
+        self.rate = per_minute / 60
+        self.capacity = per_minute
+        self.tokens = per_minute
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def take(self, amount: float) -> float:
+        """Take the amount from the bucket and return how many seconds to wait until the bucket has paid for it."""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= amount
+            return max(0.0, -self.tokens / self.rate)
+
+
+class Governor:
+    """Admit, and retry, LLM calls within the rate limits and an adaptive concurrency limit."""
+
+    def __init__(
+        self,
+        requests_per_minute: float,
+        tokens_per_minute: float,
+        max_concurrency: int,
+        max_retries: int = 6,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0,
+    ) -> None:
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.max_concurrency = max(1, max_concurrency)
+        self.limit = float(self.max_concurrency)
+        self.in_flight = 0
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.condition = threading.Condition()
+        self.last_decrease = 0.0
+        self.metrics = ThrottleMetrics(calls=0, throttled=0, retries=0, throttled_seconds=0.0, concurrency_limit=self.limit)
+
+    def call(self, function: Callable[[], T], tokens: int = 0) -> tuple[T, int]:
+        """Call the function when admitted, retrying throttled and transient failures. Return the result and the retries."""
+        self.add("calls", 1)
+        for attempt in range(self.max_retries + 1):
+            self.wait(self.admit(tokens))
+            try:
+                result = function()
+            except Exception as error:
+                self.release(success=False, throttled=is_throttled(error))
+                if not is_retryable(error) or attempt == self.max_retries:
+                    raise
+                self.wait(self.backoff(attempt, error))
+                self.add("retries", 1)
+            else:
+                self.release(success=True)
+                return result, attempt
+        raise AssertionError("unreachable")
+
+    async def acall(self, function: Callable[[], Awaitable[T]], tokens: int = 0) -> tuple[T, int]:
+        """Call the async function when admitted, without blocking the event loop. Return the result and the retries."""
+        self.add("calls", 1)
+        for attempt in range(self.max_retries + 1):
+            await self.await_delay(await self.aadmit(tokens))
+            try:
+                result = await function()
+            except Exception as error:
+                self.release(success=False, throttled=is_throttled(error))
+                if not is_retryable(error) or attempt == self.max_retries:
+                    raise
+                await self.await_delay(self.backoff(attempt, error))
+                self.add("retries", 1)
+            else:
+                self.release(success=True)
+                return result, attempt
+        raise AssertionError("unreachable")
+
+    def admit(self, tokens: int) -> float:
+        """Wait for a concurrency slot, take from the buckets, and return how long to wait before calling."""
+        start = time.monotonic()
+        with self.condition:
+            while self.in_flight >= int(self.limit):
+                self.condition.wait()
+            self.in_flight += 1
+        self.add("throttled_seconds", time.monotonic() - start)
+        return max(self.requests.take(1), self.tokens.take(tokens))
+
+    async def aadmit(self, tokens: int) -> float:
+        """Wait for a concurrency slot without blocking the event loop, take from the buckets, and return the delay."""
+        start = time.monotonic()
+        while True:
+            with self.condition:
+                if self.in_flight < int(self.limit):
+                    self.in_flight += 1
+                    break
+            await asyncio.sleep(0.05)
+        self.add("throttled_seconds", time.monotonic() - start)
+        return max(self.requests.take(1), self.tokens.take(tokens))
+
+    def release(self, success: bool, throttled: bool = False) -> None:
+        """Free the concurrency slot, and increase the limit after a success or halve it after throttling."""
+        with self.condition:
+            self.in_flight -= 1
+            now = time.monotonic()
+            if success:
+                self.limit = min(float(self.max_concurrency), self.limit + 1 / self.limit)
+            elif throttled and now - self.last_decrease > self.base_delay:  # Calls throttled at the same time count as one signal
+                self.limit = max(1.0, self.limit / 2)
+                self.last_decrease = now
+            self.metrics["concurrency_limit"] = self.limit
+            self.condition.notify_all()
+
+    def backoff(self, attempt: int, error: Exception) -> float:
+        """Return the delay before the next attempt: full jitter, but at least the delay the provider asks for."""
+        if is_throttled(error):
+            self.add("throttled", 1)
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
+        return max(delay, retry_after(error))
+
+    def wait(self, seconds: float) -> None:
+        """Sleep, counting the time as throttled."""
+        if seconds > 0:
+            self.add("throttled_seconds", seconds)
+            time.sleep(seconds)
+
+    async def await_delay(self, seconds: float) -> None:
+        """Sleep without blocking the event loop, counting the time as throttled."""
+        if seconds > 0:
+            self.add("throttled_seconds", seconds)
+            await asyncio.sleep(seconds)
+
+    def add(self, metric: str, amount: float) -> None:
+        """Add the amount to the metric."""
+        with self.condition:
+            self.metrics[metric] += amount
+
+    def throttle_metrics(self) -> ThrottleMetrics:
+        """Return a copy of the metrics."""
+        with self.condition:
+            return ThrottleMetrics(**self.metrics)
+
+
+def is_throttled(error: Exception) -> bool:
+    """Return whether the error says the rate limit was exceeded."""
+    return status_code(error) == 429
+
+
+def is_retryable(error: Exception) -> bool:
+    """Return whether the call may succeed when retried: throttling, server errors, and connection errors."""
+    status = status_code(error)
+    if status is not None:
+        return status == 429 or status >= 500
+    return isinstance(error, (ConnectionError, TimeoutError)) or type(error).__name__ in RETRYABLE_ERRORS
+
+
+def status_code(error: Exception) -> int | None:
+    """Return the HTTP status code of the error of an API client, if any."""
+    status = getattr(error, "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def retry_after(error: Exception) -> float:
+    """Return the number of seconds the provider asks to wait before retrying, or zero if it doesn't say."""
+    response: Any = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return float(headers.get("retry-after", 0))
+    except (TypeError, ValueError):  # An HTTP date instead of seconds
+        return 0.0
@@ -5,8 +5,9 @@ from typing import Dict, TypedDict, List
 # from langchain_core.runnables import RunnablePassthrough
 # from langchain_core.prompts import PromptTemplate
 from langgraph.graph import END, StateGraph
-from llm import code_gen_chain
-from load_docs import concatenated_content, functionality, unit_test
+from code_gen.rate_limits import estimate_tokens, max_completion_tokens
+from code_gen.llm import code_gen_chain, governor, llm
+from code_gen.load_docs import concatenated_content, functionality, unit_test
 from langgraph.graph.state import CompiledStateGraph
 
 class GraphState(TypedDict):
@@ -65,8 +66,9 @@ def generate(state: GraphState):
         ]
 
     # Solution
-    code_solution = code_gen_chain.invoke(
-        {"codefiles": concatenated_content, "messages": messages}
+    code_solution, _ = governor.call(
+        lambda: code_gen_chain.invoke({"codefiles": concatenated_content, "messages": messages}),
+        estimate_tokens(concatenated_content, messages) + max_completion_tokens(llm),
     )
     messages += [
         (
@@ -174,8 +176,9 @@ def reflect(state: GraphState):
     ]
 
     # Add reflection
-    reflections = code_gen_chain.invoke(
-        {"codefiles": concatenated_content, "messages": messages}
+    reflections, _ = governor.call(
+        lambda: code_gen_chain.invoke({"codefiles": concatenated_content, "messages": messages}),
+        estimate_tokens(concatenated_content, messages) + max_completion_tokens(llm),
     )
     messages += [("assistant", f"Here are reflections on the error: {reflections}")]
     return {"generation": code_solution, "messages": messages, "iterations": iterations}
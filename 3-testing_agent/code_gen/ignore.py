@@ -0,0 +1,196 @@
+"""Skip the files and directories excluded by skip patterns and by the ignore files of the tree.
+
+The ignore files, .gitignore and .summaryignore, use the .gitignore syntax. Their patterns apply to the paths below
+the directory they are in, the last matching pattern decides, and the patterns of deeper ignore files take precedence.
+The ignore files of the directories between the top of the Git repository and the root count too. The patterns of each
+ignore file are compiled into one regular expression, so matching a path is a single regex match per ignore file.
+
+A directory that is skipped is not scanned, so its contents are never matched; as with Git, a file can't be re-included
+if its directory is excluded.
+
+This module only uses the standard library, so each experiment can use a copy of it.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+from collections.abc import Iterator
+from pathlib import Path
+
+IGNORE_FILE_NAMES = (".gitignore", ".summaryignore")
+
+
+class IgnoreRules:
+    """The patterns of one ignore file, compiled into one regex for directories and one for files."""
+
+    def __init__(self, directory: Path, lines: list[str]) -> None:
+        self.prefix_length = len(directory.as_posix().rstrip("/")) + 1
+        patterns = [parse(line) for line in lines]
+        patterns = [pattern for pattern in patterns if pattern is not None]
+        self.dirs, self.negated_dirs = compile_patterns(patterns)
+        self.files, self.negated_files = compile_patterns([pattern for pattern in patterns if not pattern[2]])
+
+    def ignored(self, path: str, is_dir: bool) -> bool | None:
+        """Return whether the last pattern matching the path ignores it, or None if no pattern matches.
+
+        The path is a POSIX path below the directory of the ignore file.
+        """
+        regex, negated = (self.dirs, self.negated_dirs) if is_dir else (self.files, self.negated_files)
+        match = regex.fullmatch(path, self.prefix_length) if regex else None
+        return None if match is None else not negated[match.lastindex - 1]
+
+
+class IgnoreMatcher:
+    """Decide which directories and files below the root to skip, and walk the root without the skipped ones."""
+
+    def __init__(self, root: Path, skipped_dir_names: re.Pattern[str], skipped_file_names: re.Pattern[str]) -> None:
+        self.root = root
+        self.skipped_dir_names = skipped_dir_names
+        self.skipped_file_names = skipped_file_names
+        self.top = repository_top(root.absolute())
+        self.rules_by_dir: dict[Path, tuple[IgnoreRules, ...]] = {}  # Absolute directory to its rules
+
+    def rules(self, directory: Path, names: set[str] | None = None) -> tuple[IgnoreRules, ...]:
+        """Return the rules of the ignore files in the absolute directory and its parents up to the top, deepest first.
+
+        If the names of the entries of the directory are known, only the ignore files among them are read.
+        """
+        if directory in self.rules_by_dir:
+            return self.rules_by_dir[directory]
+        parent_rules = () if directory in (self.top, directory.parent) else self.rules(directory.parent)
+        rules = [
+            IgnoreRules(directory, lines)
+            for name in IGNORE_FILE_NAMES if names is None or name in names
+            if (lines := read_lines(directory / name)) is not None
+        ]
+        self.rules_by_dir[directory] = tuple(reversed(rules)) + parent_rules  # .summaryignore before .gitignore
+        return self.rules_by_dir[directory]
+
+    def forget(self, directory: Path) -> None:
+        """Forget the rules of the directory and the directories below it, so changed ignore files are read again."""
+        directory = directory.absolute()
+        for cached in [cached for cached in self.rules_by_dir if cached == directory or directory in cached.parents]:
+            del self.rules_by_dir[cached]
+
+    def skip(self, path: Path, is_dir: bool) -> bool:
+        """Return whether to skip the path, assuming the directories between the root and the path are not skipped."""
+        path = path.absolute()
+        return self.skip_entry(path.name, path.as_posix(), is_dir, self.rules(path.parent))
+
+    def skip_entry(self, name: str, path: str, is_dir: bool, rules: tuple[IgnoreRules, ...]) -> bool:
+        """Return whether to skip the entry with the name and absolute POSIX path, given the rules of its directory."""
+        if (self.skipped_dir_names if is_dir else self.skipped_file_names).match(name):
+            return True
+        for ignore_rules in rules:
+            if (ignored := ignore_rules.ignored(path, is_dir)) is not None:
+                return ignored
+        return False
+
+    def ignored(self, path: Path, is_dir: bool = False) -> bool:
+        """Return whether to skip the path below the root, or one of the directories between the root and the path."""
+        directory = self.root
+        for part in path.relative_to(self.root).parts[:-1]:
+            directory = directory / part
+            if self.skip(directory, is_dir=True):
+                return True
+        return self.skip(path, is_dir)
+
+    def scan(self, directory: Path) -> Iterator[tuple[os.DirEntry[str], bool]]:
+        """Scan the directory and yield the entries that are not skipped, with whether the entry is a directory."""
+        with os.scandir(directory) as iterator:
+            entries = list(iterator)
+        absolute = directory.absolute()
+        rules = self.rules(absolute, {entry.name for entry in entries})
+        prefix = absolute.as_posix().rstrip("/") + "/"
+        for entry in entries:
+            is_dir = entry.is_dir()
+            if (is_dir or entry.is_file()) and not self.skip_entry(entry.name, prefix + entry.name, is_dir, rules):
+                yield entry, is_dir
+
+    def walk(self, directory: Path | None = None) -> Iterator[tuple[Path, list[Path], list[Path]]]:
+        """Walk the directory top-down, like os.walk, without scanning skipped directories."""
+        directory = self.root if directory is None else directory
+        dirs, files = [], []
+        for entry, is_dir in self.scan(directory):
+            (dirs if is_dir else files).append(directory / entry.name)
+        yield directory, dirs, files
+        for subdir in dirs:
+            yield from self.walk(subdir)
+
+
+def parse(line: str) -> tuple[str, bool, bool] | None:
+    """Parse a line of an ignore file into a pattern, whether it is negated, and whether it only matches directories."""
+    line = line.rstrip("\n")
+    if not line.endswith("\\ "):
+        line = line.rstrip(" ")
+    if not line or line.startswith("#"):
+        return None
+    negated = line.startswith("!")
+    if negated or line.startswith("\\!") or line.startswith("\\#"):
+        line = line[1:]
+    dir_only = line.endswith("/")
+    line = line.rstrip("/")
+    return (line, negated, dir_only) if line else None
+
+
+def compile_patterns(patterns: list[tuple[str, bool, bool]]) -> tuple[re.Pattern[str] | None, list[bool]]:
+    """Compile the patterns into one regex with a group per pattern, last pattern first, so the first match decides."""
+    if not patterns:
+        return None, []
+    patterns = list(reversed(patterns))
+    regex = "|".join(f"({translate(pattern)})" for pattern, _, _ in patterns)
+    return re.compile(regex, re.DOTALL), [negated for _, negated, _ in patterns]
+
+
+def translate(pattern: str) -> str:
+    """Translate a .gitignore pattern to a regex without groups.
+
+    A pattern with a slash at the start or in the middle is anchored to the directory of the ignore file; a pattern
+    without matches names at any depth.
+    """
+    anchored = "/" in pattern
+    pattern = pattern.lstrip("/")
+    regex, index = [], 0
+    while index < len(pattern):
+        if pattern.startswith("**/", index) and (index == 0 or pattern[index - 1] == "/"):
+            regex.append("(?:.*/)?")  # Zero or more directories
+            index += 3
+        elif pattern.startswith("**", index) and index + 2 == len(pattern) and (index == 0 or pattern[index - 1] == "/"):
+            regex.append(".*")  # Everything inside
+            index += 2
+        elif pattern[index] == "*":
+            regex.append("[^/]*")
+            index += 1
+        elif pattern[index] == "?":
+            regex.append("[^/]")
+            index += 1
+        elif pattern[index] == "[" and (end := pattern.find("]", index + 2)) != -1:
+            characters = pattern[index + 1: end]
+            negated = characters[0] in "!^"
+            characters = characters[1:] if negated else characters
+            regex.append(f"[{'^' if negated else ''}{characters.replace(chr(92), chr(92) * 2)}]")
+            index = end + 1
+        elif pattern[index] == "\\" and index + 1 < len(pattern):
+            regex.append(re.escape(pattern[index + 1]))
+            index += 2
+        else:
+            regex.append(re.escape(pattern[index]))
+            index += 1
+    return "".join(regex) if anchored else "(?:.*/)?" + "".join(regex)
+
+
+def read_lines(filename: Path) -> list[str] | None:
+    """Return the lines of the file, or None if it can't be read."""
+    try:
+        return filename.read_text(encoding="utf-8", errors="replace").splitlines()
+    except OSError:
+        return None
+
+
+def repository_top(root: Path) -> Path:
+    """Return the top directory of the Git repository containing the root, or the root if it is not in a repository."""
+    for directory in (root, *root.parents):
+        if (directory / ".git").exists():
+            return directory
+    return root
@@ -3,6 +3,8 @@ from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.pydantic_v1 import BaseModel, Field
 from dotenv import load_dotenv
 
+from code_gen.rate_limits import anthropic_governor as governor
+
 load_dotenv()
 
 ### Anthropic
@@ -51,6 +53,7 @@ expt_llm = "claude-3-opus-20240229"
 llm = ChatAnthropic(
     model=expt_llm,
     default_headers={"anthropic-beta": "tools-2024-04-04"},
+    max_retries=0,
 )
 
 structured_llm_claude = llm.with_structured_output(code, include_raw=True)
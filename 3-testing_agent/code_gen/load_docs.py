@@ -1,19 +1,14 @@
-import os
-from skip_dir import skip_dir, skip_file
+from code_gen.ignore import IgnoreMatcher
+from code_gen.skip_dir import skipped_dir_names, skipped_file_names
 from pathlib import Path
 
 
 def get_dir_files(path:Path) -> list[Path]:
-    file_paths = []
-    for root, dirs, files in os.walk(path):
-        # Filter out skipped directories
-        dirs[:] = [d for d in dirs if not skip_dir(Path(root) / d)]
-        
-        for file in files:
-            file_path = Path(root) / file
-            if not skip_file(file_path):
-                    file_paths.append(file_path)
-    return file_paths
+    """Return the files in the directory, without the skipped files and the files excluded by .gitignore and .summaryignore files"""
+    if not Path(path).is_dir():
+        return []
+    matcher = IgnoreMatcher(Path(path), skipped_dir_names, skipped_file_names)
+    return [file_path for _, _, files in matcher.walk() for file_path in files]
 
 def get_dir_content(path:Path) -> dict:
     file_content = {}
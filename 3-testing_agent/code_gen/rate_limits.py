@@ -0,0 +1,24 @@
+"""The governors of the testing agent experiment, one per provider, shared by all LLM calls of the process.
+
+All modules import them as code_gen.rate_limits, so run the scripts as modules from the 3-testing_agent folder, for
+example python -m code_gen.graph or python -m agent.agent. The clients are created with max_retries=0; the governors
+retry throttled and transiently failed calls.
+"""
+
+from typing import Any
+
+from code_gen.governor import Governor
+
+anthropic_governor = Governor(requests_per_minute=50, tokens_per_minute=40000, max_concurrency=4)
+openai_governor = Governor(requests_per_minute=500, tokens_per_minute=60000, max_concurrency=4)
+
+
+def estimate_tokens(*texts: Any) -> int:
+    """Return an estimate of the number of tokens of the texts, at about four characters per token."""
+    return sum(len(str(text)) for text in texts) // 4
+
+
+def max_completion_tokens(llm: Any) -> int:
+    """Return the maximum number of completion tokens of the LLM client, or zero if not limited."""
+    max_tokens = getattr(llm, "max_tokens", None)
+    return max_tokens if isinstance(max_tokens, int) else 0
@@ -1,14 +1,20 @@
+import fnmatch
+import re
 from pathlib import Path
 
+dirs_to_skip = [".*", "*.egg-info", "build", "venv", "__pycache__", "testdata", "metrics", "docs", "example_files"]
+filenames_to_skip = [".*", "__init__.py", "*.txt", "*.xml", "*.json", "*.png", "*.ico", "*.gif", "*.zip", "summarize_code.py", "...summary_cache.json", "*.pdf", "*.docx"]
+
+# The patterns combined into one regex each, so a name is matched once instead of once per pattern
+skipped_dir_names = re.compile("|".join(fnmatch.translate(pattern) for pattern in dirs_to_skip))
+skipped_file_names = re.compile("|".join(fnmatch.translate(pattern) for pattern in filenames_to_skip))
+
+
 def skip_dir(path: Path) -> bool:
     """Return whether to skip the directory."""
-    dirs_to_skip = [".*", "*.egg-info", "build", "venv", "__pycache__", "testdata", "metrics", "docs", "example_files"]
-
-    return any(path.match(dir_pattern) for dir_pattern in dirs_to_skip)
+    return skipped_dir_names.match(path.name) is not None
 
 
 def skip_file(file_path: Path) -> bool:
     """Return whether to skip the file."""
-    filenames_to_skip = [".*", "__init__.py", "*.txt", "*.xml", "*.json", "*.png", "*.ico", "*.gif", "*.zip", "summarize_code.py", "...summary_cache.json", "*.pdf", "*.docx"]
-    return any(file_path.match(file_pattern) for file_pattern in filenames_to_skip)
-
+    return skipped_file_names.match(file_path.name) is not None
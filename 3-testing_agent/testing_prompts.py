@@ -1,8 +1,10 @@
 import anthropic
-import os
 import sys
+from functools import lru_cache
 from dotenv import load_dotenv
-from code_gen.skip_dir import skip_dir, skip_file
+from code_gen.rate_limits import anthropic_governor, estimate_tokens
+from code_gen.ignore import IgnoreMatcher
+from code_gen.skip_dir import skipped_dir_names, skipped_file_names
 from pathlib import Path
 
 load_dotenv()
@@ -39,11 +41,18 @@ Remember, your tests should be focused specifically on {functionality}. Do not w
     return prompt
 
 
+@lru_cache(maxsize=None)
+def anthropic_client():
+    """Create the Anthropic client once, so its HTTP connections are reused across calls; the governor retries"""
+    return anthropic.Anthropic(max_retries=0)
+
+
 def call_anthropic_llm(prompt):  
-    client = anthropic.Anthropic()
-    message = client.messages.create(
+    client = anthropic_client()
+    max_tokens = 4000
+    message, _ = anthropic_governor.call(lambda: client.messages.create(
     model="claude-3-opus-20240229",
-    max_tokens=4000,
+    max_tokens=max_tokens,
     temperature=0,
     system="You are a quality assurance expert that focuses on writing precise unit tests.",
     messages=[
@@ -57,7 +66,7 @@ def call_anthropic_llm(prompt):
             ]
         }
     ]
-)
+), estimate_tokens(prompt) + max_tokens)
     return message.content[0].text
 
 def generate_unit_test(codefiles, functionality, unit_test):
@@ -67,16 +76,11 @@ def generate_unit_test(codefiles, functionality, unit_test):
 
 
 def get_dir_files(path:Path) -> list[Path]:
-    file_paths = []
-    for root, dirs, files in os.walk(path):
-        # Filter out skipped directories
-        dirs[:] = [d for d in dirs if not skip_dir(Path(root) / d)]
-        
-        for file in files:
-            file_path = Path(root) / file
-            if not skip_file(file_path):
-                    file_paths.append(file_path)
-    return file_paths
+    """Return the files in the directory, without the skipped files and the files excluded by .gitignore and .summaryignore files"""
+    if not Path(path).is_dir():
+        return []
+    matcher = IgnoreMatcher(Path(path), skipped_dir_names, skipped_file_names)
+    return [file_path for _, _, files in matcher.walk() for file_path in files]
 
 def get_dir_content(path:Path) -> dict:
     file_content = {}
@@ -1,5 +1,5 @@
 from langchain_core.prompts import ChatPromptTemplate, PromptTemplate
-from src.llm import create_llm
+from src.llm import create_llm, get_call_tokens, invoke
 
 def fill_prompt(template, fo_summary, use_case, user_stories):
     return template.format_messages(fo_summary=fo_summary, use_case=use_case, user_stories_list=user_stories)
@@ -15,7 +15,7 @@ def generate_comments(user_stories, fo_summary:str, use_case:str, role:str):
         prompt = fill_prompt(template=evaluate_template_po, fo_summary=fo_summary, use_case=use_case, user_stories=user_stories)
     if role == "dev":
         prompt = fill_prompt(template=evaluate_template_dev, fo_summary=fo_summary, use_case=use_case, user_stories=user_stories)
-    return llm.invoke(prompt).content
+    return invoke(llm, prompt, get_call_tokens(llm, prompt)).content
 
 evaluate_template_po = ChatPromptTemplate.from_messages(
     [
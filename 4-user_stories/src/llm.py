@@ -1,21 +1,50 @@
+from functools import lru_cache
+
 from dotenv import load_dotenv
 from langchain_openai import ChatOpenAI
 
+from src.governor import Governor
+from src.token_counter import count_message_tokens, count_tokens
+
 
 #load API key from .env
 load_dotenv()
 
 model = "gpt-4-0125-preview"
 context_window = 16385
+requests_per_minute = 500
+tokens_per_minute = 300000
+max_concurrency = 4
+completion_tokens = 1000  # Estimate of the completion tokens of a call to an LLM without max_tokens
+
+# Shared by all LLM calls, so concurrent calls stay within the rate limits; the clients don't retry themselves
+governor = Governor(requests_per_minute, tokens_per_minute, max_concurrency)
 
+@lru_cache(maxsize=None)
 def create_llm(max_tokens=None):
-    """initiates an OpenAI chat completions llm"""
-    return ChatOpenAI(model=model, temperature=0.1, max_tokens=max_tokens)
+    """initiates an OpenAI chat completions llm, once per max_tokens so the client and its connections are reused"""
+    return ChatOpenAI(model=model, temperature=0.1, max_tokens=max_tokens, max_retries=0)
+
+def invoke(runnable, input, tokens: int = 0):
+    """Invoke the LLM or chain when the governor admits it, retrying throttled and transiently failed calls."""
+    return governor.call(lambda: runnable.invoke(input), tokens)[0]
+
+def get_call_tokens(llm, prompt) -> int:
+    """Return an estimate of the prompt and completion tokens of the call to the LLM, for the governor."""
+    return get_num_tokens(prompt) + (llm.max_tokens or completion_tokens)
+
+def get_chain_tokens(chain, input: dict) -> int:
+    """Return an estimate of the prompt and completion tokens of the LLM calls of the chain, for the governor."""
+    chains = getattr(chain, "chains", [chain])  # A sequential chain calls the LLM once per chain
+    prompt_tokens = sum(count_tokens(str(value), model) for value in input.values())
+    return sum(
+        prompt_tokens + count_tokens(link.prompt.template, model) + (link.llm.max_tokens or completion_tokens)
+        for link in chains
+    )
 
 def get_num_tokens(prompt) -> int:
     """Return the number of tokens in prompt or output."""
-    llm = ChatOpenAI(model=model)
-    return llm.get_num_tokens_from_messages(prompt)
+    return count_message_tokens(prompt, model)
 
 def is_prompt_too_big(llm, prompt: str) -> bool:
     """Return whether the prompt has more tokens than fit into the context."""
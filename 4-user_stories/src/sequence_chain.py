@@ -8,6 +8,7 @@ from src.chain_prompts import user_story_prompt, criteria_prompt
 from src.to_dutch import translate_to_dutch
 from src.evaluate import evaluate_prompt_po, evaluate_prompt_dev
 from src.output_parser import create_parser_chain
+from src.llm import get_chain_tokens, invoke
 
 #import api keys for OpenAI en Langsmith
 load_dotenv()
@@ -16,6 +17,7 @@ load_dotenv()
 llm = ChatOpenAI(
     model="gpt-3.5-turbo-16k",
     temperature=0,
+    max_retries=0,
 )
 
 
@@ -41,24 +43,23 @@ def generate_sequence():
 
 def parse_output(fo_summary:str, use_case:str, user_stories_list=list):
     chain = create_parser_chain(llm=llm)
-    return chain.invoke({
+    input = {
         "functional_design": fo_summary,
         "use_case": use_case,
         "user_stories_list": user_stories_list}
-        )["user_story_json"]
+    return invoke(chain, input, get_chain_tokens(chain, input))["user_story_json"]
 
 def generate_user_stories(fo_summary:str, use_case:str, no_stories:int, user_stories_list=[]):
     """Generate a list of user stories with acceptance criteria for use_case"""
     print("Generating user stories...")
     seq_chain = generate_sequence()
     while len(user_stories_list) < no_stories:
-        user_story = seq_chain.invoke(
-            {
-                "functional_design": fo_summary,
-                "use_case": use_case,
-                "user_stories_list": user_stories_list
-            }
-        )['criteria']
+        input = {
+            "functional_design": fo_summary,
+            "use_case": use_case,
+            "user_stories_list": user_stories_list
+        }
+        user_story = invoke(seq_chain, input, get_chain_tokens(seq_chain, input))['criteria']
         user_stories_list.append(user_story)
     output_nl = translate_to_dutch(user_stories_list)
 
@@ -79,13 +80,12 @@ def evaluate_user_stories(fo_summary:str, use_case:str, user_stories_list=dict):
     """Evaluate the list of generated user stories"""
     print("Evaluating user stories...")
     seq_chain = evaluate_sequence()
-    return seq_chain.invoke(
-            {
-                "functional_design": fo_summary,
-                "use_case": use_case,
-                "user_stories_list": user_stories_list
-            }
-            )['dev_comments']
+    input = {
+        "functional_design": fo_summary,
+        "use_case": use_case,
+        "user_stories_list": user_stories_list
+    }
+    return invoke(seq_chain, input, get_chain_tokens(seq_chain, input))['dev_comments']
 
 
 
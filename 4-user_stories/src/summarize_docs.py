@@ -2,7 +2,7 @@ from langchain_community.document_loaders import Docx2txtLoader
 from langchain_core.prompts import ChatPromptTemplate
 from pathlib import Path
 
-from .llm import create_llm
+from .llm import create_llm, get_call_tokens, invoke
 
 
 def read_doc_as_str(path:Path):
@@ -63,7 +63,7 @@ def summarize_docs(fo_doc:Path, sad_doc:Path, use_case, summary_path:Path):
     sad_text = read_doc_as_str(sad_doc)
     llm = create_llm()
     prompt = doc_summary_prompt(fo_text, use_case, sad_text)
-    summary = llm.invoke(prompt)
+    summary = invoke(llm, prompt, get_call_tokens(llm, prompt))
     return write_to_file(summary.content, file_path=summary_path), print(summary.content)
 
 
@@ -72,4 +72,4 @@ def summarize_docs_simple(fo_doc_path:Path):
     fo_text = read_doc_as_str(fo_doc_path)
     llm = create_llm()
     prompt = doc_summary_prompt_simple(fo_text)
-    return llm.invoke(prompt).content 
\ No newline at end of file
+    return invoke(llm, prompt, get_call_tokens(llm, prompt)).content 
\ No newline at end of file
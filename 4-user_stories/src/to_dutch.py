@@ -1,12 +1,12 @@
 from langchain_core.prompts import ChatPromptTemplate
-from src.llm import create_llm
+from src.llm import create_llm, get_call_tokens, invoke
 
 
 def translate_to_dutch(input):
     llm = create_llm()
     prompt = translate_prompt(input)
     print("Translating to dutch...")
-    return llm.invoke(prompt).content        
+    return invoke(llm, prompt, get_call_tokens(llm, prompt)).content        
 
 
 translate_template = ChatPromptTemplate.from_messages(
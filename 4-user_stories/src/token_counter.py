@@ -0,0 +1,97 @@
+"""Count tokens locally, loading each tokenizer once and memoizing the counts by content hash.
+
+This module only imports tiktoken when counting, so each experiment can use a copy of it.
+"""
+
+from __future__ import annotations
+
+import logging
+import math
+import threading
+from collections import OrderedDict
+from collections.abc import Sequence
+from hashlib import md5
+from typing import Any
+
+DEFAULT_ENCODING = "cl100k_base"
+MAX_CACHED_COUNTS = 100_000
+TOKENS_PER_MESSAGE = 3  # Every chat message is wrapped in <|start|>{role}\n{content}<|end|>\n
+TOKENS_PER_REPLY = 3  # Every reply is primed with <|start|>assistant<|message|>
+ROLES = {"human": "user", "ai": "assistant"}
+
+_encodings: dict[str, Any] = {}
+_counts: OrderedDict[tuple[str, str], int] = OrderedDict()
+_lock = threading.Lock()
+
+
+def count_tokens(text: str, model: str) -> int:
+    """Return the number of tokens in the text for the model."""
+    return count_tokens_batch([text], model)[0]
+
+
+def count_tokens_batch(texts: Sequence[str], model: str) -> list[int]:
+    """Return the number of tokens in each of the texts for the model, only tokenizing texts not counted before."""
+    if not texts:
+        return []
+    encoding_name, encoding = _get_encoding(model)
+    keys = [(encoding_name, md5(text.encode("utf-8"), usedforsecurity=False).hexdigest()) for text in texts]
+    with _lock:
+        counts = [_counts.get(key) for key in keys]
+    missing = {key: text for key, text, count in zip(keys, texts, counts) if count is None}
+    if missing:
+        if encoding is None:
+            new_counts = [_estimate_tokens(text) for text in missing.values()]
+        else:
+            new_counts = [len(token_ids) for token_ids in encoding.encode_ordinary_batch(list(missing.values()))]
+        missing_counts = dict(zip(missing, new_counts))
+        with _lock:
+            _counts.update(missing_counts)
+            while len(_counts) > MAX_CACHED_COUNTS:
+                _counts.popitem(last=False)
+        counts = [missing_counts[key] if count is None else count for key, count in zip(keys, counts)]
+    return counts
+
+
+def count_message_tokens(messages: Sequence[Any], model: str) -> int:
+    """Return the number of tokens in the chat messages for the model, following the OpenAI chat format."""
+    if not messages:
+        return 0
+    texts = []
+    for message in messages:
+        texts.extend([ROLES.get(message.type, message.type), str(message.content)])
+    return sum(count_tokens_batch(texts, model)) + TOKENS_PER_MESSAGE * len(messages) + TOKENS_PER_REPLY
+
+
+def _get_encoding(model: str) -> tuple[str, Any]:
+    """Return the name of the encoding for the model and the encoding, loading the encoding on first use.
+
+    Tiktoken downloads encodings once and caches them on disk. If the encoding can't be loaded, for example because
+    there is no network and no cached copy, the encoding is None and token counts are estimated.
+    """
+    with _lock:
+        if model not in _encodings:
+            _encodings[model] = _load_encoding(model)
+        return _encodings[model]
+
+
+def _load_encoding(model: str) -> tuple[str, Any]:
+    """Load the encoding for the model."""
+    try:
+        import tiktoken
+    except ImportError:
+        logging.warning("Tiktoken not installed, estimating token counts")
+        return "estimate", None
+    try:
+        encoding_name = tiktoken.encoding_name_for_model(model)
+    except KeyError:
+        encoding_name = DEFAULT_ENCODING
+    try:
+        return encoding_name, tiktoken.get_encoding(encoding_name)
+    except Exception:  # Tiktoken raises different exceptions depending on why it can't fetch the encoding
+        logging.warning("Could not load the %s encoding, estimating token counts", encoding_name)
+        return "estimate", None
+
+
+def _estimate_tokens(text: str) -> int:
+    """Estimate the number of tokens in the text. For English text and code a token is about four bytes."""
+    return math.ceil(len(text.encode("utf-8")) / 4)